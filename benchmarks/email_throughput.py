@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Débit d'envoi de SMTPEmailSender mesuré hors ligne, contre le serveur SMTP de test
+
+Usage: python -m benchmarks.email_throughput --messages 500 --latency 0.02 --defer-rate 0.05
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import SMTP_SEND_WORKERS
+from smtp_email_sender import SMTPEmailSender
+from smtp_sink import FaultProfile, SMTPSink
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile ``q`` (0-100) par interpolation linéaire (0 sans valeur)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def run_benchmark(messages: int = 200, workers: int = SMTP_SEND_WORKERS, attachment_kb: int = 100,
+                  shared_attachment: bool = False, faults: Optional[FaultProfile] = None,
+                  retry_delay: float = 0.05) -> Dict[str, Any]:
+    """Envoie ``messages`` emails synthétiques au serveur de test et retourne les mesures.
+
+    La latence mesurée est celle de chaque transaction SMTP, de l'obtention d'une
+    session du pool à la fin de l'envoi; l'attente d'une session (place libre,
+    ouverture) est mesurée à part. Un email différé puis renvoyé compte une
+    transaction par essai.
+    """
+    temp_dir = Path(tempfile.mkdtemp(prefix="bench_smtp_"))
+    latencies: List[float] = []
+    waits: List[float] = []
+    lock = threading.Lock()
+
+    def timed(wait: float, latency: float) -> None:
+        with lock:
+            waits.append(wait)
+            latencies.append(latency)
+
+    try:
+        attachments = []
+        for i in range(1 if shared_attachment else messages):
+            pdf = temp_dir / f"document_{i}.pdf"
+            pdf.write_bytes(b"%PDF-1.4\n" + os.urandom(attachment_kb * 1024))
+            attachments.append(pdf)
+        pdf_files = [attachments[i % len(attachments)] for i in range(messages)]
+        rows = [{"nom": f"Entrepreneur {i}", "email": f"destinataire{i}@exemple.test"} for i in range(messages)]
+
+        with SMTPSink(faults=faults) as sink:
+            sender = SMTPEmailSender(enabled=True, ledger_path=None, workers=workers)
+            sender.smtp_server, sender.smtp_port = sink.host, sink.port
+            sender.smtp_username = sender.smtp_password = "bench"
+            sender.smtp_use_tls = sender.smtp_use_ssl = False
+            sender.smtp_pool_size = workers
+            sender.cc = sender.bcc = ""
+            sender.delay_seconds = sender.max_delay_seconds = retry_delay
+            sender.pool.on_timing = timed
+            try:
+                start = time.perf_counter()
+                results = sender.send_all(rows, pdf_files)
+                elapsed = time.perf_counter() - start
+            finally:
+                sender.close()
+            stats = sink.stats.snapshot()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    sent = sum(results)
+    return {
+        "messages": messages,
+        "envoyes": sent,
+        "echecs": messages - sent,
+        "workers": workers,
+        "piece_jointe_ko": attachment_kb,
+        "duree_s": round(elapsed, 3),
+        "messages_par_s": round(sent / elapsed, 2) if elapsed else 0.0,
+        "latence_ms": {f"p{q}": round(percentile(latencies, q) * 1000, 2) for q in (50, 95, 99)},
+        "attente_pool_ms": {f"p{q}": round(percentile(waits, q) * 1000, 2) for q in (50, 95, 99)},
+        "transactions": len(latencies),
+        "octets_recus": stats["octets_recus"],
+        "serveur": stats,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Analyse les options de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Débit d'envoi des emails contre un serveur SMTP local")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=SMTP_SEND_WORKERS)
+    parser.add_argument("--attachment-kb", type=int, default=100, help="Taille des PDF joints (Kio)")
+    parser.add_argument("--shared-attachment", action="store_true", help="Même PDF pour tous les destinataires")
+    parser.add_argument("--latency", type=float, default=0.0, help="Délai du serveur par message (s)")
+    parser.add_argument("--defer-rate", type=float, default=0.0, help="Part des messages refusés en 451")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Part des messages refusés en 554")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Part des connexions coupées")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="Écrire les résultats dans ce fichier JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Afficher les échecs d'envoi")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.CRITICAL, format="%(asctime)s [%(levelname)s] %(message)s")
+    faults = FaultProfile(args.latency, args.defer_rate, args.reject_rate, args.drop_rate, args.seed)
+    result = run_benchmark(args.messages, args.workers, args.attachment_kb, args.shared_attachment, faults)
+
+    latency = result["latence_ms"]
+    print(f"Emails envoyés: {result['envoyes']}/{result['messages']} en {result['duree_s']} s "
+          f"({result['workers']} envois simultanés)")
+    print(f"Débit: {result['messages_par_s']} messages/s")
+    print(f"Latence d'envoi: p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms "
+          f"({result['transactions']} transactions)")
+    wait = result["attente_pool_ms"]
+    print(f"Attente d'une session du pool: p50 {wait['p50']} ms, p95 {wait['p95']} ms, p99 {wait['p99']} ms")
+    print(f"Octets transmis: {result['octets_recus']}")
+    print(f"Serveur: {result['serveur']}")
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Débit de génération des documents (rendu, enregistrement DOCX, conversion PDF)
+sur des modèles synthétiques, avec détection des régressions
+
+Usage: python -m benchmarks.render_throughput --rows 100 --output out/bench/render.json \
+           --baseline out/bench/reference.json --threshold 0.2
+"""
+import argparse
+import json
+import logging
+import random
+import shutil
+import struct
+import tempfile
+import time
+import tracemalloc
+import zlib
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from docx import Document
+from docx.shared import Inches
+
+from config import DOCX_COMPRESSION, PLACEHOLDER_PATTERN
+from document_generator import DocumentGenerator
+from pdf_converter import ConverterPool
+from template_compiler import CompiledTemplate
+
+# Baisse de débit tolérée par rapport à la référence avant d'échouer (20 %)
+DEFAULT_THRESHOLD = 0.2
+STAGES = ("rendu", "enregistrement", "conversion")
+FIELDS = ("VENDEUR", "EMAIL", "PROJET", "MONTANT", "DATE")
+
+
+@dataclass
+class Scenario:
+    """Modèle synthétique: ``paragraphs`` paragraphes (un placeholder tous les
+    ``placeholder_every``), ``tables`` tableaux de ``table_rows`` lignes, une image
+    de ``media_kb`` Kio et des placeholders découpés en ``fragments`` runs."""
+    paragraphs: int = 20
+    placeholder_every: int = 2
+    tables: int = 0
+    table_rows: int = 10
+    media_kb: int = 0
+    fragments: int = 1
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "petit": Scenario(),
+    "grand": Scenario(paragraphs=2000, placeholder_every=10),
+    "medias": Scenario(media_kb=2048),
+    "tableaux": Scenario(tables=20, table_rows=20),
+    "fragmente": Scenario(paragraphs=200, fragments=8),
+}
+
+
+def _png(size_kb: int, rng: random.Random) -> bytes:
+    """Image PNG de bruit (incompressible) d'environ ``size_kb`` Kio."""
+    side = max(1, int((size_kb * 1024 / 3) ** 0.5))
+    raw = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b"")
+
+
+def _add_text(paragraph, text: str, fragments: int) -> None:
+    """Ajoute ``text`` en découpant chaque placeholder sur ``fragments`` runs."""
+    for i, piece in enumerate(text.split("{{")):
+        if i == 0:
+            paragraph.add_run(piece)
+            continue
+        field, _, rest = piece.partition("}}")
+        token = "{{" + field + "}}"
+        step = max(1, -(-len(token) // fragments))
+        for start in range(0, len(token), step):
+            paragraph.add_run(token[start:start + step]).bold = bool(start // step % 2)
+        paragraph.add_run(rest)
+
+
+def build_template(path: Path, scenario: Scenario, seed: int = 1) -> Path:
+    """Écrit un modèle DOCX synthétique correspondant à ``scenario``."""
+    rng = random.Random(seed)
+    doc = Document()
+    for i in range(scenario.paragraphs):
+        paragraph = doc.add_paragraph()
+        if i % scenario.placeholder_every == 0:
+            field = FIELDS[i // scenario.placeholder_every % len(FIELDS)]
+            _add_text(paragraph, f"Paragraphe {i}: valeur {{{{{field}}}}} pour le projet {{{{PROJET}}}}.",
+                      scenario.fragments)
+        else:
+            paragraph.add_run(f"Paragraphe {i} sans champ, texte de remplissage pour la mise en page.")
+    for _ in range(scenario.tables):
+        table = doc.add_table(rows=scenario.table_rows, cols=3)
+        for r, row in enumerate(table.rows):
+            row.cells[0].text = f"Ligne {r}"
+            _add_text(row.cells[1].paragraphs[0], "{{VENDEUR}}", scenario.fragments)
+            _add_text(row.cells[2].paragraphs[0], "{{MONTANT}} $", scenario.fragments)
+    if scenario.media_kb:
+        doc.add_picture(BytesIO(_png(scenario.media_kb, rng)), width=Inches(2))
+    doc.save(str(path))
+    return path
+
+
+def synthetic_rows(count: int) -> List[Dict[str, str]]:
+    """Lignes CSV synthétiques (toutes différentes)."""
+    return [{"nom": f"Entrepreneur {i}", "email": f"contact{i}@exemple.test", "projet": f"Projet {i % 7}",
+             "montant": f"{1000 + i * 13},00", "date": "16/10/2026"} for i in range(count)]
+
+
+def _measure(run: Callable[[], None], rows: int, repeat: int) -> Dict[str, float]:
+    """Meilleur débit sur ``repeat`` passes, puis pic mémoire Python sur une passe à part.
+
+    Le suivi de tracemalloc ralentit fortement les allocations: les passes chronométrées
+    se font sans lui, et la passe qui mesure la mémoire n'est pas chronométrée.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"lignes_par_s": round(rows / best, 2) if best else 0.0, "duree_s": round(best, 4),
+            "pic_memoire_mo": round(peak / (1024 * 1024), 2)}
+
+
+def run_scenario(scenario: Scenario, rows: int = 100, repeat: int = 3, seed: int = 1) -> Dict[str, Any]:
+    """Mesure le rendu, l'enregistrement DOCX et la conversion (convertisseur "null") d'un scénario.
+
+    ``rendu``: XML des parties produit en mémoire; ``enregistrement``:
+    ``DocumentGenerator.generate_document`` (rendu et écriture du DOCX);
+    ``conversion``: pool de convertisseurs avec le backend "null".
+    """
+    temp_dir = Path(tempfile.mkdtemp(prefix="bench_render_"))
+    try:
+        template = build_template(temp_dir / "modele.docx", scenario, seed)
+        data = synthetic_rows(rows)
+        start = time.perf_counter()
+        CompiledTemplate(template.read_bytes(), PLACEHOLDER_PATTERN, None, DOCX_COMPRESSION)
+        compile_s = time.perf_counter() - start
+
+        generator = DocumentGenerator(template, pdf_backend="null", mode="docx", cache_path=None)
+        try:
+            compiled = generator._get_compiled()
+            values = [generator._row_values(row["nom"], row) for row in data]
+            out_dir = temp_dir / "docx"
+            out_dir.mkdir()
+            docx_paths = [out_dir / f"document_{i}.docx" for i in range(rows)]
+            pdf_dir = temp_dir / "pdf"
+            pdf_dir.mkdir()
+
+            def render() -> None:
+                for row_values in values:
+                    compiled.render_parts(row_values)
+
+            def save() -> None:
+                for row, path in zip(data, docx_paths):
+                    generator.generate_document(row["nom"], 0, row, path)
+
+            def convert() -> None:
+                with ConverterPool("null", 1) as pool:
+                    results = pool.convert_many([(path, pdf_dir / f"{path.stem}.pdf") for path in docx_paths])
+                if any(result["erreur"] for result in results.values()):
+                    raise RuntimeError("conversion en échec")
+
+            stages = {"rendu": _measure(render, rows, repeat), "enregistrement": _measure(save, rows, repeat),
+                      "conversion": _measure(convert, rows, repeat)}
+        finally:
+            generator.close()
+        return {
+            "scenario": asdict(scenario),
+            "modele_ko": round(template.stat().st_size / 1024, 1),
+            "champs": len(compiled.fields),
+            "compilation_s": round(compile_s, 4),
+            "etapes": stages,
+        }
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Régressions de débit de ``results`` par rapport à ``baseline`` au-delà de ``threshold``."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        for stage, measures in result["etapes"].items():
+            expected = reference["etapes"].get(stage, {}).get("lignes_par_s")
+            if not expected:
+                continue
+            actual = measures["lignes_par_s"]
+            if actual < expected * (1 - threshold):
+                regressions.append(f"{name}/{stage}: {actual} lignes/s au lieu de {expected} "
+                                   f"({(actual / expected - 1) * 100:.0f} %)")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Analyse les options de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Débit de génération des documents sur des modèles synthétiques")
+    parser.add_argument("--rows", type=int, default=100, help="Lignes générées par scénario")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes par étape (la meilleure est gardée)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scénario à mesurer (tous par défaut; option répétable)")
+    parser.add_argument("--output", type=Path, default=Path("out") / "bench" / "render.json",
+                        help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", type=Path, help="Résultats de référence (JSON) à comparer")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Baisse de débit tolérée (0.2 = 20 %%)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    results = {"lignes": args.rows, "scenarios": {}}
+    for name in args.scenario or list(SCENARIOS):
+        result = run_scenario(SCENARIOS[name], args.rows, args.repeat)
+        results["scenarios"][name] = result
+        print(f"{name} (modèle {result['modele_ko']} Kio, {result['champs']} champs, "
+              f"compilation {result['compilation_s']} s)")
+        for stage, measures in result["etapes"].items():
+            print(f"  {stage:<15} {measures['lignes_par_s']:>10} lignes/s   pic {measures['pic_memoire_mo']} Mo")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Résultats: {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print(f"Régressions (seuil {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"Aucune régression par rapport à {args.baseline} (seuil {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
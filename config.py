@@ -19,8 +19,22 @@ OUT_PDF_DIR = BASE_DIR / "out" / "pdf"
 LOG_DIR = OUT_PDF_DIR.parent / "logs"
 LOG_FILE = LOG_DIR / "mail.log"
 
+# Lecture du CSV: nombre de processus pour analyser les gros fichiers par plages (1 = flux simple)
+CSV_READ_WORKERS = int(os.getenv("CSV_READ_WORKERS", "1"))
+# Validation des adresses: nombre de processus pour les très grandes listes
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", "1"))
+
 # Configuration des placeholders
 PLACEHOLDER = "{{VENDEUR}}"
+# Tout placeholder {{COLONNE}} est rempli par la colonne CSV du même nom (casse ignorée)
+PLACEHOLDER_PATTERN = r"\{\{\s*([^{}]+?)\s*\}\}"
+# Placeholders historiques associés à une colonne CSV
+PLACEHOLDER_ALIASES = {"VENDEUR": "nom"}
+
+# Compression des parties réécrites dans les DOCX générés ("store" ou "deflate")
+DOCX_COMPRESSION = "deflate"
+# Nombre de processus pour le rendu des DOCX (1 = séquentiel)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "1"))
 
 # Configuration email
 SEND_EMAIL = True
@@ -28,6 +42,9 @@ FROM_ACCOUNT: Optional[str] = os.getenv("FROM_ACCOUNT", "")
 CC = os.getenv("CC", "")
 BCC = os.getenv("BCC", "")
 SUBJECT_TEMPLATE = "Soumission - 25142 - École Arc-en-ciel Pavillon 1 (Laval)"
+# Campagne d'envoi: un même PDF n'est remis qu'une fois par destinataire et par campagne
+CAMPAIGN = os.getenv("CAMPAIGN") or SUBJECT_TEMPLATE
+SEND_LEDGER_FILE = BASE_DIR / "out" / "envois.sqlite"
 
 # Configuration SMTP (depuis variables d'environnement)
 SMTP_SERVER = os.getenv("SMTP_SERVER", "")
@@ -36,6 +53,14 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
 SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "false").lower() == "true"
+# Sessions SMTP authentifiées gardées ouvertes et réutilisées d'un message à l'autre
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_TIMEOUT = 30.0
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+# Emails envoyés en parallèle (1 = séquentiel) et débit maximal accepté par le relais (0 = sans limite)
+SMTP_SEND_WORKERS = int(os.getenv("SMTP_SEND_WORKERS", str(SMTP_POOL_SIZE)))
+SMTP_RATE_PER_SECOND = float(os.getenv("SMTP_RATE_PER_SECOND", "0"))
+SMTP_RATE_PER_MINUTE = float(os.getenv("SMTP_RATE_PER_MINUTE", "0"))
 
 # Configuration templates d'emails
 USE_EMAIL_TEMPLATE = True
@@ -51,12 +76,62 @@ FALLBACK_BODY_HTML_TEMPLATE = (
 USE_SYSTEM_SIGNATURE = False  # Désactiver les signatures Outlook
 USE_PROJECT_SIGNATURE = True   # Utiliser la signature du projet
 SIGNATURE_NAME = "Dilamco (gabriel@dilamco.com)"
-STRICT_EMBED_SIGNATURE_IMAGES = False
 PROJECT_SIGNATURE_FILE = BASE_DIR / "signatures" / "dilamco_signature.html"
+# Images de la signature jointes au message (parties inline "cid:") au lieu de
+# liens distants: cherchées dans SIGNATURE_IMAGES_DIR, sinon téléchargées une fois
+STRICT_EMBED_SIGNATURE_IMAGES = os.getenv("STRICT_EMBED_SIGNATURE_IMAGES", "false").lower() == "true"
+SIGNATURE_IMAGES_DIR = BASE_DIR / "signatures" / "images"
+SIGNATURE_IMAGE_TIMEOUT = 10.0
+
+# Conversion PDF: "docx2pdf" (Word sous Windows), "libreoffice" (headless, Linux)
+# ou "null" (PDF vierge, pour les tests)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "docx2pdf").lower()
+# Nombre de convertisseurs lancés en parallèle, chacun avec son propre profil
+PDF_CONVERTER_WORKERS = int(os.getenv("PDF_CONVERTER_WORKERS", "1"))
+CONVERTER_PROFILE_DIR = BASE_DIR / "out" / "converters"
+LIBREOFFICE_PATH = os.getenv("LIBREOFFICE_PATH", "soffice")
+LIBREOFFICE_BASE_PORT = int(os.getenv("LIBREOFFICE_BASE_PORT", "2002"))
+LIBREOFFICE_START_TIMEOUT = 30.0
+
+# Mode de génération: "docx" (un DOCX converti en PDF par ligne) ou "stamp"
+# (modèle converti une seule fois en PDF, texte de chaque ligne apposé dessus)
+GENERATION_MODE = os.getenv("GENERATION_MODE", "docx").lower()
+STAMP_CACHE_DIR = BASE_DIR / "out" / "stamp"
+
+# Cache des sorties: un DOCX/PDF déjà produit pour le même modèle et les mêmes
+# valeurs est réutilisé au lieu d'être régénéré (OUTPUT_CACHE=false pour désactiver)
+OUTPUT_CACHE_FILE: Optional[Path] = (
+    BASE_DIR / "out" / "cache.sqlite" if os.getenv("OUTPUT_CACHE", "true").lower() == "true" else None
+)
+OUTPUT_CACHE_MAX_ENTRIES = 50000
+OUTPUT_CACHE_MAX_AGE_DAYS = 30
+
+# Journal des lancements (état de chaque ligne, pour la reprise avec --resume)
+JOURNAL_FILE = BASE_DIR / "out" / "journal.sqlite"
+
+# Configuration du pipeline (rendu -> conversion -> envoi en flux continu)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "false").lower() == "true"
+PIPELINE_QUEUE_SIZE = 32
+# Threads par étape: par défaut, autant que de processus de rendu et de convertisseurs PDF
+PIPELINE_WORKERS = {
+    "render": int(os.getenv("PIPELINE_RENDER_WORKERS", str(RENDER_WORKERS))),
+    "convert": int(os.getenv("PIPELINE_CONVERT_WORKERS", str(PDF_CONVERTER_WORKERS))),
+    "send": int(os.getenv("PIPELINE_SEND_WORKERS", "2")),
+}
+
+# Boîte d'envoi: avec SPOOL_MODE=true (ou --spool), les emails complets sont déposés
+# en .eml dans OUTBOX_DIR au lieu d'être envoyés; un expéditeur séparé
+# (--outbox-worker) les envoie avec OUTBOX_SEND_WORKERS envois simultanés
+SPOOL_MODE = os.getenv("SPOOL_MODE", "false").lower() == "true"
+OUTBOX_DIR = Path(os.getenv("OUTBOX_DIR", str(BASE_DIR / "out" / "outbox")))
+OUTBOX_SEND_WORKERS = int(os.getenv("OUTBOX_SEND_WORKERS", str(SMTP_SEND_WORKERS)))
+OUTBOX_POLL_SECONDS = 2.0
 
 # Configuration retry
 MAX_RETRIES = 5
 DELAY_SECONDS = 2.0
+# Délai maximal entre deux essais (délai exponentiel: DELAY_SECONDS, x2, x4...)
+RETRY_MAX_DELAY_SECONDS = 60.0
 
 # Configuration logging
 LOG_LEVEL = "DEBUG"
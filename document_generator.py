@@ -3,22 +3,84 @@
 Générateur de documents Word à partir de modèles
 """
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-from docx import Document
-from docx2pdf import convert
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple, Union
 
-from config import PLACEHOLDER, OUT_DOCX_DIR, OUT_PDF_DIR
-from file_utils import safe_filename, safe_email_for_filename
+from config import (
+    PLACEHOLDER_PATTERN, PLACEHOLDER_ALIASES, OUT_DOCX_DIR, OUT_PDF_DIR, DOCX_COMPRESSION,
+    RENDER_WORKERS, PDF_BACKEND, PDF_CONVERTER_WORKERS, GENERATION_MODE, STAMP_CACHE_DIR,
+    OUTPUT_CACHE_FILE, OUTPUT_CACHE_MAX_ENTRIES, OUTPUT_CACHE_MAX_AGE_DAYS
+)
+from file_utils import safe_filename, safe_email_for_filename, link_or_copy
+from output_cache import OutputCache, cache_key
+from pdf_converter import ConverterPool
+from pdf_stamp import StampTemplate
+from run_journal import RENDERED, CONVERTED, FAILED
+from template_compiler import CompiledTemplate, row_values
+
+# Modèle compilé propre à chaque processus de rendu (voir _init_render_worker)
+_worker_template: Optional[CompiledTemplate] = None
+
+
+def _init_render_worker(template_bytes: bytes, pattern: str, index: Dict[str, Any],
+                        compression: str) -> None:
+    """Initialise un processus de rendu: le modèle n'est transmis qu'une fois par processus."""
+    global _worker_template
+    _worker_template = CompiledTemplate(template_bytes, pattern, index, compression)
+
+
+def _render_task(task: Tuple[int, Path, Dict[str, str]]) -> Tuple[int, Optional[Path], Optional[str]]:
+    """Rend un document dans un processus de rendu et retourne (index, chemin, erreur)."""
+    index, out_path, values = task
+    try:
+        return index, _worker_template.write(out_path, values), None
+    except Exception as e:
+        return index, None, str(e)
 
 
 class DocumentGenerator:
     """Classe pour générer des documents Word à partir de modèles."""
     
-    def __init__(self, template_path: Path):
+    def __init__(self, template_path: Path, compression: str = DOCX_COMPRESSION,
+                 pdf_backend: str = PDF_BACKEND, converter_workers: int = PDF_CONVERTER_WORKERS,
+                 mode: str = GENERATION_MODE, cache_path: Optional[Path] = OUTPUT_CACHE_FILE):
         self.template_path = template_path
         if not template_path.exists():
             raise FileNotFoundError(f"Modèle introuvable: {template_path}")
+        self.compression = compression
+        self.pdf_backend = pdf_backend
+        self.converter_workers = converter_workers
+        if mode not in ("docx", "stamp"):
+            raise ValueError(f"Mode de génération inconnu: {mode} (attendu: docx ou stamp)")
+        self.mode = mode
+        self._compiled = None
+        self._stamp = None
+        self._pool = None
+        self.cache_path = cache_path
+        self._cache = None
+        # Documents repris du cache des sorties (DOCX et PDF, ou PDF seul en mode "stamp")
+        self.cache_hits = 0
+        # Les étapes du pipeline partagent le générateur entre plusieurs threads
+        self._lock = threading.RLock()
+    
+    def _get_compiled(self) -> CompiledTemplate:
+        """Compile le modèle une seule fois (index des placeholders mis en cache sur disque)."""
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN, self.compression)
+            return self._compiled
+    
+    def check_columns(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Signale les placeholders du modèle sans colonne correspondante dans le CSV."""
+        if not rows:
+            return []
+        available = row_values(rows[0], PLACEHOLDER_ALIASES)
+        missing = [field for field in self._get_compiled().fields if field not in available]
+        if missing:
+            logging.warning(f"Placeholders sans colonne CSV (laissés tels quels): {', '.join(missing)}")
+        return missing
     
     def replace_placeholder_in_paragraph(self, paragraph, placeholder: str, replacement: str) -> None:
         """Remplace un placeholder dans un paragraphe."""
@@ -58,86 +120,360 @@ class DocumentGenerator:
                             self.replace_placeholder_in_paragraph(paragraph, placeholder, replacement) or \
                             self.force_replace_across_runs(paragraph, placeholder, replacement)
     
-    def generate_document(self, name: str, index: int) -> Path:
-        """Génère un document Word pour un nom donné."""
-        doc = Document(str(self.template_path))
+    def plan_output_paths(self, rows: List[Dict[str, Any]]) -> List[Path]:
+        """Attribue un chemin DOCX distinct à chaque ligne (suffixe _2, _3... si homonymes)."""
+        seen: Dict[str, int] = {}
+        return [self.plan_output_path(row, seen) for row in rows]
+    
+    def plan_output_path(self, row: Dict[str, Any], seen: Dict[str, int]) -> Path:
+        """Chemin DOCX d'une ligne lue en flux; ``seen`` compte les noms déjà attribués."""
+        stem = safe_filename(row.get('nom', 'inconnu'))
+        seen[stem] = seen.get(stem, 0) + 1
+        suffix = f"_{seen[stem]}" if seen[stem] > 1 else ""
+        return OUT_DOCX_DIR / f"{stem}{suffix}.docx"
+    
+    def group_identical_rows(self, rows: List[Dict[str, Any]]) -> Dict[int, List[int]]:
+        """Regroupe les lignes qui produisent exactement le même document.
         
-        # Remplacer dans les paragraphes
-        for p in doc.paragraphs:
-            if PLACEHOLDER in p.text:
-                self.replace_placeholder_in_paragraph(p, PLACEHOLDER, name)
-                if PLACEHOLDER in p.text:
-                    self.force_replace_across_runs(p, PLACEHOLDER, name)
+        Deux lignes sont identiques si elles donnent les mêmes valeurs à tous les
+        placeholders du modèle (ex. plusieurs estimateurs d'un même entrepreneur).
+        Retourne {index de la première ligne: index des autres lignes du groupe}.
+        """
+        groups: Dict[int, List[int]] = {}
+        first_by_key: Dict[tuple, int] = {}
+        for i, row in enumerate(rows):
+            key = self.document_key(row)
+            if key in first_by_key:
+                groups[first_by_key[key]].append(i)
+            else:
+                first_by_key[key] = i
+                groups[i] = []
+        return groups
+    
+    def document_key(self, row: Dict[str, Any]) -> tuple:
+        """Valeurs des placeholders du modèle: deux lignes de même clé donnent le même document."""
+        values = self._row_values(row.get('nom', 'inconnu'), row)
+        return tuple(values.get(field) for field in self._get_compiled().fields)
+    
+    def content_key(self, row: Dict[str, Any]) -> str:
+        """Empreinte du document d'une ligne: modèle et valeurs de ses placeholders.
         
-        # Remplacer dans les tableaux
-        self.replace_in_tables(doc, PLACEHOLDER, name)
+        Contrairement aux octets du PDF (dates et identifiants ajoutés à chaque
+        conversion), elle ne change pas d'un lancement à l'autre.
+        """
+        compiled = self._get_compiled()
+        return cache_key(compiled.sha256, dict(zip(compiled.fields, self.document_key(row))))
+    
+    def _row_values(self, name: str, row: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Valeurs de substitution d'une ligne (le nom est toujours disponible)."""
+        fields = dict(row or {})
+        fields.setdefault("nom", name)
+        return row_values(fields, PLACEHOLDER_ALIASES)
+    
+    def render_documents_parallel(self, rows: List[Dict[str, Any]], out_paths: List[Path],
+                                  workers: int) -> List[Tuple[int, Optional[Path], Optional[str]]]:
+        """Rend les documents dans un pool de processus.
         
-        # Sauvegarder
-        out_path = OUT_DOCX_DIR / f"{safe_filename(name)}.docx"
-        doc.save(str(out_path))
-        return out_path
+        Retourne une liste de (index de ligne, chemin DOCX ou None, erreur ou None).
+        """
+        compiled = self._get_compiled()
+        tasks = [
+            (i, out_paths[i], self._row_values(row.get('nom', 'inconnu'), row))
+            for i, row in enumerate(rows)
+        ]
+        workers = max(1, min(workers, len(tasks)))
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_render_worker,
+            initargs=(compiled.template_bytes, compiled.pattern.pattern, compiled.index, self.compression),
+        ) as executor:
+            return list(executor.map(_render_task, tasks, chunksize=chunksize))
+    
+    def generate_document(self, name: str, index: int, row: Optional[Dict[str, Any]] = None,
+                          out_path: Optional[Path] = None) -> Path:
+        """Génère un document Word pour un nom donné.
+        
+        Chaque placeholder {{COLONNE}} est rempli par la colonne correspondante de
+        ``row``; {{VENDEUR}} reste un alias de la colonne ``nom``.
+        """
+        if out_path is None:
+            out_path = OUT_DOCX_DIR / f"{safe_filename(name)}.docx"
+        return self._get_compiled().write(out_path, self._row_values(name, row))
+    
+    def pdf_path_for(self, docx_path: Path, email: str = "") -> Path:
+        """Chemin du PDF d'un document (suffixé par l'email du destinataire)."""
+        email_suffix = ("_" + safe_email_for_filename(email)) if email else ""
+        return OUT_PDF_DIR / (docx_path.stem + f"{email_suffix}.pdf")
+    
+    def _get_pool(self) -> ConverterPool:
+        """Crée le pool de convertisseurs au premier besoin (démarrés une seule fois)."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ConverterPool(self.pdf_backend, self.converter_workers)
+            return self._pool
     
     def convert_to_pdf(self, docx_path: Path, email: str = "") -> Path:
         """Convertit un document Word en PDF."""
-        email_suffix = ("_" + safe_email_for_filename(email)) if email else ""
-        pdf_path = OUT_PDF_DIR / (docx_path.stem + f"{email_suffix}.pdf")
+        return self._get_pool().convert(docx_path, self.pdf_path_for(docx_path, email))
+    
+    def convert_to_pdf_batch(self, docx_files: Union[Path, Sequence[Path]],
+                             emails: Optional[Sequence[str]] = None,
+                             progress: Optional[Callable[[int, int, Path], None]] = None,
+                             on_result: Optional[Callable[[Path, Dict[str, Any]], None]] = None
+                             ) -> Dict[Path, Dict[str, Any]]:
+        """Convertit plusieurs documents avec les convertisseurs déjà démarrés du pool.
         
-        # Initialiser COM pour docx2pdf
-        try:
-            import pythoncom
-            pythoncom.CoInitialize()
-        except ImportError:
-            pass  # pythoncom non disponible sur non-Windows
+        ``docx_files`` est une liste de fichiers ou un répertoire; ``emails``
+        (optionnel, même ordre) sert à nommer les PDF. Retourne, pour chaque DOCX,
+        ``{'pdf': chemin ou None, 'erreur': message ou None}``.
+        """
+        if isinstance(docx_files, Path) and docx_files.is_dir():
+            docx_files = sorted(p for p in docx_files.glob("*.docx") if not p.name.startswith("~$"))
+        docx_files = list(docx_files)
+        emails = list(emails) if emails is not None else [""] * len(docx_files)
+        
+        jobs = [(docx_path, self.pdf_path_for(docx_path, email)) for docx_path, email in zip(docx_files, emails)]
+        return self._get_pool().convert_many(jobs, progress, on_result)
+    
+    def _get_stamp(self) -> StampTemplate:
+        """Convertit le modèle en PDF de base une seule fois (mode "stamp")."""
+        with self._lock:
+            if self._stamp is None:
+                self._stamp = StampTemplate.load(self.template_path, PLACEHOLDER_PATTERN,
+                                                 self._get_pool().convert, STAMP_CACHE_DIR)
+            return self._stamp
+    
+    def stamp_document(self, name: str, row: Optional[Dict[str, Any]] = None,
+                       out_path: Optional[Path] = None) -> Path:
+        """Produit directement le PDF d'une ligne en apposant ses valeurs sur le PDF de base."""
+        if out_path is None:
+            out_path = self.pdf_path_for(OUT_DOCX_DIR / f"{safe_filename(name)}.docx",
+                                         (row or {}).get('email', ''))
+        return self._get_stamp().write(out_path, self._row_values(name, row))
+    
+    def _get_cache(self) -> Optional[OutputCache]:
+        """Ouvre le cache des sorties (None s'il est désactivé)."""
+        with self._lock:
+            if self._cache is None and self.cache_path is not None:
+                self._cache = OutputCache(self.cache_path, OUTPUT_CACHE_MAX_ENTRIES, OUTPUT_CACHE_MAX_AGE_DAYS)
+            return self._cache
+    
+    def cache_key_for(self, row: Dict[str, Any]) -> str:
+        """Clé de cache d'une ligne (modèle, valeurs substituées, mode et backend PDF)."""
+        return cache_key(self._get_compiled().sha256, self._row_values(row.get('nom', 'inconnu'), row),
+                         f"{self.mode}:{self.pdf_backend}")
+    
+    def _cache_keys(self, rows: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Clé de cache de chaque ligne."""
+        return {i: self.cache_key_for(row) for i, row in enumerate(rows)}
+    
+    def fetch_cached(self, row: Dict[str, Any], key: str, out_path: Path
+                     ) -> Optional[Tuple[Optional[Path], Path]]:
+        """(DOCX, PDF) d'une ligne repris du cache des sorties, ou None.
         
+        En mode "stamp", seul le PDF est attendu (DOCX None).
+        """
+        cache = self._get_cache()
+        if cache is None:
+            return None
+        pdf_path = self.pdf_path_for(out_path, row.get('email', ''))
         try:
-            convert(str(docx_path), str(pdf_path))
-        finally:
-            # Nettoyer COM
-            try:
-                import pythoncom
-                pythoncom.CoUninitialize()
-            except ImportError:
-                pass
+            hit = cache.fetch(key, out_path if self.mode == "docx" else None, pdf_path)
+        except OSError as e:
+            logging.warning(f"Cache des sorties inutilisable pour {row.get('nom', 'inconnu')}: {e}")
+            return None
+        if hit is not None:
+            with self._lock:
+                self.cache_hits += 1
+        return hit
+    
+    def _fetch_cached(self, rows: List[Dict[str, Any]], keys: Dict[int, str], out_paths: List[Path]
+                      ) -> Dict[int, Tuple[Optional[Path], Path]]:
+        """Sorties réutilisables du cache, par index de ligne."""
+        if self._get_cache() is None:
+            return {}
+        cached = {}
+        for i, row in enumerate(rows):
+            hit = self.fetch_cached(row, keys[i], out_paths[i])
+            if hit is not None:
+                cached[i] = hit
+        if cached:
+            logging.info(f"Cache des sorties: {len(cached)}/{len(rows)} document(s) réutilisé(s)")
+        return cached
+    
+    def store_cached(self, key: str, docx_path: Optional[Path], pdf_path: Path) -> None:
+        """Enregistre les sorties produites pour une ligne (sans éviction, voir ``evict_cache``)."""
+        cache = self._get_cache()
+        if cache is None:
+            return
+        try:
+            cache.store(key, docx_path, pdf_path)
+        except OSError as e:
+            logging.warning(f"Impossible d'enregistrer {pdf_path.name} dans le cache: {e}")
+    
+    def evict_cache(self) -> None:
+        """Applique l'éviction du cache des sorties (après un lot ou un pipeline)."""
+        cache = self._get_cache()
+        if cache is not None:
+            cache.evict()
+    
+    def _store_cached(self, keys: Dict[int, str], outputs: Dict[int, Tuple[Optional[Path], Path]]) -> None:
+        """Enregistre les sorties produites puis applique l'éviction."""
+        if self._get_cache() is None:
+            return
+        for i, (docx_path, pdf_path) in outputs.items():
+            self.store_cached(keys[i], docx_path, pdf_path)
+        self.evict_cache()
+    
+    def close(self) -> None:
+        """Arrête les convertisseurs PDF (Word, instances LibreOffice) et ferme le cache."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+    
+    def generate_documents_batch(self, rows: List[Dict[str, Any]], retry_count: int = 3,
+                                 workers: Optional[int] = None,
+                                 out_paths: Optional[List[Path]] = None,
+                                 on_result: Optional[Callable[[int, str, Optional[Path], Optional[str]], None]] = None
+                                 ) -> Tuple[List[Path], List[Path]]:
+        """Génère tous les documents pour une liste de données avec gestion d'erreurs robuste.
+        
+        Les DOCX sont d'abord tous rendus (en parallèle dans un pool de processus
+        si ``workers`` > 1, par défaut ``RENDER_WORKERS``), puis convertis en PDF
+        par le pool de convertisseurs (démarrés une seule fois). En mode "stamp",
+        seuls les PDF sont produits, à partir du PDF de base du modèle.
+        
+        Les lignes qui donnent le même document (voir ``group_identical_rows``)
+        ne sont rendues et converties qu'une fois: le PDF est ensuite partagé
+        (lien physique) sous le nom de chaque destinataire. Les lignes dont le
+        modèle et les valeurs n'ont pas changé depuis un lancement précédent
+        réutilisent les fichiers du cache des sorties.
+        
+        ``out_paths`` impose les chemins DOCX (par défaut ``plan_output_paths``);
+        ``on_result(index, état, chemin, erreur)`` est appelé dès qu'une ligne est
+        rendue, convertie ou définitivement en échec (voir ``run_journal``).
+        Retourne (DOCX distincts, un PDF par ligne réussie dans l'ordre des lignes).
+        """
+        notify = on_result or (lambda index, status, path, error: None)
+        self.check_columns(rows)
+        if out_paths is None:
+            out_paths = self.plan_output_paths(rows)
+        groups = self.group_identical_rows(rows)
+        firsts = list(groups)
+        shared = len(rows) - len(firsts)
+        if shared:
+            logging.info(f"{len(firsts)} document(s) distinct(s) pour {len(rows)} ligne(s): "
+                         f"{shared} PDF partagé(s) au lieu d'être régénérés")
+        pdf_by_row: Dict[int, Path] = {}
         
-        return pdf_path
+        def share(j: int, status: str, path: Optional[Path], error: Optional[str]) -> None:
+            first = firsts[j]
+            for i in [first] + groups[first]:
+                row_path = path
+                if status == CONVERTED:
+                    if i != first:
+                        try:
+                            row_path = self.share_pdf(path, out_paths[first], rows[i])
+                        except OSError as e:
+                            logging.error(f"Impossible de partager {path.name} pour {rows[i].get('nom', 'inconnu')}: {e}")
+                            notify(i, FAILED, None, str(e))
+                            continue
+                    pdf_by_row[i] = row_path
+                notify(i, status, row_path, error)
+        
+        docx_files, _ = self._generate_unique_documents(
+            [rows[i] for i in firsts], [out_paths[i] for i in firsts], retry_count, workers, share
+        )
+        return docx_files, [pdf_by_row[i] for i in sorted(pdf_by_row)]
+    
+    def share_pdf(self, pdf_path: Path, out_path: Path, row: Dict[str, Any]) -> Path:
+        """Partage le PDF d'une ligne identique (rendue vers ``out_path``) sous le nom du destinataire de ``row``."""
+        target = self.pdf_path_for(out_path, row.get('email', ''))
+        return target if target == pdf_path else link_or_copy(pdf_path, target)
     
-    def generate_documents_batch(self, rows: List[Dict[str, Any]], retry_count: int = 3) -> Tuple[List[Path], List[Path]]:
-        """Génère tous les documents pour une liste de données avec gestion d'erreurs robuste."""
+    def _generate_unique_documents(self, rows: List[Dict[str, Any]], out_paths: List[Path],
+                                   retry_count: int, workers: Optional[int],
+                                   notify: Callable[[int, str, Optional[Path], Optional[str]], None]
+                                   ) -> Tuple[List[Path], List[Path]]:
+        """Rend et convertit une liste de documents distincts (voir ``generate_documents_batch``)."""
         docx_files = []
         pdf_files = []
         errors = []
+        keys = self._cache_keys(rows) if self.cache_path is not None else {}
+        if self.mode == "stamp":
+            return docx_files, self._stamp_documents_batch(rows, out_paths, retry_count, keys, notify)
+        workers = RENDER_WORKERS if workers is None else workers
 
+        cached = self._fetch_cached(rows, keys, out_paths)
+        rendered: Dict[int, Path] = {i: docx_path for i, (docx_path, _) in cached.items()}
+        converted: Dict[int, Path] = {i: pdf_path for i, (_, pdf_path) in cached.items()}
+        for i, (docx_path, pdf_path) in cached.items():
+            notify(i, RENDERED, docx_path, None)
+            notify(i, CONVERTED, pdf_path, None)
+        todo = [i for i in range(len(rows)) if i not in cached]
+        if workers > 1 and len(todo) > 1:
+            results = self.render_documents_parallel(
+                [rows[i] for i in todo], [out_paths[i] for i in todo], workers
+            )
+            for j, docx_path, error in results:
+                i = todo[j]
+                if docx_path is not None:
+                    rendered[i] = docx_path
+                    notify(i, RENDERED, docx_path, None)
+                else:
+                    logging.warning(f"Rendu parallèle échoué pour {rows[i].get('nom', 'inconnu')}: {error}")
+            logging.info(f"Rendu parallèle ({workers} processus): {len(rendered) - len(cached)}/{len(todo)} DOCX")
+
+        # Rendu séquentiel (et reprise des rendus parallèles échoués)
         for i, row in enumerate(rows):
+            if i in rendered:
+                continue
             name = row.get('nom', 'inconnu')
-            attempts = 0
-            success = False
-
-            while attempts < retry_count and not success:
+            for attempt in range(1, retry_count + 1):
                 try:
-                    # Générer le document Word
-                    docx_path = self.generate_document(name, i + 1)
-                    docx_files.append(docx_path)
-
-                    # Convertir en PDF
-                    pdf_path = self.convert_to_pdf(docx_path, row.get('email', ''))
-                    pdf_files.append(pdf_path)
+                    rendered[i] = self.generate_document(name, i + 1, row, out_paths[i])
+                    notify(i, RENDERED, rendered[i], None)
+                    break
+                except Exception as e:
+                    self._record_failure(errors, i, name, e, attempt, retry_count)
 
-                    logging.info(f"Document généré: {docx_path.name} -> {pdf_path.name}")
-                    success = True
+        # Conversion PDF de tous les documents rendus, répartie sur le pool de convertisseurs
+        pending = {rendered[i]: i for i in sorted(rendered) if i not in converted}
+        
+        def converted_one(docx_path: Path, result: Dict[str, Any]) -> None:
+            if result['erreur'] is None:
+                notify(pending[docx_path], CONVERTED, result['pdf'], None)
+        
+        for attempt in range(1, retry_count + 1):
+            if not pending:
+                break
+            results = self.convert_to_pdf_batch(
+                list(pending), [rows[i].get('email', '') for i in pending.values()],
+                on_result=converted_one
+            )
+            failed = {}
+            for docx_path, result in results.items():
+                i = pending[docx_path]
+                if result['erreur'] is None:
+                    converted[i] = result['pdf']
+                    logging.info(f"Document généré: {docx_path.name} -> {result['pdf'].name}")
+                else:
+                    name = rows[i].get('nom', 'inconnu')
+                    if self._record_failure(errors, i, name, result['erreur'], attempt, retry_count):
+                        failed[docx_path] = i
+            pending = failed
 
-                except Exception as e:
-                    attempts += 1
-                    error_msg = f"Erreur lors de la génération du document pour {name} (tentative {attempts}/{retry_count}): {e}"
-
-                    if attempts < retry_count:
-                        logging.warning(error_msg)
-                    else:
-                        logging.error(error_msg)
-                        errors.append({
-                            'nom': name,
-                            'erreur': str(e),
-                            'index': i
-                        })
+        for i in sorted(rendered):
+            docx_files.append(rendered[i])
+            if i in converted:
+                pdf_files.append(converted[i])
+        self._store_cached(keys, {i: (rendered[i], converted[i]) for i in converted if i not in cached})
+        for err in errors:
+            notify(err['index'], FAILED, None, err['erreur'])
 
         if errors:
             error_summary = "\n".join([f"- {err['nom']}: {err['erreur']}" for err in errors])
@@ -148,3 +484,79 @@ class DocumentGenerator:
                 raise Exception(f"Tous les documents ont échoué. Première erreur: {errors[0]['erreur']}")
 
         return docx_files, pdf_files
+
+    def _stamp_documents_batch(self, rows: List[Dict[str, Any]], out_paths: List[Path],
+                               retry_count: int, keys: Dict[int, str],
+                               notify: Callable[[int, str, Optional[Path], Optional[str]], None]) -> List[Path]:
+        """Produit les PDF de toutes les lignes en mode "stamp"."""
+        pdf_files = []
+        errors = []
+        cached = self._fetch_cached(rows, keys, out_paths)
+        stamped: Dict[int, Tuple[Optional[Path], Path]] = {}
+        if len(cached) < len(rows):
+            self._get_stamp()  # une erreur de conversion du modèle interrompt le lot
+        for i, row in enumerate(rows):
+            if i in cached:
+                pdf_files.append(cached[i][1])
+                notify(i, CONVERTED, cached[i][1], None)
+                continue
+            name = row.get('nom', 'inconnu')
+            pdf_path = self.pdf_path_for(out_paths[i], row.get('email', ''))
+            for attempt in range(1, retry_count + 1):
+                try:
+                    pdf_files.append(self.stamp_document(name, row, pdf_path))
+                    stamped[i] = (None, pdf_path)
+                    notify(i, CONVERTED, pdf_path, None)
+                    logging.info(f"PDF généré: {pdf_path.name}")
+                    break
+                except Exception as e:
+                    self._record_failure(errors, i, name, e, attempt, retry_count)
+        self._store_cached(keys, stamped)
+        for err in errors:
+            notify(err['index'], FAILED, None, err['erreur'])
+
+        if errors:
+            error_summary = "\n".join([f"- {err['nom']}: {err['erreur']}" for err in errors])
+            logging.error(f"Échecs de génération ({len(errors)}/{len(rows)}):\n{error_summary}")
+            if not pdf_files:
+                raise Exception(f"Tous les documents ont échoué. Première erreur: {errors[0]['erreur']}")
+        return pdf_files
+
+    @staticmethod
+    def _record_failure(errors: List[Dict[str, Any]], index: int, name: str, error: Any,
+                        attempt: int, retry_count: int) -> bool:
+        """Journalise un échec; retourne True s'il reste des tentatives."""
+        error_msg = f"Erreur lors de la génération du document pour {name} (tentative {attempt}/{retry_count}): {error}"
+        if attempt < retry_count:
+            logging.warning(error_msg)
+            return True
+        logging.error(error_msg)
+        errors.append({
+            'nom': name,
+            'erreur': str(error),
+            'index': index
+        })
+        return False
+
+
+class DocumentPlanner:
+    """Planification ligne à ligne, pour des lignes lues en flux (mode pipeline).
+    
+    Mêmes règles que le traitement par lot: chemin DOCX distinct par ligne (voir
+    ``DocumentGenerator.plan_output_path``) et regroupement des lignes qui donnent
+    le même document (voir ``DocumentGenerator.group_identical_rows``).
+    """
+    
+    def __init__(self, generator: DocumentGenerator):
+        self.generator = generator
+        self._seen: Dict[str, int] = {}
+        self._first_by_key: Dict[tuple, int] = {}
+    
+    def output_path(self, row: Dict[str, Any]) -> Path:
+        """Chemin DOCX de la ligne suivante (à appeler pour chaque ligne, dans l'ordre)."""
+        return self.generator.plan_output_path(row, self._seen)
+    
+    def first_identical(self, index: int, row: Dict[str, Any]) -> Optional[int]:
+        """Index de la première ligne planifiée qui donne le même document, ou None."""
+        first = self._first_by_key.setdefault(self.generator.document_key(row), index)
+        return first if first != index else None
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Écriture de fichiers DOCX directement au niveau de l'archive zip
+"""
+import os
+import struct
+import zipfile
+import zlib
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List
+
+COMPRESSION_STORE = "store"
+COMPRESSION_DEFLATE = "deflate"
+COMPRESSION_POLICIES = (COMPRESSION_STORE, COMPRESSION_DEFLATE)
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIR = struct.Struct("<IHHHHIIH")
+_LOCAL_SIGNATURE = 0x04034B50
+_CENTRAL_SIGNATURE = 0x02014B50
+_END_SIGNATURE = 0x06054B50
+_VERSION = 20
+_FLAG_DATA_DESCRIPTOR = 0x08
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class _RawEntry:
+    """Entrée du modèle dont les octets compressés sont conservés tels quels."""
+
+    __slots__ = ("name", "flags", "method", "dos_time", "dos_date", "crc",
+                 "compress_size", "file_size", "external_attr", "data")
+
+    def __init__(self, info: zipfile.ZipInfo, data: memoryview):
+        self.name = info.filename.encode("utf-8")
+        self.flags = (info.flag_bits & ~_FLAG_DATA_DESCRIPTOR) | 0x800
+        self.method = info.compress_type
+        self.dos_time, self.dos_date = _dos_datetime(info.date_time)
+        self.crc = info.CRC
+        self.compress_size = info.compress_size
+        self.file_size = info.file_size
+        self.external_attr = info.external_attr
+        self.data = data
+
+
+def _dos_datetime(date_time) -> tuple:
+    """Convertit un tuple date_time zip en (heure, date) au format DOS."""
+    year, month, day, hour, minute, second = date_time
+    dos_time = (hour << 11) | (minute << 5) | (second // 2)
+    dos_date = ((year - 1980) << 9) | (month << 5) | day
+    return dos_time, dos_date
+
+
+class DocxZipWriter:
+    """Écrit des DOCX en recopiant octet pour octet les parties inchangées du modèle.
+
+    Seules les parties fournies à ``write`` sont recompressées selon la politique
+    choisie (``store`` ou ``deflate``); toutes les autres entrées (médias, styles,
+    thème...) sont recopiées avec leurs octets déjà compressés.
+    """
+
+    def __init__(self, template_bytes: bytes, compression: str = COMPRESSION_DEFLATE,
+                 compress_level: int = 6):
+        if compression not in COMPRESSION_POLICIES:
+            raise ValueError(
+                f"Politique de compression inconnue: {compression} "
+                f"(attendu: {', '.join(COMPRESSION_POLICIES)})"
+            )
+        self.compression = compression
+        self.compress_level = compress_level
+        self._buffer = memoryview(template_bytes)
+        self._entries = self._read_entries(template_bytes)
+
+    @property
+    def part_names(self) -> List[str]:
+        """Noms des parties du modèle, dans l'ordre de l'archive."""
+        return [entry.name.decode("utf-8") for entry in self._entries]
+
+    def read_part(self, name: str) -> bytes:
+        """Retourne le contenu décompressé d'une partie du modèle."""
+        for entry in self._entries:
+            if entry.name.decode("utf-8") == name:
+                if entry.method == zipfile.ZIP_STORED:
+                    return bytes(entry.data)
+                return zlib.decompress(entry.data, -15)
+        raise KeyError(name)
+
+    def _read_entries(self, template_bytes: bytes) -> List[_RawEntry]:
+        """Localise les données compressées de chaque entrée du modèle."""
+        entries = []
+        with zipfile.ZipFile(BytesIO(template_bytes)) as zf:
+            for info in zf.infolist():
+                if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                    raise ValueError(f"Méthode de compression non supportée pour {info.filename}")
+                header = _LOCAL_HEADER.unpack_from(template_bytes, info.header_offset)
+                name_len, extra_len = header[9], header[10]
+                start = info.header_offset + _LOCAL_HEADER.size + name_len + extra_len
+                data = self._buffer[start:start + info.compress_size]
+                entries.append(_RawEntry(info, data))
+        return entries
+
+    def _encode_part(self, data: bytes) -> tuple:
+        """Compresse une partie réécrite selon la politique configurée."""
+        crc = zlib.crc32(data)
+        if self.compression == COMPRESSION_STORE:
+            return zipfile.ZIP_STORED, crc, data
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15)
+        return zipfile.ZIP_DEFLATED, crc, compressor.compress(data) + compressor.flush()
+
+    def write(self, out_path: Path, parts: Dict[str, bytes]) -> Path:
+        """Écrit un DOCX où ``parts`` remplace les parties correspondantes du modèle."""
+        unknown = set(parts) - set(self.part_names)
+        if unknown:
+            raise KeyError(f"Parties absentes du modèle: {', '.join(sorted(unknown))}")
+
+        central = []
+        tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                offset = 0
+                for entry in self._entries:
+                    name = entry.name.decode("utf-8")
+                    if name in parts:
+                        raw = parts[name]
+                        method, crc, data = self._encode_part(raw)
+                        file_size = len(raw)
+                    else:
+                        method, crc, data = entry.method, entry.crc, entry.data
+                        file_size = entry.file_size
+                    compress_size = len(data)
+                    if offset > _ZIP32_LIMIT or compress_size > _ZIP32_LIMIT:
+                        raise ValueError("Archive trop volumineuse (ZIP64 non supporté)")
+
+                    f.write(_LOCAL_HEADER.pack(
+                        _LOCAL_SIGNATURE, _VERSION, entry.flags, method,
+                        entry.dos_time, entry.dos_date, crc, compress_size, file_size,
+                        len(entry.name), 0,
+                    ))
+                    f.write(entry.name)
+                    f.write(data)
+                    central.append(_CENTRAL_HEADER.pack(
+                        _CENTRAL_SIGNATURE, _VERSION, _VERSION, entry.flags, method,
+                        entry.dos_time, entry.dos_date, crc, compress_size, file_size,
+                        len(entry.name), 0, 0, 0, 0, entry.external_attr, offset,
+                    ) + entry.name)
+                    offset += _LOCAL_HEADER.size + len(entry.name) + compress_size
+
+                central_bytes = b"".join(central)
+                f.write(central_bytes)
+                f.write(_END_OF_CENTRAL_DIR.pack(
+                    _END_SIGNATURE, 0, 0, len(central), len(central),
+                    len(central_bytes), offset, 0,
+                ))
+            os.replace(tmp_path, out_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return out_path
@@ -4,9 +4,10 @@ Gestionnaire d'envoi d'emails via SMTP
 """
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional
 
 from config import SEND_EMAIL
+from outbox import Outbox
 from smtp_email_sender import SMTPEmailSender
 
 
@@ -18,13 +19,52 @@ class EmailSender:
         self.sender = SMTPEmailSender(enabled)
         logging.info("Système SMTP activé")
     
-    def send_emails_batch(self, rows: List[Dict[str, Any]], pdf_files: List[Path]) -> int:
+    def send_emails_batch(self, rows: List[Dict[str, Any]], pdf_files: List[Path],
+                          on_result: Optional[Callable[[int, bool], None]] = None) -> int:
         """Envoie les emails pour une liste de données."""
         if not self.enabled:
             logging.info("Envoi d'emails désactivé")
             return 0
         
-        return self.sender.send_emails_batch(rows, pdf_files)
+        return self.sender.send_emails_batch(rows, pdf_files, on_result)
+    
+    def is_ready(self) -> bool:
+        """Vérifie que l'envoi est activé et configuré."""
+        if not self.enabled:
+            logging.info("Envoi d'emails désactivé")
+            return False
+        return self.sender.is_ready()
+    
+    def send_email(self, row: Dict[str, Any], pdf_path: Optional[Path], index: Optional[int] = None,
+                   on_retried: Optional[Callable[[bool], None]] = None) -> Optional[bool]:
+        """Envoie l'email d'une seule ligne (None si l'envoi est différé, voir ``SMTPEmailSender.send_email``)."""
+        if not self.enabled:
+            return False
+        return self.sender.send_email(row, pdf_path, index, on_retried)
+    
+    def wait_deferred(self) -> None:
+        """Attend la fin des nouveaux essais des envois différés."""
+        self.sender.wait_deferred()
+    
+    def spool_email(self, row: Dict[str, Any], pdf_path: Optional[Path], outbox: Outbox,
+                    index: Optional[int] = None) -> Optional[Path]:
+        """Dépose l'email d'une ligne dans la boîte d'envoi (envoyé plus tard par l'expéditeur)."""
+        if not self.enabled:
+            return None
+        return self.sender.spool_email(row, pdf_path, outbox, index)
+    
+    def set_document_key(self, document_key: Callable[[Dict[str, Any]], str]) -> None:
+        """Identifie les pièces jointes par la clé de leur document (registre des envois)."""
+        self.sender.document_key = document_key
+    
+    @property
+    def skipped(self) -> int:
+        """Nombre d'emails ignorés car déjà remis (registre des envois)."""
+        return self.sender.skipped
+    
+    def close(self) -> None:
+        """Libère les ressources de l'expéditeur."""
+        self.sender.close()
     
     def test_connection(self) -> bool:
         """Teste la connexion SMTP."""
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Corps des emails compilé une fois (modèle HTML + signature), recompilé seulement
+quand l'un des fichiers change
+"""
+import html
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PLACEHOLDER_ALIASES, PLACEHOLDER_PATTERN
+from file_utils import read_text_smart
+from signature_images import InlineImage, SignatureImages
+from template_compiler import row_values
+
+# Intervalle minimal entre deux vérifications des dates de modification (secondes)
+MTIME_CHECK_INTERVAL = 2.0
+
+
+class CompiledBody:
+    """Corps HTML découpé en segments littéraux et champs à substituer.
+
+    ``parts`` alterne texte et nom de champ: le rendu est une seule jointure,
+    sans recherche de motif. ``images`` sont les images inline référencées par le corps.
+    """
+
+    def __init__(self, html: str, pattern: str = PLACEHOLDER_PATTERN,
+                 images: Optional[List[InlineImage]] = None):
+        self.parts: List[str] = re.split(pattern, html)
+        self.fields = sorted({field.upper() for field in self.parts[1::2]})
+        self.images = list(images or [])
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Remplit les champs (``values`` indexé en majuscules); un champ inconnu reste tel quel.
+
+        Les valeurs sont échappées: le texte d'une colonne CSV n'est jamais interprété comme du HTML.
+        """
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            field = parts[i].strip().upper()
+            parts[i] = html.escape(values[field]) if field in values else f"{{{{{parts[i]}}}}}"
+        return "".join(parts)
+
+
+class EmailBodyTemplate:
+    """Modèle d'email et signature lus et assemblés une seule fois.
+
+    Le corps est recompilé lorsque la date de modification du modèle ou de la
+    signature change (vérifiée au plus toutes les ``check_interval`` secondes).
+    Sans fichier de modèle, ``fallback`` est utilisé (``{nom}`` = nom du destinataire).
+    Avec ``images``, les images de la signature deviennent des parties inline.
+    """
+
+    def __init__(self, template_file: Optional[Path], signature_file: Optional[Path],
+                 fallback: str, check_interval: float = MTIME_CHECK_INTERVAL,
+                 images: Optional[SignatureImages] = None):
+        self.template_file = template_file
+        self.signature_file = signature_file
+        self.fallback = fallback
+        self.images = images
+        self.check_interval = check_interval
+        self.compilations = 0
+        self._compiled: Optional[CompiledBody] = None
+        self._mtimes: Tuple[Optional[int], Optional[int]] = (None, None)
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mtime(path: Optional[Path]) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns if path is not None else None
+        except OSError:
+            return None
+
+    def _read(self, path: Optional[Path], mtime: Optional[int], label: str) -> Optional[str]:
+        if mtime is None:
+            return None
+        try:
+            return read_text_smart(path)
+        except OSError as e:
+            logging.warning(f"[SMTP] Erreur chargement {label}: {e}")
+            return None
+
+    def _compile(self, mtimes: Tuple[Optional[int], Optional[int]]) -> CompiledBody:
+        template = self._read(self.template_file, mtimes[0], "template")
+        signature = self._read(self.signature_file, mtimes[1], "signature")
+        if template is None:
+            # Ancien format du corps de secours: {nom}
+            template = self.fallback.replace("{nom}", "{{NOM}}")
+        inline: List[InlineImage] = []
+        if signature and self.images is not None:
+            signature, inline = self.images.embed(signature)
+        self.compilations += 1
+        logging.debug(f"[SMTP] Corps d'email compilé (template: {mtimes[0] is not None}, "
+                      f"signature: {mtimes[1] is not None}, images: {len(inline)})")
+        return CompiledBody(template + (signature or ""), images=inline)
+
+    def compiled(self) -> CompiledBody:
+        """Corps compilé, recompilé si l'un des fichiers a changé."""
+        now = time.monotonic()
+        compiled = self._compiled
+        if compiled is not None and now - self._checked < self.check_interval:
+            return compiled
+        with self._lock:
+            mtimes = (self._mtime(self.template_file), self._mtime(self.signature_file))
+            if self._compiled is None or mtimes != self._mtimes:
+                self._compiled = self._compile(mtimes)
+                self._mtimes = mtimes
+            self._checked = now
+            return self._compiled
+
+    @staticmethod
+    def values(name: str, row: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Valeurs des champs: colonnes de la ligne (mêmes alias que les documents),
+        ``NOM`` et ``DATE_SOUMISSION``."""
+        values = row_values(row or {}, PLACEHOLDER_ALIASES)
+        values["NOM"] = name
+        values["DATE_SOUMISSION"] = datetime.now().strftime("%d/%m/%Y")
+        return values
+
+    def render(self, name: str, row: Optional[Dict[str, Any]] = None) -> str:
+        """Corps HTML d'un email."""
+        return self.compiled().render(self.values(name, row))
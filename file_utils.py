@@ -2,12 +2,26 @@
 """
 Utilitaires pour la gestion des fichiers
 """
+import codecs
 import csv
+import io
 import logging
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import platform
 
+# Lecture des CSV: taille du bloc analysé pour détecter le format, délimiteurs
+# reconnus et taille des plages lues en parallèle
+CSV_SAMPLE_SIZE = 64 * 1024
+CSV_DELIMITERS = ",;\t|"
+CSV_CHUNK_SIZE = 8 * 1024 * 1024
+# Encodages essayés dans l'ordre (latin-1 décode tout octet)
+CSV_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
 
 def safe_filename(name: str) -> str:
     """Crée un nom de fichier sécurisé à partir d'une chaîne."""
@@ -32,8 +46,212 @@ def read_text_smart(path: Path) -> str:
     return data.decode("utf-8", errors="replace")
 
 
-def read_csv_rows(csv_file: Path) -> List[Dict[str, Any]]:
-    """Lit les lignes d'un fichier CSV et retourne une liste de dictionnaires."""
+def link_or_copy(source: Path, target: Path) -> Path:
+    """Partage un fichier sous un autre nom: lien physique, ou copie si impossible.
+    
+    La cible est remplacée de façon atomique si elle existe déjà.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        # Système de fichiers sans liens physiques (FAT, partage réseau...)
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+def detect_csv_format(csv_file: Path, sample_size: int = CSV_SAMPLE_SIZE) -> Tuple[str, Dict[str, Any]]:
+    """Détecte l'encodage et le format (délimiteur, guillemets) du fichier.
+    
+    L'encodage et le format sont déduits du premier bloc seulement: le reste du
+    fichier est vérifié pendant la lecture (voir ``iter_csv_rows``).
+    Retourne (encodage, paramètres du lecteur csv).
+    """
+    with open(csv_file, "rb") as f:
+        sample = f.read(sample_size)
+        partial = bool(f.read(1))
+    
+    encodings = ("utf-8-sig",) if sample.startswith(codecs.BOM_UTF8) else CSV_ENCODINGS
+    encoding, text = "latin-1", sample.decode("latin-1")
+    for enc in encodings:
+        try:
+            text = sample.decode(enc)
+        except UnicodeDecodeError as e:
+            # Caractère multi-octets coupé par la fin du bloc: l'encodage reste valide
+            if not partial or e.start < len(sample) - 3:
+                continue
+            text = sample[:e.start].decode(enc)
+        encoding = enc
+        break
+    
+    try:
+        dialect = csv.Sniffer().sniff(text[:text.rfind("\n") + 1] or text, delimiters=CSV_DELIMITERS)
+    except csv.Error:
+        dialect = csv.excel
+    params = {
+        "delimiter": dialect.delimiter,
+        "quotechar": dialect.quotechar or '"',
+        "doublequote": dialect.doublequote,
+        "skipinitialspace": dialect.skipinitialspace,
+        "escapechar": dialect.escapechar,
+    }
+    return encoding, params
+
+
+def _normalize_row(row: Dict[Optional[str], Any]) -> Optional[Dict[str, Any]]:
+    """Nettoie une ligne CSV; retourne None si elle n'a pas de nom."""
+    # Conserver toutes les colonnes pour les placeholders {{COLONNE}}
+    values = {
+        key.strip(): (value or "").strip()
+        for key, value in row.items() if key is not None and not isinstance(value, list)
+    }
+    if not values.get("nom"):
+        return None
+    values.setdefault("email", "")
+    return values
+
+
+def _read_csv_records(csv_file: Path, encoding: str, params: Dict[str, Any],
+                      skip: int = 0) -> Iterator[Dict[str, Any]]:
+    """Lit les lignes d'un CSV à partir de la ligne ``skip`` (lignes non vides, en-tête exclu).
+    
+    L'encodage est vérifié au fil de la lecture. Si un octet ne se décode pas et
+    que tout le texte lu jusque-là était en ASCII (identique dans chaque
+    encodage), la lecture reprend au même endroit avec l'encodage suivant;
+    sinon l'erreur est levée: des lignes déjà produites auraient été mal décodées.
+    """
+    fallbacks = list(CSV_ENCODINGS[CSV_ENCODINGS.index(encoding) + 1:]) if encoding in CSV_ENCODINGS else []
+    while True:
+        ascii_only = True
+        
+        def lines(f) -> Iterator[str]:
+            nonlocal ascii_only
+            for line in f:
+                ascii_only = ascii_only and line.isascii()
+                yield line
+        
+        read = 0
+        try:
+            with open(csv_file, newline="", encoding=encoding) as f:
+                for row in csv.DictReader(lines(f), **params):
+                    read += 1
+                    if read <= skip:
+                        continue
+                    values = _normalize_row(row)
+                    if values is not None:
+                        yield values
+            return
+        except UnicodeDecodeError:
+            if not fallbacks or not ascii_only:
+                raise
+            logging.warning(f"CSV {csv_file.name}: le fichier n'est pas entièrement en {encoding} "
+                            f"(après {read} ligne(s)), lecture poursuivie en {fallbacks[0]}")
+            encoding = fallbacks.pop(0)
+            skip = max(skip, read)
+
+
+def iter_csv_rows(csv_file: Path) -> Iterator[Dict[str, Any]]:
+    """Lit un fichier CSV ligne à ligne (encodage et délimiteur détectés).
+    
+    Les lignes sont produites au fur et à mesure de la lecture: le traitement
+    peut commencer avant que la fin du fichier ait été lue. Un export cp1252
+    dont le premier accent suit le bloc analysé est relu dans le bon encodage
+    à partir de cette ligne (voir ``_read_csv_records``).
+    """
+    encoding, params = detect_csv_format(csv_file)
+    logging.debug(f"CSV {csv_file.name}: encodage {encoding}, délimiteur {params['delimiter']!r}")
+    yield from _read_csv_records(csv_file, encoding, params)
+
+
+def _parse_csv_chunk(task: Tuple[str, int, int, str, List[str], Dict[str, Any]]
+                     ) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    """Analyse une plage d'octets d'un CSV dans un processus de lecture.
+    
+    Retourne (nombre de lignes lues, lignes retenues), ou None si la plage ne
+    peut pas être analysée seule: octet non décodable, ou champ entre
+    guillemets sur plusieurs lignes (peut-être coupé par la limite de la plage).
+    """
+    path, start, end, encoding, fieldnames, params = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    try:
+        text = io.StringIO(data.decode(encoding), newline="")
+    except UnicodeDecodeError:
+        return None
+    read = 0
+    rows = []
+    for row in csv.DictReader(text, fieldnames=fieldnames, **params):
+        read += 1
+        for value in row.values():
+            for field in (value if isinstance(value, list) else [value]):
+                if field and ("\n" in field or "\r" in field):
+                    return None
+        values = _normalize_row(row)
+        if values is not None:
+            rows.append(values)
+    return read, rows
+
+
+def iter_csv_rows_parallel(csv_file: Path, workers: int, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Lit un gros fichier CSV par plages d'octets analysées dans des processus parallèles.
+    
+    Les plages sont alignées sur les fins de ligne et leurs lignes produites dans
+    l'ordre du fichier; seules quelques plages sont en mémoire à la fois. Dès
+    qu'une plage ne peut pas être analysée seule (champ entre guillemets sur
+    plusieurs lignes, octet non décodable), la suite du fichier est lue par le
+    lecteur séquentiel, à partir de la première ligne de cette plage.
+    """
+    encoding, params = detect_csv_format(csv_file)
+    with open(csv_file, "rb") as f:
+        header = f.readline()
+        if encoding == "utf-8-sig":
+            header = header[len(codecs.BOM_UTF8):]
+        fieldnames = next(csv.reader([header.decode(encoding.replace("-sig", ""))], **params), [])
+        size = os.fstat(f.fileno()).st_size
+        bounds = [f.tell()]
+        while bounds[-1] < size:
+            f.seek(min(bounds[-1] + chunk_size, size))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    
+    chunk_encoding = encoding.replace("-sig", "")
+    tasks = [(str(csv_file), start, end, chunk_encoding, fieldnames, params)
+             for start, end in zip(bounds, bounds[1:]) if end > start]
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        # Fenêtre glissante: limite le nombre de plages analysées d'avance
+        window = max(1, workers) * 2
+        futures = deque(executor.submit(_parse_csv_chunk, task) for task in tasks[:window])
+        next_task = len(futures)
+        read = 0
+        while futures:
+            result = futures.popleft().result()
+            if result is None:
+                for future in futures:
+                    future.cancel()
+                break
+            if next_task < len(tasks):
+                futures.append(executor.submit(_parse_csv_chunk, tasks[next_task]))
+                next_task += 1
+            read += result[0]
+            yield from result[1]
+        else:
+            return
+    logging.info(f"CSV {csv_file.name}: lecture séquentielle à partir de la ligne {read + 1} "
+                 f"(plage non analysable seule)")
+    yield from _read_csv_records(csv_file, encoding, params, skip=read)
+
+
+def read_csv_rows(csv_file: Path, workers: int = 1) -> List[Dict[str, Any]]:
+    """Lit les lignes d'un fichier CSV et retourne une liste de dictionnaires.
+    
+    Avec ``workers`` > 1, le fichier est analysé par plages dans des processus
+    parallèles (voir ``iter_csv_rows_parallel``).
+    """
     rows: List[Dict[str, Any]] = []
     
     if not csv_file.exists():
@@ -41,14 +259,14 @@ def read_csv_rows(csv_file: Path) -> List[Dict[str, Any]]:
         return rows
     
     try:
-        with open(csv_file, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                name = (row.get("nom") or "").strip()
-                email = (row.get("email") or "").strip()
-                if name:
-                    rows.append({"nom": name, "email": email})
+        if workers > 1:
+            rows.extend(iter_csv_rows_parallel(csv_file, workers))
+        else:
+            rows.extend(iter_csv_rows(csv_file))
     except Exception as e:
-        logging.error(f"Erreur lors de la lecture du CSV: {e}")
+        # Ne jamais traiter un fichier lu en partie
+        logging.error(f"Erreur lors de la lecture du CSV après {len(rows)} ligne(s), "
+                      f"aucune ligne retenue: {e}")
+        return []
     
     return rows
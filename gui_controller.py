@@ -3,7 +3,6 @@
 Contrôleur pour l'interface graphique - gère la logique métier
 """
 import threading
-from pathlib import Path
 from typing import Optional
 
 from gui import DocumentGeneratorGUI
@@ -140,13 +139,23 @@ class GUIController:
             return []
 
     def _generate_documents(self, rows):
-        """Génère les documents Word et PDF."""
+        """Génère les documents Word et PDF.
+
+        Les documents sont rendus ligne par ligne pour afficher la progression et
+        permettre l'arrêt: contrairement à ``main.py``, l'interface n'utilise ni le
+        mode "stamp", ni le cache des sorties, ni le partage des documents identiques.
+        """
         self.gui.add_log("📝 Génération des documents...", "INFO")
 
+        generator = None
         try:
-            generator = DocumentGenerator(self.gui.app_state.template_path)
+            generator = DocumentGenerator(self.gui.app_state.template_path, mode="docx", cache_path=None)
+            for field in generator.check_columns(rows):
+                self.gui.add_log(f"⚠️ Placeholder sans colonne CSV: {{{{{field}}}}}", "WARNING")
+            out_paths = generator.plan_output_paths(rows)
             docx_files = []
             pdf_files = []
+            emails = []
 
             total = len(rows)
             for i, row in enumerate(rows):
@@ -161,19 +170,28 @@ class GUIController:
 
                 try:
                     # Générer le document Word
-                    docx_path = generator.generate_document(name, i + 1)
+                    docx_path = generator.generate_document(name, i + 1, row, out_paths[i])
                     docx_files.append(docx_path)
-
-                    # Convertir en PDF
-                    pdf_path = generator.convert_to_pdf(docx_path, row.get('email', ''))
-                    pdf_files.append(pdf_path)
-
-                    self.gui.add_log(f"✅ Document généré: {name}", "INFO")
+                    emails.append(row.get('email', ''))
 
                 except Exception as e:
                     self.gui.add_log(f"❌ Erreur pour {name}: {e}", "ERROR")
                     continue
 
+            # Convertir tous les documents en PDF avec le pool de convertisseurs
+            self.gui.add_log(f"📄 Conversion PDF de {len(docx_files)} document(s)...", "INFO")
+            results = generator.convert_to_pdf_batch(
+                docx_files, emails,
+                progress=lambda done, count, docx: self.gui.update_progress(done, count, f"Conversion: {docx.stem}"),
+            )
+            for docx_path in docx_files:
+                result = results[docx_path]
+                if result['erreur']:
+                    self.gui.add_log(f"❌ Erreur de conversion pour {docx_path.stem}: {result['erreur']}", "ERROR")
+                else:
+                    pdf_files.append(result['pdf'])
+                    self.gui.add_log(f"✅ Document généré: {docx_path.stem}", "INFO")
+
             self.gui.update_progress(total, total, "Génération terminée")
             self.gui.add_log(f"✅ {len(docx_files)} DOCX et {len(pdf_files)} PDF générés", "INFO")
 
@@ -183,6 +201,10 @@ class GUIController:
             self.gui.add_log(f"❌ Erreur lors de la génération: {e}", "ERROR")
             self.gui.show_error("Erreur", f"Erreur lors de la génération:\n{str(e)}")
             return [], []
+        finally:
+            # Arrêter les convertisseurs (Word, LibreOffice) même en cas d'erreur
+            if generator is not None:
+                generator.close()
 
     def _send_emails(self, rows, pdf_files):
         """Envoie les emails avec les PDF en pièce jointe."""
@@ -190,9 +212,16 @@ class GUIController:
 
         try:
             email_sender = EmailSender(enabled=True)
+            generator = DocumentGenerator(self.gui.app_state.template_path, mode="docx", cache_path=None)
+            email_sender.set_document_key(generator.content_key)
             self.gui.add_log("Envoi des emails...", "INFO")
-            sent_count = email_sender.send_emails_batch(rows, pdf_files)
+            try:
+                sent_count = email_sender.send_emails_batch(rows, pdf_files)
+            finally:
+                email_sender.close()
             self.gui.add_log(f"✅ {sent_count}/{len(rows)} emails envoyés", "INFO")
+            if email_sender.skipped:
+                self.gui.add_log(f"⏭️ {email_sender.skipped} email(s) déjà envoyé(s), ignoré(s)", "INFO")
             return sent_count
 
         except Exception as e:
@@ -3,25 +3,40 @@
 Point d'entrée principal du générateur de documents Word
 Support du mode CLI et GUI
 """
+import argparse
+import signal
 import sys
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
-from config import TEMPLATE, CSV_FILE, OUT_DOCX_DIR, OUT_PDF_DIR
+from config import (
+    TEMPLATE, CSV_FILE, OUT_DOCX_DIR, OUT_PDF_DIR,
+    PIPELINE_MODE, PIPELINE_QUEUE_SIZE, PIPELINE_WORKERS, JOURNAL_FILE, CSV_READ_WORKERS,
+    VALIDATION_WORKERS, SPOOL_MODE, OUTBOX_DIR
+)
 from logger_config import setup_logging
-from file_utils import read_csv_rows
-from document_generator import DocumentGenerator
+from file_utils import iter_csv_rows, iter_csv_rows_parallel, read_csv_rows
+from document_generator import DocumentGenerator, DocumentPlanner
 from email_sender import EmailSender
+from outbox import NEW_DIR, Outbox, OutboxWorker
+from pipeline import Pipeline, Stage
+from run_journal import RunJournal, RENDERED, CONVERTED, SENT, SPOOLED, FAILED, SEND_STAGE, converted_pdf
+from smtp_email_sender import SMTPEmailSender
 from validators import DataValidator
 
 
 class WordBatchGenerator:
     """Classe principale pour orchestrer la génération de documents et l'envoi d'emails."""
 
-    def __init__(self):
+    def __init__(self, spool: bool = SPOOL_MODE):
         self.logger = setup_logging()
         self.document_generator = None
         self.email_sender = EmailSender()
+        # Mode boîte d'envoi: emails déposés sur disque, envoyés par --outbox-worker
+        self.outbox: Optional[Outbox] = Outbox(OUTBOX_DIR) if spool else None
+        self.journal: Optional[RunJournal] = None
+        self.run_id: Optional[int] = None
 
     def validate_environment(self) -> bool:
         """Valide l'environnement et les fichiers requis."""
@@ -52,85 +67,467 @@ class WordBatchGenerator:
         """Charge et valide les données CSV."""
         self.logger.info("Chargement des données...")
 
-        rows = read_csv_rows(CSV_FILE)
+        rows = read_csv_rows(CSV_FILE, CSV_READ_WORKERS)
         if not rows:
             self.logger.error("[ERREUR] Aucune ligne valide dans le CSV (colonne 'nom' requise).")
             return []
 
         # Valider les données
-        is_valid, errors = DataValidator.validate_csv_data(rows)
+        self.report_invalid_rows(rows)
+
+        self.logger.info(f"Données chargées: {len(rows)} entrée(s)")
+        return rows
+
+    def stream_data(self) -> Iterator[Dict[str, Any]]:
+        """Lit les lignes CSV en flux: la première ligne peut être traitée avant la fin de la lecture."""
+        self.logger.info("Lecture des données en flux...")
+        if CSV_READ_WORKERS > 1:
+            return iter_csv_rows_parallel(CSV_FILE, CSV_READ_WORKERS)
+        return iter_csv_rows(CSV_FILE)
+
+    def report_invalid_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Signale les lignes invalides (noms manquants, emails invalides)."""
+        is_valid, errors = DataValidator.validate_csv_data(rows, VALIDATION_WORKERS)
         if not is_valid:
             for error in errors:
                 self.logger.warning(f"[WARN] {error}")
 
-        self.logger.info(f"Données chargées: {len(rows)} entrée(s)")
-        return rows
+    def open_journal(self, rows: List[Dict[str, Any]], resume: bool = False) -> Dict[int, Dict[str, Any]]:
+        """Ouvre le journal du lancement.
+
+        En reprise, continue le dernier lancement de ce CSV et retourne l'état des
+        lignes déjà traitées (par index); sinon un nouveau lancement est créé.
+        """
+        self.journal = RunJournal(JOURNAL_FILE)
+        run_id = self.journal.latest_run(CSV_FILE) if resume else None
+        if run_id is None:
+            if resume:
+                self.logger.warning("Aucun lancement à reprendre pour ce CSV: nouveau lancement")
+            self.run_id = self.journal.start_run(CSV_FILE, TEMPLATE, rows)
+            self.logger.info(f"Journal: lancement n°{self.run_id} ({JOURNAL_FILE})")
+            return {}
+
+        self.run_id = run_id
+        done = self.journal.resume_run(run_id, rows)
+        sent = sum(1 for record in done.values() if record['status'] == SENT)
+        self.logger.info(f"Reprise du lancement n°{run_id}: {len(done)} ligne(s) déjà traitée(s), "
+                         f"dont {sent} email(s) déjà envoyé(s)")
+        return done
+
+    def open_streaming_journal(self, resume: bool = False) -> Optional[Dict[int, Dict[str, Any]]]:
+        """Ouvre le journal d'un lancement dont les lignes sont lues en flux.
 
-    def generate_documents(self, rows: List[Dict[str, Any]]) -> Tuple[List[Path], List[Path]]:
-        """Génère les documents Word et PDF."""
+        Les lignes y sont inscrites à la lecture (voir ``RunJournal.register_row``).
+        En reprise, retourne l'état enregistré des lignes du dernier lancement de ce CSV.
+        """
+        self.journal = RunJournal(JOURNAL_FILE)
+        run_id = self.journal.latest_run(CSV_FILE) if resume else None
+        if run_id is None:
+            if resume:
+                self.logger.warning("Aucun lancement à reprendre pour ce CSV: nouveau lancement")
+            self.run_id = self.journal.start_run(CSV_FILE, TEMPLATE, [])
+            self.logger.info(f"Journal: lancement n°{self.run_id} ({JOURNAL_FILE})")
+            return None
+        self.run_id = run_id
+        self.logger.info(f"Reprise du lancement n°{run_id}")
+        return self.journal.reopen_run(run_id)
+
+    def _record(self, index: int, status: str, path: Optional[Path] = None,
+                error: Optional[str] = None, stage: Optional[str] = None) -> None:
+        """Inscrit l'état d'une ligne dans le journal."""
+        if self.journal is not None:
+            self.journal.mark(self.run_id, index, status, path, error, stage)
+
+    @staticmethod
+    def _generated_pdf(record: Optional[Dict[str, Any]]) -> Optional[Path]:
+        """PDF déjà produit d'après le journal (s'il existe toujours)."""
+        pdf = converted_pdf(record)
+        if pdf is not None and Path(pdf).exists():
+            return Path(pdf)
+        return None
+
+    def generate_documents(self, rows: List[Dict[str, Any]],
+                           done: Optional[Dict[int, Dict[str, Any]]] = None
+                           ) -> Tuple[List[Path], Dict[int, Path]]:
+        """Génère les documents Word et PDF des lignes pas encore traitées.
+
+        Retourne (DOCX générés ou repris du cache, PDF par index de ligne).
+        """
         self.logger.info("Génération des documents...")
+        done = done or {}
 
         try:
             self.document_generator = DocumentGenerator(TEMPLATE)
-            docx_files, pdf_files = self.document_generator.generate_documents_batch(rows)
+            generator = self.document_generator
+            self.email_sender.set_document_key(generator.content_key)
+            out_paths = generator.plan_output_paths(rows)
+            pdf_by_row: Dict[int, Path] = {}
+            for i in range(len(rows)):
+                pdf_path = self._generated_pdf(done.get(i))
+                if pdf_path is not None:
+                    pdf_by_row[i] = pdf_path
+            todo = [i for i in range(len(rows)) if i not in pdf_by_row]
+            if pdf_by_row:
+                self.logger.info(f"{len(pdf_by_row)} document(s) déjà générés, ignorés")
+
+            def record(j: int, status: str, path: Optional[Path], error: Optional[str]) -> None:
+                if status == CONVERTED:
+                    pdf_by_row[todo[j]] = path
+                self._record(todo[j], status, path, error, "generation")
 
-            self.logger.info(f"[OK] {len(docx_files)} DOCX générés -> {OUT_DOCX_DIR}")
-            self.logger.info(f"[OK] {len(pdf_files)} PDF générés -> {OUT_PDF_DIR}")
+            docx_files: List[Path] = []
+            if todo:
+                docx_files, _ = generator.generate_documents_batch(
+                    [rows[i] for i in todo], out_paths=[out_paths[i] for i in todo], on_result=record
+                )
 
-            return docx_files, pdf_files
+            reused = self.reused_docx_count()
+            self.logger.info(f"[OK] {len(docx_files) - reused} DOCX générés"
+                             + (f", {reused} repris du cache" if reused else "") + f" -> {OUT_DOCX_DIR}")
+            self.logger.info(f"[OK] {len(pdf_by_row)} PDF disponibles -> {OUT_PDF_DIR}")
+
+            return docx_files, pdf_by_row
 
         except Exception as e:
             self.logger.error(f"[ERREUR] Génération des documents: {e}")
             if "docx2pdf" in str(e).lower():
                 self.logger.error("docx2pdf nécessite Microsoft Word installé sous Windows.")
-                self.logger.error("Alternative: LibreOffice headless -> voir README.md.")
+                self.logger.error("Alternative: PDF_BACKEND=libreoffice (LibreOffice headless) -> voir README.md.")
             raise
+        finally:
+            if self.document_generator is not None:
+                self.document_generator.close()
+
+    def reused_docx_count(self) -> int:
+        """Nombre de DOCX repris du cache des sorties au lieu d'être rendus."""
+        generator = self.document_generator
+        if generator is None or generator.mode != "docx":
+            return 0
+        return generator.cache_hits
 
-    def send_emails(self, rows: List[Dict[str, Any]], pdf_files: List[Path]) -> int:
-        """Envoie les emails avec les PDF en pièce jointe."""
+    def send_emails(self, rows: List[Dict[str, Any]], pdf_by_row: Dict[int, Path],
+                    done: Optional[Dict[int, Dict[str, Any]]] = None) -> int:
+        """Envoie les emails avec les PDF en pièce jointe.
+
+        Seules les lignes dont le PDF a été produit et qui n'ont pas déjà été
+        envoyées (d'après le journal) sont traitées. En mode boîte d'envoi, les
+        emails sont déposés au lieu d'être envoyés.
+        """
+        done = done or {}
+        indices = [i for i in sorted(pdf_by_row) if done.get(i, {}).get('status') not in (SENT, SPOOLED)]
+        if self.outbox is not None:
+            return self.spool_emails(rows, pdf_by_row, indices)
         self.logger.info("Envoi des emails...")
 
+        def record(j: int, ok: bool) -> None:
+            i = indices[j]
+            if ok:
+                self._record(i, SENT)
+            elif (rows[i].get('email') or '').strip():
+                self._record(i, FAILED, error="échec de l'envoi", stage=SEND_STAGE)
+
         try:
-            sent_count = self.email_sender.send_emails_batch(rows, pdf_files)
+            sent_count = self.email_sender.send_emails_batch(
+                [rows[i] for i in indices], [pdf_by_row[i] for i in indices], on_result=record
+            )
             return sent_count
         except Exception as e:
             self.logger.error(f"[ERREUR] Envoi des emails: {e}")
             raise
 
-    def run(self) -> int:
-        """Exécute le processus complet."""
+    def spool_emails(self, rows: List[Dict[str, Any]], pdf_by_row: Dict[int, Path],
+                     indices: List[int]) -> int:
+        """Dépose les emails des lignes ``indices`` dans la boîte d'envoi; retourne leur nombre."""
+        self.logger.info(f"Dépôt des emails dans la boîte d'envoi ({self.outbox.root})...")
+        spooled = 0
+        for i in indices:
+            try:
+                if self.email_sender.spool_email(rows[i], pdf_by_row[i], self.outbox, i) is not None:
+                    self._record(i, SPOOLED)
+                    spooled += 1
+            except Exception as e:
+                self.logger.error(f"[ERREUR] Dépôt de l'email de la ligne {i + 1}: {e}")
+                self._record(i, FAILED, error=str(e), stage=SEND_STAGE)
+        self.logger.info(f"[OK] {spooled} email(s) déposé(s) -> {self.outbox.root / NEW_DIR}")
+        return spooled
+
+    def run_pipeline(self, rows: Iterable[Dict[str, Any]],
+                     known: Optional[Dict[int, Dict[str, Any]]] = None) -> Tuple[int, int, int, int]:
+        """Traite chaque ligne en flux: rendu, conversion PDF puis envoi, sans attendre le lot.
+
+        ``rows`` peut être lu au fur et à mesure (voir ``stream_data``): chaque ligne
+        est inscrite au journal et entre dans le pipeline dès sa lecture. En reprise
+        (``known``, voir ``open_streaming_journal``), les lignes déjà envoyées sont
+        ignorées; celles dont le PDF existe déjà passent directement à l'envoi.
+        Comme en traitement par lot, les lignes identiques partagent le PDF de la
+        première et les documents inchangés sont repris du cache des sorties.
+        Retourne (DOCX générés, PDF générés, emails envoyés, lignes lues).
+        """
+        self.logger.info("Traitement en pipeline (rendu -> PDF -> envoi)...")
+        self.document_generator = DocumentGenerator(TEMPLATE)
+        generator = self.document_generator
+        self.email_sender.set_document_key(generator.content_key)
+        planner = DocumentPlanner(generator)
+        send_enabled = self.outbox is None and self.email_sender.is_ready()
+        skipped_before = self.email_sender.skipped
+        read: List[Dict[str, Any]] = []
+
+        def jobs() -> Iterator[Dict[str, Any]]:
+            resumed = 0
+            # Lignes identiques à une ligne encore en cours: elles entrent dans le
+            # pipeline dès que son PDF est prêt (ou en échec)
+            followers: List[Dict[str, Any]] = []
+            documents: Dict[int, Dict[str, Any]] = {}
+            for i, row in enumerate(rows):
+                if i == 0:
+                    generator.check_columns([row])
+                read.append(row)
+                out_path = planner.output_path(row)
+                record = None
+                if self.journal is not None:
+                    record = self.journal.register_row(self.run_id, i, row, known)
+                if record is not None and record['status'] in (SENT, SPOOLED):
+                    resumed += 1
+                    continue
+                job = {'index': i, 'nom': row.get('nom', 'inconnu'), 'row': row,
+                       'out_path': out_path, 'record': record}
+                first = planner.first_identical(i, row)
+                if first is None:
+                    job['document'] = documents[i] = {'pret': threading.Event(), 'out_path': out_path,
+                                                      'pdf': None, 'erreur': None}
+                    yield job
+                else:
+                    job['source'] = documents[first]
+                    followers.append(job)
+                ready = [job for job in followers if job['source']['pret'].is_set()]
+                followers = [job for job in followers if not job['source']['pret'].is_set()]
+                yield from ready
+            if resumed:
+                self.logger.info(f"{resumed} email(s) déjà envoyé(s) lors du lancement repris, ignoré(s)")
+            for job in followers:
+                job['source']['pret'].wait()
+                yield job
+
+        def render(job: Dict[str, Any]) -> Dict[str, Any]:
+            out_path = job['out_path']
+            pdf_path = self._generated_pdf(job['record'])
+            if pdf_path is not None:
+                job['pdf'] = pdf_path
+                job['repris'] = True
+                return job
+            source = job.get('source')
+            if source is not None:
+                # Même document qu'une ligne précédente: son PDF est partagé
+                if source['pdf'] is None:
+                    raise RuntimeError(source['erreur'] or "échec du document identique")
+                job['pdf'] = generator.share_pdf(source['pdf'], source['out_path'], job['row'])
+                job['partage'] = True
+                self._record(job['index'], CONVERTED, job['pdf'])
+                return job
+            job['cle'] = generator.cache_key_for(job['row'])
+            cached = generator.fetch_cached(job['row'], job['cle'], out_path)
+            if cached is not None:
+                docx_path, job['pdf'] = cached
+                if docx_path is not None:
+                    job['docx'] = docx_path
+                    self._record(job['index'], RENDERED, docx_path)
+                self._record(job['index'], CONVERTED, job['pdf'])
+                job['cache'] = True
+                return job
+            if generator.mode == "stamp":
+                # Le PDF est produit directement à partir du PDF de base du modèle
+                job['pdf'] = generator.stamp_document(
+                    job['nom'], job['row'], generator.pdf_path_for(out_path, job['row'].get('email', ''))
+                )
+                self._record(job['index'], CONVERTED, job['pdf'])
+                generator.store_cached(job['cle'], None, job['pdf'])
+                return job
+            job['docx'] = generator.generate_document(job['nom'], job['index'] + 1, job['row'], out_path)
+            self._record(job['index'], RENDERED, job['docx'])
+            return job
+
+        def convert(job: Dict[str, Any]) -> Dict[str, Any]:
+            if job.get('pdf'):
+                return job
+            job['pdf'] = generator.convert_to_pdf(job['docx'], job['row'].get('email', ''))
+            self._record(job['index'], CONVERTED, job['pdf'])
+            generator.store_cached(job['cle'], job['docx'], job['pdf'])
+            self.logger.info(f"Document généré: {job['docx'].name} -> {job['pdf'].name}")
+            return job
+
+        def converted(job: Dict[str, Any]) -> None:
+            # Libère les lignes identiques en attente de ce document
+            document = job.get('document')
+            if document is not None:
+                document['pdf'] = None if job.get('erreur') else job.get('pdf')
+                document['erreur'] = job.get('erreur')
+                document['pret'].set()
+
+        def send(job: Dict[str, Any]) -> Dict[str, Any]:
+            if self.outbox is not None:
+                # Le rendu n'attend pas le relais SMTP: l'email est déposé sur disque
+                if self.email_sender.spool_email(job['row'], job['pdf'], self.outbox, job['index']) is not None:
+                    job['depose'] = True
+                    self._record(job['index'], SPOOLED)
+                return job
+            if send_enabled and (job['row'].get('email') or '').strip():
+                # Un échec temporaire est renvoyé plus tard sans bloquer l'étape d'envoi
+                sent = self.email_sender.send_email(job['row'], job['pdf'], job['index'],
+                                                    on_retried=lambda ok: retried(job, ok))
+                if sent is None:
+                    job['differe'] = True
+                    return job
+                if not sent:
+                    raise RuntimeError("échec de l'envoi")
+                job['envoye'] = True
+                self._record(job['index'], SENT)
+            return job
+
+        def retried(job: Dict[str, Any], ok: bool) -> None:
+            if ok:
+                job['envoye'] = True
+                self._record(job['index'], SENT)
+            else:
+                job['erreur'] = "échec de l'envoi"
+                job['etape_echec'] = SEND_STAGE
+
+        stages = [
+            Stage("rendu", render, PIPELINE_WORKERS.get("render", 1)),
+            Stage("conversion", convert, PIPELINE_WORKERS.get("convert", 1), on_done=converted),
+            Stage(SEND_STAGE, send, PIPELINE_WORKERS.get("send", 1)),
+        ]
+        try:
+            results = Pipeline(stages, PIPELINE_QUEUE_SIZE).run(jobs())
+            deferred = sum(1 for job in results if job.get('differe'))
+            if deferred:
+                self.logger.info(f"Attente des nouveaux essais de {deferred} email(s) différé(s)...")
+                self.email_sender.wait_deferred()
+            generator.evict_cache()
+        finally:
+            generator.close()
+        if read:
+            self.report_invalid_rows(read)
+
+        shared = sum(1 for job in results if job.get('partage'))
+        if shared:
+            self.logger.info(f"{shared} PDF partagé(s) entre lignes identiques au lieu d'être régénérés")
+        cached = sum(1 for job in results if job.get('cache'))
+        if cached:
+            self.logger.info(f"Cache des sorties: {cached} document(s) réutilisé(s)")
+        for job in results:
+            if job.get('erreur'):
+                self._record(job['index'], FAILED, error=job['erreur'], stage=job.get('etape_echec'))
+        docx_count = sum(1 for job in results if job.get('docx') and not job.get('cache'))
+        pdf_count = sum(1 for job in results if job.get('pdf') and not job.get('repris') and not job.get('cache'))
+        # Les emails déjà remis (registre des envois) sont comptés à part
+        sent_count = (sum(1 for job in results if job.get('envoye') or job.get('depose'))
+                      - (self.email_sender.skipped - skipped_before))
+        return docx_count, pdf_count, sent_count, len(read)
+
+    def run(self, pipeline: bool = PIPELINE_MODE, resume: bool = False) -> int:
+        """Exécute le processus complet.
+
+        Avec ``resume``, reprend le dernier lancement journalisé de ce CSV et
+        ignore le travail déjà terminé.
+        """
         try:
             # Validation de l'environnement
             if not self.validate_environment():
                 return 1
 
-            # Chargement des données
-            rows = self.load_data()
-            if not rows:
-                return 1
+            if pipeline:
+                # Les lignes sont lues en flux: le rendu commence dès la première
+                known = self.open_streaming_journal(resume)
+                docx_count, pdf_count, sent_count, row_count = self.run_pipeline(self.stream_data(), known)
+                if not row_count:
+                    self.logger.error("[ERREUR] Aucune ligne valide dans le CSV (colonne 'nom' requise).")
+                    return 1
+            else:
+                # Chargement des données
+                rows = self.load_data()
+                if not rows:
+                    return 1
+                row_count = len(rows)
+                done = self.open_journal(rows, resume)
 
-            # Génération des documents
-            docx_files, pdf_files = self.generate_documents(rows)
+                # Génération des documents
+                docx_files, pdf_by_row = self.generate_documents(rows, done)
+                # Les documents repris du cache des sorties sont comptés à part
+                docx_count = len(docx_files) - self.reused_docx_count()
+                pdf_count = len(pdf_by_row) - self.document_generator.cache_hits
 
-            # Envoi des emails
-            sent_count = self.send_emails(rows, pdf_files)
+                # Envoi des emails
+                sent_count = self.send_emails(rows, pdf_by_row, done)
 
             # Résumé final
             self.logger.info("=== RÉSUMÉ ===")
-            self.logger.info(f"Documents générés: {len(docx_files)} DOCX, {len(pdf_files)} PDF")
-            self.logger.info(f"Emails envoyés: {sent_count}/{len(rows)}")
+            reused = self.document_generator.cache_hits if self.document_generator is not None else 0
+            self.logger.info(f"Documents générés: {docx_count} DOCX, {pdf_count} PDF"
+                             + (f" ({reused} document(s) repris du cache)" if reused else ""))
+            self.logger.info(f"Emails {'déposés' if self.outbox is not None else 'envoyés'}: {sent_count}/{row_count}")
+            if self.email_sender.skipped:
+                self.logger.info(f"Emails déjà envoyés (ignorés): {self.email_sender.skipped}")
+            counts = self.journal.counts(self.run_id)
+            self.logger.info("Journal: " + ", ".join(f"{status}: {n}" for status, n in sorted(counts.items())))
 
             return 0
 
         except Exception as e:
             self.logger.error(f"[ERREUR] Processus interrompu: {e}")
+            if self.journal is not None:
+                self.logger.error("Relancez avec --resume pour reprendre là où le traitement s'est arrêté.")
             return 1
+        finally:
+            self.email_sender.close()
+            if self.journal is not None:
+                self.journal.finish_run(self.run_id)
+                self.journal.close()
+                self.journal = None
+
+
+def run_outbox_worker(once: bool = False) -> int:
+    """Expéditeur de la boîte d'envoi: envoie les emails déposés jusqu'à l'arrêt
+    (Ctrl+C, SIGTERM), ou jusqu'à ce qu'elle soit vide avec ``once``."""
+    logger = setup_logging()
+    sender = SMTPEmailSender()
+    if not sender.is_ready():
+        return 1
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    logger.info(f"Expéditeur de la boîte d'envoi: {OUTBOX_DIR}")
+    try:
+        OutboxWorker(Outbox(OUTBOX_DIR), sender).run(stop, once)
+    except KeyboardInterrupt:
+        # Les emails en cours restent dans cur/ et sont repris au prochain démarrage
+        logger.info("Expéditeur arrêté")
+    finally:
+        sender.close()
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Analyse les options de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Générateur de documents Word et envoi d'emails")
+    parser.add_argument("--gui", action="store_true", help="Lancer l'interface graphique")
+    parser.add_argument("--pipeline", action="store_true", default=PIPELINE_MODE,
+                        help="Traiter chaque ligne en flux (rendu -> PDF -> envoi)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre le dernier lancement de ce CSV (journal) sans refaire le travail terminé")
+    parser.add_argument("--spool", action="store_true", default=SPOOL_MODE,
+                        help="Déposer les emails dans la boîte d'envoi au lieu de les envoyer")
+    parser.add_argument("--outbox-worker", action="store_true",
+                        help="Envoyer les emails de la boîte d'envoi (processus séparé, sans génération)")
+    parser.add_argument("--once", action="store_true",
+                        help="Avec --outbox-worker: s'arrêter quand la boîte d'envoi est vide")
+    return parser.parse_args(argv)
 
 
 def main() -> int:
     """Point d'entrée principal - détecte le mode CLI ou GUI."""
+    args = parse_args()
+
     # Vérifier si l'utilisateur demande le mode GUI
-    if len(sys.argv) > 1 and sys.argv[1] == "--gui":
+    if args.gui:
         # Lancer l'interface graphique
         try:
             from gui_controller import main as gui_main
@@ -140,10 +537,12 @@ def main() -> int:
             print("ERREUR: CustomTkinter n'est pas installé.")
             print("Installez-le avec: pip install customtkinter")
             return 1
+    elif args.outbox_worker:
+        return run_outbox_worker(once=args.once)
     else:
         # Mode CLI par défaut
-        generator = WordBatchGenerator()
-        return generator.run()
+        generator = WordBatchGenerator(spool=args.spool)
+        return generator.run(pipeline=args.pipeline, resume=args.resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Boîte d'envoi sur disque: emails complets déposés en fichiers .eml, envoyés par un
+processus séparé (``OutboxWorker``)
+"""
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import OUTBOX_POLL_SECONDS, OUTBOX_SEND_WORKERS
+from smtp_retry import TRANSIENT, DeferralQueue, backoff_delay, classify_smtp_error
+
+# Sous-dossiers: écriture en cours, à envoyer, en cours d'envoi, envoyés, en échec
+TMP_DIR = "tmp"
+NEW_DIR = "new"
+CUR_DIR = "cur"
+SENT_DIR = "sent"
+FAILED_DIR = "failed"
+
+# Première ligne de chaque fichier: enveloppe SMTP (JSON), retirée à l'envoi
+ENVELOPE_HEADER = b"X-Outbox-Envelope: "
+READ_CHUNK_SIZE = 64 * 1024
+# Fichiers d'écriture abandonnés (dépôt interrompu) supprimés après ce délai
+TMP_MAX_AGE_SECONDS = 3600
+
+
+class SpooledMessage:
+    """Email déposé dans la boîte d'envoi: enveloppe SMTP et contenu lu en flux.
+
+    L'enveloppe contient l'expéditeur, tous les destinataires (copie cachée
+    comprise, absente des en-têtes), la campagne, l'empreinte de la pièce
+    jointe et le Message-ID, pour le registre des envois.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            line = f.readline()
+        if not line.startswith(ENVELOPE_HEADER):
+            raise ValueError(f"Enveloppe absente: {path.name}")
+        self.envelope: Dict[str, Any] = json.loads(line[len(ENVELOPE_HEADER):])
+        self._offset = len(line)
+
+    @property
+    def from_addr(self) -> str:
+        return self.envelope["from"]
+
+    @property
+    def recipients(self) -> List[str]:
+        return self.envelope["recipients"]
+
+    @property
+    def to(self) -> str:
+        return self.envelope["to"]
+
+    def __iter__(self) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            yield from iter(lambda: f.read(READ_CHUNK_SIZE), b"")
+
+
+class Outbox:
+    """Boîte d'envoi: un fichier .eml par email, déplacé de dossier en dossier.
+
+    Un email est écrit dans ``tmp/`` puis renommé dans ``new/``: il n'y apparaît
+    que complet. L'expéditeur le réserve en le déplaçant dans ``cur/``, puis le
+    range dans ``sent/`` ou ``failed/``. Les fichiers restés dans ``cur/`` après
+    un arrêt sont remis dans ``new/`` au démarrage suivant (``recover``).
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        for name in (TMP_DIR, NEW_DIR, CUR_DIR, SENT_DIR, FAILED_DIR):
+            (root / name).mkdir(parents=True, exist_ok=True)
+
+    def put(self, message: Iterable[bytes], envelope: Dict[str, Any]) -> Path:
+        """Dépose un email (flux d'octets du message complet) et retourne son chemin dans ``new/``."""
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:12]}.eml"
+        tmp_path = self.root / TMP_DIR / name
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(ENVELOPE_HEADER + json.dumps(envelope).encode("ascii") + b"\r\n")
+                for chunk in message:
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        target = self.root / NEW_DIR / name
+        os.replace(tmp_path, target)
+        return target
+
+    def pending(self) -> List[Path]:
+        """Emails à envoyer, du plus ancien au plus récent."""
+        return sorted((self.root / NEW_DIR).glob("*.eml"))
+
+    def claim(self, path: Path) -> Optional[Path]:
+        """Réserve un email de ``new/`` (None s'il a déjà été pris)."""
+        target = self.root / CUR_DIR / path.name
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None
+        return target
+
+    def finish(self, path: Path, sent: bool, error: Optional[str] = None) -> Path:
+        """Range un email réservé dans ``sent/`` ou ``failed/`` (avec la cause dans un .err)."""
+        target = self.root / (SENT_DIR if sent else FAILED_DIR) / path.name
+        os.replace(path, target)
+        if error:
+            target.with_suffix(".err").write_text(error, encoding="utf-8")
+        return target
+
+    def recover(self) -> int:
+        """Remet dans ``new/`` les emails réservés par un expéditeur arrêté; supprime les
+        dépôts interrompus. Retourne le nombre d'emails remis en attente."""
+        recovered = 0
+        for path in (self.root / CUR_DIR).glob("*.eml"):
+            os.replace(path, self.root / NEW_DIR / path.name)
+            recovered += 1
+        limit = time.time() - TMP_MAX_AGE_SECONDS
+        for path in (self.root / TMP_DIR).glob("*.eml"):
+            try:
+                if path.stat().st_mtime < limit:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+        return recovered
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre d'emails par dossier."""
+        return {name: sum(1 for _ in (self.root / name).glob("*.eml"))
+                for name in (NEW_DIR, CUR_DIR, SENT_DIR, FAILED_DIR)}
+
+
+class OutboxWorker:
+    """Expéditeur de la boîte d'envoi, lancé à part de la génération des documents.
+
+    Jusqu'à ``workers`` emails sont envoyés à la fois avec ``sender``
+    (``SMTPEmailSender``: pool de sessions, débit, registre des envois). Un
+    échec temporaire est retenté plus tard, sans bloquer les autres emails;
+    après ``max_retries`` tentatives ou un refus définitif, l'email va dans
+    ``failed/``. Un seul expéditeur par boîte d'envoi.
+    """
+
+    def __init__(self, outbox: Outbox, sender, workers: int = OUTBOX_SEND_WORKERS,
+                 poll_interval: float = OUTBOX_POLL_SECONDS):
+        self.outbox = outbox
+        self.sender = sender
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._deferred = DeferralQueue()
+
+    def _attempt(self, path: Path, number: int) -> Optional[bool]:
+        """Une tentative d'envoi; None si l'email est différé."""
+        try:
+            self.sender.deliver_spooled(SpooledMessage(path), 1)
+        except Exception as e:
+            if classify_smtp_error(e) == TRANSIENT and number < self.sender.max_retries:
+                delay = backoff_delay(number, self.sender.delay_seconds, self.sender.max_delay_seconds)
+                logging.warning(f"[OUTBOX] Échec temporaire pour {path.name} (tentative {number}): {e}; "
+                                f"nouvel essai dans {delay:.1f} s")
+                self._deferred.push((path, number + 1), delay)
+                return None
+            logging.error(f"[OUTBOX] Échec envoi {path.name}: {e}")
+            logging.debug(traceback.format_exc())
+            self.outbox.finish(path, False, str(e))
+            return False
+        self.outbox.finish(path, True)
+        return True
+
+    def _timeout(self) -> float:
+        delay = self._deferred.next_delay()
+        return self.poll_interval if delay is None else min(self.poll_interval, delay)
+
+    def run(self, stop: Optional[threading.Event] = None, once: bool = False) -> Tuple[int, int]:
+        """Envoie les emails de la boîte d'envoi jusqu'à ``stop`` (ou jusqu'à ce qu'elle
+        soit vide avec ``once``). Retourne (envoyés, en échec)."""
+        stop = stop or threading.Event()
+        recovered = self.outbox.recover()
+        if recovered:
+            logging.info(f"[OUTBOX] {recovered} email(s) repris après un arrêt")
+        sent = failed = 0
+        pending: Dict[Any, Path] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbox") as executor:
+            while not stop.is_set():
+                for path, number in self._deferred.pop_due():
+                    pending[executor.submit(self._attempt, path, number)] = path
+                if len(pending) < self.workers:
+                    for path in self.outbox.pending()[:self.workers - len(pending)]:
+                        claimed = self.outbox.claim(path)
+                        if claimed is not None:
+                            pending[executor.submit(self._attempt, claimed, 1)] = claimed
+                if not pending:
+                    if once and not self._deferred:
+                        break
+                    stop.wait(self._timeout())
+                    continue
+                done, _ = wait(pending, timeout=self._timeout(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.pop(future)
+                    sent += future.result() is True
+                    failed += future.result() is False
+            # Arrêt demandé: les envois en cours se terminent
+            for future in pending:
+                sent += future.result() is True
+                failed += future.result() is False
+        if self._deferred:
+            logging.info(f"[OUTBOX] {len(self._deferred)} email(s) différé(s) repris au prochain démarrage")
+        logging.info(f"[OUTBOX] Emails envoyés: {sent}, en échec: {failed}")
+        return sent, failed
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Cache des documents générés, adressé par le contenu (modèle + valeurs d'une ligne)
+"""
+import hashlib
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    key TEXT PRIMARY KEY,
+    docx TEXT,
+    docx_size INTEGER,
+    docx_mtime INTEGER,
+    pdf TEXT NOT NULL,
+    pdf_size INTEGER NOT NULL,
+    pdf_mtime INTEGER NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_used ON outputs (used);
+"""
+
+
+def cache_key(template_sha256: str, values: Dict[str, str], variant: str = "") -> str:
+    """Clé d'une ligne: empreinte du modèle, valeurs substituées et variante de rendu.
+
+    ``variant`` distingue les sorties d'un même couple modèle/valeurs produites
+    différemment (mode de génération, backend PDF).
+    """
+    payload = json.dumps([template_sha256, variant, sorted(values.items())],
+                         ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _stat(path: Path) -> Tuple[int, int]:
+    """Taille et date de modification (ns) d'un fichier."""
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+class OutputCache:
+    """Associe une clé de contenu aux DOCX/PDF déjà produits dans ``out/``.
+
+    Une entrée n'est réutilisée que si ses fichiers existent encore avec la
+    taille et la date de modification enregistrées. Les entrées les plus
+    anciennes sont évincées au-delà de ``max_entries`` ou de ``max_age_days``.
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 50000, max_age_days: float = 30.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _valid(self, path: Optional[str], size: Optional[int], mtime: Optional[int]) -> bool:
+        """Vérifie qu'un fichier enregistré n'a pas été supprimé ni modifié."""
+        try:
+            return path is not None and _stat(Path(path)) == (size, mtime)
+        except OSError:
+            return False
+
+    def fetch(self, key: str, docx_path: Optional[Path], pdf_path: Path
+              ) -> Optional[Tuple[Optional[Path], Path]]:
+        """Retourne (DOCX, PDF) déjà produits pour ``key``, recopiés aux chemins demandés.
+
+        ``docx_path`` vaut None quand seul le PDF est attendu (mode "stamp").
+        Retourne None si l'entrée est absente ou si ses fichiers ne sont plus valides.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT docx, docx_size, docx_mtime, pdf, pdf_size, pdf_mtime FROM outputs WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        docx, docx_size, docx_mtime, pdf, pdf_size, pdf_mtime = row
+        if not self._valid(pdf, pdf_size, pdf_mtime) or \
+                (docx_path is not None and not self._valid(docx, docx_size, docx_mtime)):
+            self.misses += 1
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+            return None
+
+        # Les fichiers ont pu être produits sous un autre nom (ordre du CSV modifié)
+        if docx_path is not None and Path(docx) != docx_path:
+            docx_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(docx, docx_path)
+        if Path(pdf) != pdf_path:
+            pdf_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(pdf, pdf_path)
+        self.store(key, docx_path, pdf_path)
+        self.hits += 1
+        return docx_path, pdf_path
+
+    def store(self, key: str, docx_path: Optional[Path], pdf_path: Path) -> None:
+        """Enregistre (ou rafraîchit) les fichiers produits pour ``key``."""
+        docx_size = docx_mtime = None
+        if docx_path is not None:
+            docx_size, docx_mtime = _stat(docx_path)
+        pdf_size, pdf_mtime = _stat(pdf_path)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO outputs (key, docx, docx_size, docx_mtime, pdf, pdf_size, pdf_mtime, created, used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET docx = excluded.docx, docx_size = excluded.docx_size, "
+                "docx_mtime = excluded.docx_mtime, pdf = excluded.pdf, pdf_size = excluded.pdf_size, "
+                "pdf_mtime = excluded.pdf_mtime, used = excluded.used",
+                (key, str(docx_path) if docx_path is not None else None, docx_size, docx_mtime,
+                 str(pdf_path), pdf_size, pdf_mtime, now, now),
+            )
+
+    def evict(self) -> int:
+        """Supprime les entrées trop anciennes ou en surnombre; retourne leur nombre.
+
+        Seules les entrées sont supprimées: les fichiers de ``out/`` restent en place.
+        """
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM outputs WHERE used < ?", (cutoff,)).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM outputs WHERE key IN ("
+                "SELECT key FROM outputs ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        if removed:
+            logging.info(f"Cache des sorties: {removed} entrée(s) évincée(s)")
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    def close(self) -> None:
+        """Ferme la base du cache."""
+        with self._lock:
+            self._conn.close()
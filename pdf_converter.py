@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+Convertisseurs PDF interchangeables et pool de convertisseurs
+"""
+import atexit
+from abc import ABC, abstractmethod
+import logging
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from config import (
+    PDF_BACKEND, PDF_CONVERTER_WORKERS, CONVERTER_PROFILE_DIR,
+    LIBREOFFICE_PATH, LIBREOFFICE_BASE_PORT, LIBREOFFICE_START_TIMEOUT
+)
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:  # Module fourni par LibreOffice (paquet python3-uno sous Linux)
+    uno = None
+    PropertyValue = None
+
+# Format d'enregistrement PDF de Word (wdFormatPDF)
+WORD_FORMAT_PDF = 17
+
+
+class PdfConverter(ABC):
+    """Interface commune des convertisseurs DOCX -> PDF.
+
+    Un convertisseur est démarré une fois (``start``), convertit autant de
+    documents que nécessaire (``convert``) puis est libéré (``close``). Une
+    instance n'est utilisée que par un thread à la fois.
+    """
+
+    name = "base"
+
+    def __init__(self, slot: int = 0, profile_dir: Optional[Path] = None):
+        self.slot = slot
+        self.profile_dir = profile_dir
+        self.started = False
+
+    def start(self) -> None:
+        """Prépare le convertisseur (lancement de l'application, etc.)."""
+        self.started = True
+
+    @abstractmethod
+    def convert(self, docx_path: Path, pdf_path: Path) -> Path:
+        """Convertit un DOCX en PDF et retourne le chemin du PDF."""
+
+    def close(self) -> None:
+        """Libère les ressources du convertisseur."""
+        self.started = False
+
+    def __enter__(self) -> "PdfConverter":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class NullConverter(PdfConverter):
+    """Convertisseur de test: écrit un PDF d'une page vierge, sans suite bureautique."""
+
+    name = "null"
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> Path:
+        from PyPDF2 import PdfWriter
+
+        writer = PdfWriter()
+        writer.add_blank_page(width=612, height=792)
+        with open(pdf_path, "wb") as f:
+            writer.write(f)
+        return pdf_path
+
+
+class Docx2PdfConverter(PdfConverter):
+    """Conversion via Microsoft Word (COM sous Windows, docx2pdf ailleurs).
+
+    COM est initialisé et Word lancé une seule fois par convertisseur, dans le
+    thread qui l'utilise. Chaque convertisseur démarre sa propre instance de Word
+    (``DispatchEx``): il ne s'attache pas à un Word déjà ouvert, et sa fermeture
+    ne quitte ni les autres convertisseurs ni le Word de l'utilisateur. Word ne
+    permet pas d'isoler les profils: ``profile_dir`` est ignoré.
+    """
+
+    name = "docx2pdf"
+
+    def __init__(self, slot: int = 0, profile_dir: Optional[Path] = None):
+        super().__init__(slot, profile_dir)
+        self._pythoncom = None
+        self._word = None
+
+    def start(self) -> None:
+        # Initialiser COM pour ce thread
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+            self._pythoncom = pythoncom
+        except ImportError:
+            pass  # pythoncom non disponible sur non-Windows
+        try:
+            import win32com.client
+            self._word = win32com.client.DispatchEx("Word.Application")
+            self._word.Visible = False
+            self._word.DisplayAlerts = 0
+        except ImportError:
+            self._word = None
+        super().start()
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> Path:
+        if self._word is None:
+            from docx2pdf import convert
+            convert(str(docx_path), str(pdf_path))
+            return pdf_path
+        doc = self._word.Documents.Open(str(docx_path.resolve()))
+        try:
+            doc.SaveAs(str(pdf_path.resolve()), FileFormat=WORD_FORMAT_PDF)
+        finally:
+            doc.Close(0)
+        return pdf_path
+
+    def close(self) -> None:
+        if self._word is not None:
+            try:
+                self._word.Quit()
+            except Exception as e:
+                logging.warning(f"[Word] Fermeture impossible: {e}")
+            self._word = None
+        # Nettoyer COM
+        if self._pythoncom is not None:
+            self._pythoncom.CoUninitialize()
+            self._pythoncom = None
+        super().close()
+
+
+def _properties(**values) -> tuple:
+    """Construit un tuple de PropertyValue UNO."""
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+class LibreOfficeConverter(PdfConverter):
+    """Processus soffice headless de longue durée, piloté via UNO sur un socket local.
+
+    Chaque convertisseur possède son propre profil utilisateur et son propre
+    port, ce qui permet d'en faire tourner plusieurs en parallèle. Une instance
+    morte est relancée automatiquement avant la conversion suivante.
+    """
+
+    name = "libreoffice"
+
+    def __init__(self, slot: int = 0, profile_dir: Optional[Path] = None,
+                 soffice_path: str = LIBREOFFICE_PATH, base_port: int = LIBREOFFICE_BASE_PORT,
+                 start_timeout: float = LIBREOFFICE_START_TIMEOUT):
+        super().__init__(slot, profile_dir or CONVERTER_PROFILE_DIR / f"{self.name}_{slot}")
+        self.port = base_port + slot
+        self.soffice_path = soffice_path
+        self.start_timeout = start_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.restarts = 0
+
+    def is_alive(self) -> bool:
+        """Indique si le processus soffice tourne toujours."""
+        return self.process is not None and self.process.poll() is None and self.desktop is not None
+
+    def start(self) -> None:
+        """Lance soffice puis établit la connexion UNO."""
+        if uno is None:
+            raise RuntimeError(
+                "Le module Python 'uno' est introuvable. Installez LibreOffice et son "
+                "pont Python (ex. paquet python3-uno) pour utiliser PDF_BACKEND=libreoffice."
+            )
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.process = self._spawn()
+        try:
+            self.desktop = self._connect()
+        except Exception:
+            # Une instance injoignable garderait le port UNO: la relance en lancerait une deuxième
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+            raise
+        self.started = True
+        logging.info(f"[LibreOffice] Instance démarrée (port {self.port}, pid {self.process.pid})")
+
+    def _spawn(self) -> subprocess.Popen:
+        """Démarre le processus soffice headless en écoute sur le port de l'instance."""
+        return subprocess.Popen(
+            [
+                self.soffice_path,
+                "--headless", "--invisible", "--nologo", "--nodefault",
+                "--norestore", "--nolockcheck",
+                f"-env:UserInstallation={self.profile_dir.resolve().as_uri()}",
+                f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _connect(self):
+        """Se connecte au processus soffice (attend qu'il soit prêt)."""
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        url = f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            try:
+                context = resolver.resolve(url)
+                return context.ServiceManager.createInstanceWithContext(
+                    "com.sun.star.frame.Desktop", context
+                )
+            except Exception:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"soffice s'est arrêté au démarrage (code {self.process.returncode})")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"soffice ne répond pas sur le port {self.port}")
+                time.sleep(0.25)
+
+    def restart(self) -> None:
+        """Arrête puis relance l'instance."""
+        self.close()
+        self.restarts += 1
+        logging.warning(f"[LibreOffice] Redémarrage de l'instance du port {self.port}")
+        self.start()
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> Path:
+        """Convertit un DOCX en PDF; relance l'instance et réessaie une fois si elle a planté."""
+        if not self.is_alive():
+            if self.process is None:
+                self.start()
+            else:
+                self.restart()
+        try:
+            return self._export(docx_path, pdf_path)
+        except Exception as e:
+            if self.is_alive():
+                raise
+            logging.warning(f"[LibreOffice] Instance perdue pendant la conversion: {e}")
+            self.restart()
+            return self._export(docx_path, pdf_path)
+
+    def _export(self, docx_path: Path, pdf_path: Path) -> Path:
+        """Charge le document dans l'instance et l'exporte en PDF."""
+        document = self.desktop.loadComponentFromURL(
+            docx_path.resolve().as_uri(), "_blank", 0, _properties(Hidden=True, ReadOnly=True)
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice n'a pas pu ouvrir {docx_path}")
+        try:
+            document.storeToURL(pdf_path.resolve().as_uri(), _properties(FilterName="writer_pdf_Export"))
+        finally:
+            document.close(True)
+        return pdf_path
+
+    def close(self) -> None:
+        """Ferme proprement l'instance (ou la tue si elle ne répond plus)."""
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+        self.started = False
+
+
+# Backends disponibles, par nom (voir PDF_BACKEND)
+CONVERTER_BACKENDS: Dict[str, type] = {
+    NullConverter.name: NullConverter,
+    Docx2PdfConverter.name: Docx2PdfConverter,
+    LibreOfficeConverter.name: LibreOfficeConverter,
+}
+
+
+def create_converter(backend: str, slot: int = 0, profile_root: Path = CONVERTER_PROFILE_DIR) -> PdfConverter:
+    """Crée un convertisseur du backend demandé avec un profil isolé."""
+    try:
+        converter_class = CONVERTER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Backend PDF inconnu: {backend} (attendu: {', '.join(sorted(CONVERTER_BACKENDS))})"
+        )
+    return converter_class(slot, profile_root / f"{backend}_{slot}")
+
+
+class ConverterPool:
+    """Pool de N convertisseurs, chacun dans son propre thread.
+
+    Chaque thread crée, démarre et ferme son convertisseur (ce qui respecte
+    l'affinité de thread de COM); une conversion soumise est prise par le
+    premier convertisseur libre.
+    """
+
+    def __init__(self, backend: str = PDF_BACKEND, size: int = PDF_CONVERTER_WORKERS,
+                 factory: Optional[Callable[[int], PdfConverter]] = None):
+        self.backend = backend
+        self.size = max(1, size)
+        if factory is None:
+            if backend not in CONVERTER_BACKENDS:
+                create_converter(backend)  # lève une ValueError explicite
+            factory = lambda slot: create_converter(backend, slot)
+        self._factory = factory
+        self._jobs: queue.Queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker, args=(slot,), name=f"pdf-{backend}-{slot}", daemon=True)
+            for slot in range(self.size)
+        ]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def _worker(self, slot: int) -> None:
+        """Boucle d'un convertisseur: démarrage paresseux, conversions, fermeture."""
+        converter = self._factory(slot)
+        try:
+            while True:
+                item = self._jobs.get()
+                if item is None:
+                    return
+                docx_path, pdf_path, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if not converter.started:
+                        converter.start()
+                    future.set_result(converter.convert(docx_path, pdf_path))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            try:
+                converter.close()
+            except Exception as e:
+                logging.warning(f"[PDF] Fermeture du convertisseur {slot} impossible: {e}")
+
+    def submit(self, docx_path: Path, pdf_path: Path) -> Future:
+        """Soumet une conversion au premier convertisseur libre."""
+        if self._closed:
+            raise RuntimeError("Pool de convertisseurs fermé")
+        future: Future = Future()
+        self._jobs.put((docx_path, pdf_path, future))
+        return future
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> Path:
+        """Convertit un document et attend le résultat."""
+        return self.submit(docx_path, pdf_path).result()
+
+    def convert_many(self, jobs: Sequence[Tuple[Path, Path]],
+                     progress: Optional[Callable[[int, int, Path], None]] = None,
+                     on_result: Optional[Callable[[Path, Dict[str, Any]], None]] = None
+                     ) -> Dict[Path, Dict[str, Any]]:
+        """Convertit plusieurs documents en parallèle.
+
+        Retourne, pour chaque DOCX, ``{'pdf': chemin ou None, 'erreur': message ou None}``;
+        ``on_result`` reçoit chaque résultat dès que la conversion se termine.
+        """
+        futures = {self.submit(docx_path, pdf_path): docx_path for docx_path, pdf_path in jobs}
+        results: Dict[Path, Dict[str, Any]] = {}
+        for done, future in enumerate(as_completed(futures), 1):
+            docx_path = futures[future]
+            try:
+                results[docx_path] = {'pdf': future.result(), 'erreur': None}
+            except Exception as e:
+                results[docx_path] = {'pdf': None, 'erreur': str(e)}
+            if on_result is not None:
+                on_result(docx_path, results[docx_path])
+            if progress is not None:
+                progress(done, len(futures), docx_path)
+        return results
+
+    def close(self) -> None:
+        """Arrête les convertisseurs après les conversions en cours."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Le pool fermé n'est plus retenu jusqu'à la fin de l'interpréteur
+        atexit.unregister(self.close)
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> "ConverterPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
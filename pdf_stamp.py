@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+Mode "tampon": le modèle est converti une seule fois en PDF, puis le texte de
+chaque ligne est apposé sur une copie de ce PDF de base avec PyPDF2
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject, ByteStringObject, ContentStream, DecodedStreamObject, DictionaryObject,
+    FloatObject, NameObject, RectangleObject
+)
+
+try:
+    # Décodage des polices (encodage, /ToUnicode): API interne de PyPDF2, version
+    # figée dans requirements.txt
+    from PyPDF2._cmap import build_char_map
+except ImportError:  # Repli: encodage WinAnsi ou octets bruts, sans table /ToUnicode
+    build_char_map = None
+
+# Police utilisée pour le texte apposé (police standard PDF, non embarquée)
+STAMP_FONT = "Helvetica"
+_FONT_RESOURCE = "/FStamp"
+
+# Largeurs Helvetica (millièmes d'em) des codes 32 à 126: police de repli pour
+# les polices standard sans /Widths; les autres caractères valent 556
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_DEFAULT_WIDTH = 556
+
+_IDENTITY = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+
+
+def _mult(m: List[float], n: List[float]) -> List[float]:
+    """Produit de deux matrices de transformation PDF [a b c d e f]."""
+    return [
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    ]
+
+
+def _pdf_string(text: str) -> bytes:
+    """Encode un texte en chaîne littérale PDF (WinAnsi)."""
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _helvetica_width(text: str) -> float:
+    """Largeur Helvetica d'un caractère (accents ignorés), en millièmes d'em."""
+    base = unicodedata.normalize("NFD", text)[:1]
+    code = ord(base) if base else 0
+    return float(_HELVETICA_WIDTHS[code - 32]) if 32 <= code <= 126 else float(_HELVETICA_DEFAULT_WIDTH)
+
+
+class _FontMetrics:
+    """Décodage des codes d'une police de la page et largeur de leurs glyphes."""
+
+    def __init__(self, page: PageObject, name: str):
+        try:
+            if build_char_map is not None:
+                font_type, _, encoding, to_unicode, font = build_char_map(name, 200.0, page)
+            else:
+                font = page["/Resources"]["/Font"][name].get_object()
+                font_type, to_unicode = str(font.get("/Subtype", "/Type1")), {}
+                encoding = "cp1252" if font.get("/Encoding") == "/WinAnsiEncoding" else "charmap"
+        except Exception:
+            font_type, encoding, to_unicode, font = "/Type1", "charmap", {}, DictionaryObject()
+        self.encoding = encoding
+        self.to_unicode = to_unicode
+        self.code_length = 1
+        self.widths: Dict[int, float] = {}
+        self.default_width: Optional[float] = None
+        if font_type == "/Type0":
+            self.code_length = 2 if to_unicode.get(-1, 2) != 1 else 1
+            descendant = font["/DescendantFonts"][0].get_object()
+            self.default_width = float(descendant.get("/DW", 1000))
+            self._read_cid_widths(descendant.get("/W", []))
+        elif "/Widths" in font:
+            first = int(font.get("/FirstChar", 0))
+            self.widths = {first + i: float(w) for i, w in enumerate(font["/Widths"])}
+            descriptor = font.get("/FontDescriptor")
+            if descriptor is not None and "/MissingWidth" in descriptor.get_object():
+                self.default_width = float(descriptor.get_object()["/MissingWidth"])
+        elif str(font.get("/BaseFont", "")).startswith("/Courier"):
+            self.default_width = 600.0
+
+    def _read_cid_widths(self, table: List[Any]) -> None:
+        """Lit le tableau /W d'une police CID: ``c [w1 w2 ...]`` ou ``c1 c2 w``."""
+        i = 0
+        while i < len(table):
+            first = int(table[i])
+            following = table[i + 1]
+            if isinstance(following, list):
+                for offset, width in enumerate(following):
+                    self.widths[first + offset] = float(width)
+                i += 2
+            else:
+                for code in range(first, int(following) + 1):
+                    self.widths[code] = float(table[i + 2])
+                i += 3
+
+    def _char(self, code: int, raw: bytes) -> str:
+        """Texte Unicode d'un code (encodage de la police puis table /ToUnicode)."""
+        if isinstance(self.encoding, dict):
+            char = self.encoding.get(code, chr(code))
+        elif isinstance(self.encoding, list):
+            char = self.encoding[code] if code < len(self.encoding) else chr(code)
+        else:
+            try:
+                char = raw.decode(self.encoding or "charmap", "surrogatepass")
+            except (LookupError, UnicodeDecodeError):
+                char = chr(code)
+        return self.to_unicode.get(char, char)
+
+    def glyphs(self, data: bytes) -> List[Tuple[int, int, str, float]]:
+        """Découpe une chaîne en glyphes: (début, fin, texte, largeur en millièmes d'em)."""
+        result = []
+        for start in range(0, len(data) - self.code_length + 1, self.code_length):
+            raw = data[start:start + self.code_length]
+            code = int.from_bytes(raw, "big")
+            text = self._char(code, raw)
+            width = self.widths.get(code, self.default_width)
+            if width is None:
+                width = _helvetica_width(text)
+            result.append((start, start + self.code_length, text, width))
+        return result
+
+
+def _string_bytes(value: Any) -> bytes:
+    """Octets d'une chaîne d'un flux de contenu (texte PDFDoc ou chaîne binaire)."""
+    return value.original_bytes if hasattr(value, "original_bytes") else bytes(value)
+
+
+def _scan_page(page: PageObject, regex: "re.Pattern[str]", page_number: int
+               ) -> Tuple[List[Dict[str, Any]], Optional[ContentStream]]:
+    """Suit l'état texte du flux de contenu d'une page pour y localiser les placeholders.
+
+    Chaque glyphe est positionné à partir des largeurs de sa police, de
+    l'espacement des caractères/mots et de l'échelle horizontale. Retourne les
+    emplacements trouvés et le flux de contenu où les glyphes des placeholders
+    sont remplacés par un décalage équivalent (None si la page n'en a pas).
+    Le texte des XObjects de formulaire n'est pas parcouru.
+    """
+    contents = page.get_contents()
+    if contents is None:
+        return [], None
+    stream = ContentStream(contents, page.pdf)
+    fonts: Dict[str, _FontMetrics] = {}
+    state: Dict[str, Any] = {"ctm": list(_IDENTITY), "font": None, "size": 0.0,
+                             "tc": 0.0, "tw": 0.0, "th": 1.0, "tl": 0.0}
+    stack: List[Dict[str, Any]] = []
+    tm = list(_IDENTITY)
+    tlm = list(_IDENTITY)
+    block: List[Dict[str, Any]] = []
+    slots: List[Dict[str, Any]] = []
+    removed: Dict[int, List[Dict[str, Any]]] = {}
+
+    def show(data: bytes, op_index: int, element: int) -> None:
+        nonlocal tm
+        metrics = state["font"]
+        if metrics is None:
+            return
+        for start, end, text, width in metrics.glyphs(data):
+            advance = width / 1000.0 * state["size"] + state["tc"]
+            if metrics.code_length == 1 and data[start:end] == b" ":
+                advance += state["tw"]
+            advance *= state["th"]
+            origin = _mult(tm, state["ctm"])
+            tm = _mult([1.0, 0.0, 0.0, 1.0, advance, 0.0], tm)
+            block.append({
+                "op": op_index, "element": element, "start": start, "end": end,
+                "text": text, "advance": advance, "size": state["size"], "th": state["th"],
+                "origin": origin, "end_x": _mult(tm, state["ctm"])[4],
+            })
+
+    def next_line(tx: float, ty: float) -> None:
+        nonlocal tm, tlm
+        tlm = _mult([1.0, 0.0, 0.0, 1.0, tx, ty], tlm)
+        tm = list(tlm)
+
+    def flush() -> None:
+        # Placeholders du bloc BT ... ET (ils peuvent couvrir plusieurs chaînes)
+        text = "".join(glyph["text"] for glyph in block)
+        owner = [i for i, glyph in enumerate(block) for _ in glyph["text"]]
+        for match in regex.finditer(text):
+            glyphs = block[owner[match.start()]:owner[match.end() - 1] + 1]
+            first = glyphs[0]
+            matrix = first["origin"]
+            scale = math.sqrt(abs(matrix[0] * matrix[3]) + abs(matrix[1] * matrix[2])) or 1.0
+            slots.append({
+                "page": page_number,
+                "x": matrix[4],
+                "y": matrix[5],
+                "size": first["size"] * scale,
+                "width": glyphs[-1]["end_x"] - matrix[4],
+                "placeholder": match.group(0),
+                "field": match.group(1).strip().upper(),
+            })
+            for glyph in glyphs:
+                removed.setdefault(glyph["op"], []).append(glyph)
+        block.clear()
+
+    for op_index, (operands, operator) in enumerate(stream.operations):
+        if operator == b"q":
+            stack.append(dict(state, ctm=list(state["ctm"])))
+        elif operator == b"Q" and stack:
+            state = stack.pop()
+        elif operator == b"cm":
+            state["ctm"] = _mult([float(v) for v in operands], state["ctm"])
+        elif operator == b"BT":
+            tm, tlm = list(_IDENTITY), list(_IDENTITY)
+        elif operator == b"ET":
+            flush()
+        elif operator == b"Tf":
+            name = str(operands[0])
+            if name not in fonts:
+                fonts[name] = _FontMetrics(page, name)
+            state["font"], state["size"] = fonts[name], float(operands[1])
+        elif operator == b"Tc":
+            state["tc"] = float(operands[0])
+        elif operator == b"Tw":
+            state["tw"] = float(operands[0])
+        elif operator == b"Tz":
+            state["th"] = float(operands[0]) / 100.0
+        elif operator == b"TL":
+            state["tl"] = float(operands[0])
+        elif operator in (b"Td", b"TD"):
+            if operator == b"TD":
+                state["tl"] = -float(operands[1])
+            next_line(float(operands[0]), float(operands[1]))
+        elif operator == b"Tm":
+            tlm = [float(v) for v in operands]
+            tm = list(tlm)
+        elif operator == b"T*":
+            next_line(0.0, -state["tl"])
+        elif operator in (b"Tj", b"'", b'"'):
+            if operator == b'"':
+                state["tw"], state["tc"] = float(operands[0]), float(operands[1])
+            if operator != b"Tj":
+                next_line(0.0, -state["tl"])
+            show(_string_bytes(operands[-1]), op_index, 0)
+        elif operator == b"TJ":
+            for element, item in enumerate(operands[0]):
+                if isinstance(item, (str, bytes)):
+                    show(_string_bytes(item), op_index, element)
+                else:
+                    tm = _mult([1.0, 0.0, 0.0, 1.0, -float(item) / 1000.0 * state["size"] * state["th"], 0.0], tm)
+    flush()
+
+    if not removed:
+        return slots, None
+    operations = []
+    for op_index, (operands, operator) in enumerate(stream.operations):
+        if op_index not in removed:
+            operations.append((operands, operator))
+            continue
+        if operator == b'"':
+            operations += [([operands[0]], b"Tw"), ([operands[1]], b"Tc")]
+        if operator != b"Tj" and operator != b"TJ":
+            operations.append(([], b"T*"))
+        elements = operands[0] if operator == b"TJ" else [operands[-1]]
+        operations.append(([_without_glyphs(elements, removed[op_index])], b"TJ"))
+    stream.operations = operations
+    return slots, stream
+
+
+def _without_glyphs(elements: List[Any], glyphs: List[Dict[str, Any]]) -> ArrayObject:
+    """Tableau TJ sans les glyphes donnés, remplacés par un décalage de même largeur.
+
+    Le texte qui suit le placeholder garde ainsi exactement sa position.
+    """
+    result = ArrayObject()
+
+    def shift(amount: float) -> None:
+        if result and isinstance(result[-1], FloatObject):
+            amount += float(result[-1])
+            result.pop()
+        result.append(FloatObject(round(amount, 4)))
+
+    for element, item in enumerate(elements):
+        if not isinstance(item, (str, bytes)):
+            shift(float(item))
+            continue
+        data = _string_bytes(item)
+        cut = sorted((g for g in glyphs if g["element"] == element), key=lambda g: g["start"])
+        position = 0
+        for glyph in cut:
+            if glyph["start"] > position:
+                result.append(ByteStringObject(data[position:glyph["start"]]))
+            scale = glyph["size"] * glyph["th"]
+            if scale:
+                shift(-glyph["advance"] * 1000.0 / scale)
+            position = glyph["end"]
+        if position < len(data):
+            result.append(ByteStringObject(data[position:]))
+    return result
+
+
+def locate_placeholders(reader: PdfReader, pattern: str) -> List[Dict[str, Any]]:
+    """Localise les placeholders dans le texte des pages d'un PDF.
+
+    Retourne une liste de ``{"page", "x", "y", "size", "width", "placeholder", "field"}``
+    (coordonnées en points, origine en bas à gauche), mesurée avec les largeurs
+    de glyphes des polices de la page.
+    """
+    regex = re.compile(pattern)
+    slots = []
+    for page_number, page in enumerate(reader.pages):
+        slots += _scan_page(page, regex, page_number)[0]
+    return slots
+
+
+class StampTemplate:
+    """PDF de base du modèle et emplacements de ses placeholders.
+
+    Les glyphes des placeholders sont retirés une fois pour toutes du PDF de
+    base (le texte qui les suit garde sa position); le rendu d'une ligne écrit
+    chaque valeur à l'emplacement mesuré. Le PDF de base n'est analysé qu'une
+    fois: chaque ligne en clone les pages, et seules celles contenant un
+    placeholder sont fusionnées avec une surimpression.
+    """
+
+    def __init__(self, base_pdf: bytes, pattern: str):
+        regex = re.compile(pattern)
+        reader = PdfReader(BytesIO(base_pdf))
+        writer = PdfWriter()
+        self.slots = []
+        for page_number, page in enumerate(reader.pages):
+            slots, content = _scan_page(page, regex, page_number)
+            if content is not None:
+                page[NameObject("/Contents")] = content
+            self.slots += slots
+            writer.add_page(page)
+        if not self.slots:
+            raise ValueError("Aucun placeholder trouvé dans le texte du PDF de base")
+        output = BytesIO()
+        writer.write(output)
+        self.base_pdf = output.getvalue()
+        # Lecteur partagé par les rendus: il résout les objets à la demande (verrou)
+        self._reader = PdfReader(BytesIO(self.base_pdf))
+        self._lock = threading.Lock()
+        self.fields = sorted({slot["field"] for slot in self.slots})
+        logging.info(f"Modèle PDF préparé: {len(self.slots)} placeholder(s) à apposer")
+
+    @classmethod
+    def load(cls, template_path: Path, pattern: str,
+             convert: Callable[[Path, Path], Path], cache_dir: Path) -> "StampTemplate":
+        """Convertit le modèle en PDF (une fois par version du modèle) et le prépare.
+
+        ``convert(docx, pdf)`` est le convertisseur à utiliser (ex. ``ConverterPool.convert``).
+        Le PDF de base est conservé dans ``cache_dir``, identifié par l'empreinte du modèle.
+        """
+        digest = hashlib.sha256(template_path.read_bytes()).hexdigest()[:16]
+        base_path = cache_dir / f"{template_path.stem}.{digest}.pdf"
+        if not base_path.exists():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = base_path.with_name(f".{base_path.stem}.{os.getpid()}.tmp.pdf")
+            try:
+                convert(template_path, tmp_path)
+                os.replace(tmp_path, base_path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            logging.info(f"Modèle converti en PDF de base: {base_path}")
+        return cls(base_path.read_bytes(), pattern)
+
+    def _overlay(self, box: RectangleObject, slots: List[Dict[str, Any]],
+                 values: Dict[str, str]) -> PageObject:
+        """Page de surimpression: texte de la ligne à l'emplacement des placeholders.
+
+        La surimpression reprend la boîte de la page (y compris une origine non
+        nulle): sa zone de découpe couvre alors toute la page, dans les mêmes
+        coordonnées que les emplacements mesurés.
+        """
+        commands = []
+        for slot in slots:
+            text = values.get(slot["field"], slot["placeholder"])
+            commands.append(
+                f"BT 0 g {_FONT_RESOURCE} {slot['size']:.2f} Tf {slot['x']:.2f} {slot['y']:.2f} Td ".encode("ascii")
+                + _pdf_string(text) + b" Tj ET"
+            )
+        overlay = PageObject.create_blank_page(width=float(box.width), height=float(box.height))
+        overlay.mediabox = RectangleObject([box.left, box.bottom, box.right, box.top])
+        content = DecodedStreamObject()
+        content.set_data(b"\n".join(commands))
+        overlay[NameObject("/Contents")] = content
+        font = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject(f"/{STAMP_FONT}"),
+            NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+        })
+        overlay[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject(_FONT_RESOURCE): font}),
+        })
+        return overlay
+
+    def render(self, values: Dict[str, str]) -> bytes:
+        """Produit le PDF d'une ligne (``values`` indexé par champ en majuscules)."""
+        writer = PdfWriter()
+        with self._lock:
+            pages = [writer.add_page(page) for page in self._reader.pages]
+        for page_number, page in enumerate(pages):
+            slots = [slot for slot in self.slots if slot["page"] == page_number]
+            if slots:
+                page.merge_page(self._overlay(page.mediabox, slots, values))
+        output = BytesIO()
+        writer.write(output)
+        return output.getvalue()
+
+    def write(self, out_path: Path, values: Dict[str, str]) -> Path:
+        """Écrit le PDF d'une ligne de façon atomique."""
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(self.render(values))
+            os.replace(tmp_path, out_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return out_path
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline à étapes (rendu -> conversion -> envoi) reliées par des files bornées
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Marqueur de fin de flux transmis d'une étape à la suivante
+_END = object()
+
+
+class Stage:
+    """Étape du pipeline: une fonction appliquée à chaque tâche par N threads.
+
+    La fonction reçoit le dictionnaire de la tâche, le complète (ex. ``docx``,
+    ``pdf``) et le retourne. Une exception marque la tâche en échec; elle
+    traverse alors les étapes suivantes sans y être traitée.
+
+    ``on_done`` est appelé pour chaque tâche qui quitte l'étape, y compris
+    celles en échec.
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Dict[str, Any]], workers: int = 1,
+                 on_done: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.name = name
+        self.func = func
+        self.on_done = on_done
+        self.workers = max(1, workers)
+        self.processed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def process(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Applique l'étape à une tâche en capturant les erreurs."""
+        if not job.get('erreur'):
+            try:
+                job = self.func(job)
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                job['erreur'] = str(e)
+                job['etape_echec'] = self.name
+                with self._lock:
+                    self.failed += 1
+                logging.error(f"[{self.name}] Échec pour {job.get('nom', 'inconnu')}: {e}")
+        if self.on_done is not None:
+            self.on_done(job)
+        return job
+
+
+class Pipeline:
+    """Enchaîne des étapes indépendantes: chaque ligne avance dès que possible.
+
+    Les étapes sont reliées par des files bornées (``queue_size``), ce qui limite
+    la mémoire et ralentit naturellement les étapes en amont si une étape en aval
+    sature. La durée totale tend vers celle de l'étape la plus lente.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 32,
+                 stop_event: Optional[threading.Event] = None):
+        if not stages:
+            raise ValueError("Le pipeline doit contenir au moins une étape")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.stop_event = stop_event or threading.Event()
+        self.first_completed_after: Optional[float] = None
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        """Boucle d'un thread d'étape."""
+        while True:
+            job = inbox.get()
+            if job is _END:
+                return
+            if self.stop_event.is_set() and not job.get('erreur'):
+                job['erreur'] = "Traitement arrêté"
+                job['etape_echec'] = stage.name
+            outbox.put(stage.process(job))
+
+    def run(self, jobs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fait traverser toutes les tâches et retourne les résultats dans l'ordre d'index.
+
+        ``jobs`` peut être un générateur: les tâches entrent dans le pipeline au
+        fur et à mesure qu'il les produit (ex. lignes lues en flux du CSV).
+        """
+        started = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results_queue: queue.Queue = queue.Queue()
+        outboxes = queues[1:] + [results_queue]
+
+        threads: List[List[threading.Thread]] = []
+        for stage, inbox, outbox in zip(self.stages, queues, outboxes):
+            stage_threads = [
+                threading.Thread(target=self._worker, args=(stage, inbox, outbox),
+                                 name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        results: List[Dict[str, Any]] = []
+        collector = threading.Thread(target=self._collect, args=(results_queue, results, started),
+                                     name="pipeline-resultats", daemon=True)
+        collector.start()
+
+        try:
+            for job in jobs:
+                queues[0].put(job)
+        finally:
+            # Fermer les étapes dans l'ordre: une étape se termine quand toutes
+            # les tâches de l'étape précédente lui ont été transmises. Si la source
+            # des tâches échoue, les tâches déjà reçues sont terminées avant l'erreur.
+            for stage, inbox, stage_threads in zip(self.stages, queues, threads):
+                for _ in range(stage.workers):
+                    inbox.put(_END)
+                for thread in stage_threads:
+                    thread.join()
+            results_queue.put(_END)
+            collector.join()
+
+        elapsed = time.perf_counter() - started
+        stats = ", ".join(f"{s.name}: {s.processed} ok/{s.failed} échec(s)" for s in self.stages)
+        logging.info(f"Pipeline terminé en {elapsed:.1f}s ({stats})")
+        return sorted(results, key=lambda job: job.get('index', 0))
+
+    def _collect(self, results_queue: queue.Queue, results: List[Dict[str, Any]], started: float) -> None:
+        """Recueille les tâches sorties de la dernière étape."""
+        while True:
+            job = results_queue.get()
+            if job is _END:
+                return
+            if self.first_completed_after is None and not job.get('erreur'):
+                self.first_completed_after = time.perf_counter() - started
+                logging.info(f"Première ligne terminée après {self.first_completed_after:.1f}s")
+            results.append(job)
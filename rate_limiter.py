@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Limiteur de débit partagé (seaux à jetons) pour rester sous les limites du relais SMTP
+"""
+import threading
+import time
+from typing import Callable, List
+
+
+# Tolérance sur le nombre de jetons (erreurs d'arrondi après une attente exacte)
+_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """Seau de ``capacity`` jetons, rempli à ``rate`` jetons par seconde."""
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Délai avant qu'un jeton soit disponible (0 s'il y en a un)."""
+        return 0.0 if self.tokens >= 1 - _EPSILON else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Limite le nombre d'envois par seconde et par minute, tous threads confondus.
+
+    Chaque limite est un seau à jetons: ``acquire()`` prend un jeton dans chaque
+    seau, en attendant si l'un d'eux est vide. Une limite à 0 est désactivée.
+    """
+
+    def __init__(self, per_second: float = 0, per_minute: float = 0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        now = clock()
+        self._buckets: List[TokenBucket] = []
+        if per_second > 0:
+            self._buckets.append(TokenBucket(max(1.0, per_second), per_second, now))
+        if per_minute > 0:
+            self._buckets.append(TokenBucket(max(1.0, per_minute), per_minute / 60.0, now))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._buckets)
+
+    def acquire(self) -> float:
+        """Attend qu'un envoi soit permis; retourne le temps attendu (secondes)."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                for bucket in self._buckets:
+                    bucket.refill(now)
+                delay = max((bucket.wait_time() for bucket in self._buckets), default=0.0)
+                if delay <= 0:
+                    for bucket in self._buckets:
+                        bucket.tokens = max(0.0, bucket.tokens - 1)
+                    return waited
+            self._sleep(delay)
+            waited += delay
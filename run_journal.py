@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Journal persistant des lancements (SQLite): état de chaque ligne par étape, pour la reprise
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# États d'une ligne
+PENDING = "en_attente"
+RENDERED = "rendu"
+CONVERTED = "converti"
+SENT = "envoye"
+# Email déposé dans la boîte d'envoi (envoyé ensuite par l'expéditeur séparé)
+SPOOLED = "depose"
+FAILED = "echec"
+
+# Étape d'envoi: un échec à cette étape laisse le PDF produit réutilisable
+SEND_STAGE = "envoi"
+
+# Colonne d'horodatage renseignée à chaque changement d'état
+_TIMESTAMP_COLUMNS = {
+    RENDERED: "rendered_at",
+    CONVERTED: "converted_at",
+    SENT: "sent_at",
+    FAILED: "failed_at",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    csv TEXT NOT NULL,
+    template TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS runs_csv ON runs (csv, id);
+CREATE TABLE IF NOT EXISTS rows (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    idx INTEGER NOT NULL,
+    row_key TEXT NOT NULL,
+    nom TEXT,
+    email TEXT,
+    status TEXT NOT NULL,
+    docx TEXT,
+    pdf TEXT,
+    etape TEXT,
+    erreur TEXT,
+    rendered_at REAL,
+    converted_at REAL,
+    sent_at REAL,
+    failed_at REAL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (run_id, idx)
+);
+CREATE INDEX IF NOT EXISTS rows_status ON rows (run_id, status);
+"""
+
+
+def converted_pdf(record: Optional[Dict[str, Any]]) -> Optional[str]:
+    """PDF produit pour une ligne du journal, ou None.
+
+    Le PDF d'une ligne en échec reste valable si l'échec a eu lieu à l'envoi,
+    après la conversion.
+    """
+    if not record or not record["pdf"] or record["converted_at"] is None:
+        return None
+    if record["status"] == FAILED and record["etape"] != SEND_STAGE:
+        return None
+    return record["pdf"]
+
+
+def row_key(row: Dict[str, Any]) -> str:
+    """Empreinte du contenu d'une ligne CSV (une ligne modifiée n'est pas reprise)."""
+    payload = json.dumps(sorted((str(k), str(v)) for k, v in row.items()), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _reusable(record: Dict[str, Any]) -> bool:
+    """Une ligne du journal a-t-elle du travail à réutiliser lors d'une reprise?"""
+    return record["status"] != PENDING and (record["status"] != FAILED or converted_pdf(record) is not None)
+
+
+class RunJournal:
+    """Journal des lancements: une entrée par ligne et par lancement.
+
+    Chaque ligne passe par les états ``rendu``, ``converti`` puis ``envoye``
+    ou ``depose`` (ou ``echec``), avec l'horodatage de chaque étape et les chemins produits.
+    Les écritures sont validées immédiatement: un arrêt brutal ne perd que
+    la ligne en cours.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def start_run(self, csv_path: Path, template_path: Path, rows: List[Dict[str, Any]]) -> int:
+        """Crée un lancement et y inscrit toutes les lignes en attente."""
+        now = time.time()
+        with self._lock, self._conn:
+            run_id = self._conn.execute(
+                "INSERT INTO runs (csv, template, started) VALUES (?, ?, ?)",
+                (str(csv_path), str(template_path), now),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO rows (run_id, idx, row_key, nom, email, status, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, i, row_key(row), row.get('nom'), row.get('email'), PENDING, now)
+                 for i, row in enumerate(rows)],
+            )
+        return run_id
+
+    def latest_run(self, csv_path: Path) -> Optional[int]:
+        """Dernier lancement enregistré pour ce fichier CSV."""
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT id FROM runs WHERE csv = ? ORDER BY id DESC LIMIT 1", (str(csv_path),)
+            ).fetchone()
+        return found["id"] if found else None
+
+    def resume_run(self, run_id: int, rows: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Reprend un lancement: retourne l'état des lignes déjà traitées, par index.
+
+        Les lignes dont le contenu a changé depuis (ou ajoutées au CSV) repartent
+        en attente; les lignes en échec sont à retraiter, en gardant leur PDF si
+        elles ont échoué à l'envoi (voir ``converted_pdf``).
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            known = self._known_rows(run_id)
+            reset = []
+            for i, row in enumerate(rows):
+                key = row_key(row)
+                record = known.get(i)
+                if record is None or record["row_key"] != key:
+                    reset.append((run_id, i, key, row.get('nom'), row.get('email'), PENDING, now))
+                    known.pop(i, None)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (run_id, idx, row_key, nom, email, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                reset,
+            )
+            self._conn.execute("UPDATE runs SET finished = NULL WHERE id = ?", (run_id,))
+        return {i: record for i, record in known.items() if i < len(rows) and _reusable(record)}
+
+    def reopen_run(self, run_id: int) -> Dict[int, Dict[str, Any]]:
+        """Reprend un lancement dont les lignes seront lues en flux (voir ``register_row``).
+
+        Retourne l'état enregistré de chaque ligne, par index.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished = NULL WHERE id = ?", (run_id,))
+            return self._known_rows(run_id)
+
+    def register_row(self, run_id: int, index: int, row: Dict[str, Any],
+                     known: Optional[Dict[int, Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """Inscrit une ligne lue en flux dans un lancement.
+
+        Une ligne inchangée depuis ``known`` (voir ``reopen_run``) garde son état,
+        retourné s'il y a du travail à réutiliser (mêmes règles que ``resume_run``);
+        sinon la ligne est inscrite en attente et None est retourné.
+        """
+        key = row_key(row)
+        record = (known or {}).get(index)
+        if record is not None and record["row_key"] == key:
+            return record if _reusable(record) else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rows (run_id, idx, row_key, nom, email, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, index, key, row.get('nom'), row.get('email'), PENDING, time.time()),
+            )
+        return None
+
+    def _known_rows(self, run_id: int) -> Dict[int, Dict[str, Any]]:
+        return {
+            record["idx"]: dict(record)
+            for record in self._conn.execute("SELECT * FROM rows WHERE run_id = ?", (run_id,))
+        }
+
+    def mark(self, run_id: int, index: int, status: str, path: Optional[Path] = None,
+             error: Optional[str] = None, stage: Optional[str] = None) -> None:
+        """Enregistre le passage d'une ligne à un nouvel état."""
+        now = time.time()
+        assignments = ["status = ?", "updated = ?"]
+        params: List[Any] = [status, now]
+        if status in _TIMESTAMP_COLUMNS:
+            assignments.append(f"{_TIMESTAMP_COLUMNS[status]} = ?")
+            params.append(now)
+        if status == RENDERED:
+            assignments.append("docx = ?")
+            params.append(str(path) if path is not None else None)
+        elif status == CONVERTED:
+            assignments.append("pdf = ?")
+            params.append(str(path) if path is not None else None)
+        if status == FAILED:
+            assignments += ["erreur = ?", "etape = ?"]
+            params += [error, stage]
+        else:
+            assignments.append("erreur = NULL")
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE rows SET {', '.join(assignments)} WHERE run_id = ? AND idx = ?",
+                params + [run_id, index],
+            )
+
+    def rows_with_status(self, run_id: int, *statuses: str) -> List[Dict[str, Any]]:
+        """Lignes d'un lancement dans l'un des états donnés (requête indexée)."""
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock:
+            return [dict(record) for record in self._conn.execute(
+                f"SELECT * FROM rows WHERE run_id = ? AND status IN ({placeholders}) ORDER BY idx",
+                (run_id, *statuses),
+            )]
+
+    def counts(self, run_id: int) -> Dict[str, int]:
+        """Nombre de lignes par état."""
+        with self._lock:
+            return {record["status"]: record["n"] for record in self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM rows WHERE run_id = ? GROUP BY status", (run_id,)
+            )}
+
+    def finish_run(self, run_id: int) -> None:
+        """Marque la fin d'un lancement."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run_id))
+
+    def close(self) -> None:
+        """Ferme la base du journal."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Registre des envois (SQLite): évite de renvoyer un email déjà remis lors d'une relance
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    campaign TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    attachment_sha256 TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (campaign, recipient, attachment_sha256)
+) WITHOUT ROWID;
+"""
+
+
+def file_sha256(path: Optional[Path]) -> str:
+    """Empreinte SHA-256 d'une pièce jointe (chaîne vide sans pièce jointe)."""
+    if path is None or not path.exists():
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SendLedger:
+    """Registre durable des emails remis: (campagne, destinataire, pièce jointe) -> Message-ID.
+
+    Un email n'est enregistré qu'une fois accepté par le serveur SMTP; la
+    vérification avant envoi est une recherche par clé primaire.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _recipient(recipient: str) -> str:
+        return recipient.strip().lower()
+
+    def sent_message_id(self, campaign: str, recipient: str, attachment_sha256: str) -> Optional[str]:
+        """Message-ID de l'email déjà remis pour ce triplet, ou None."""
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT message_id FROM sends WHERE campaign = ? AND recipient = ? AND attachment_sha256 = ?",
+                (campaign, self._recipient(recipient), attachment_sha256),
+            ).fetchone()
+        return found[0] if found else None
+
+    def record(self, campaign: str, recipient: str, attachment_sha256: str, message_id: str) -> None:
+        """Enregistre un email remis."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sends (campaign, recipient, attachment_sha256, message_id, sent_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (campaign, self._recipient(recipient), attachment_sha256, message_id, time.time()),
+            )
+
+    def close(self) -> None:
+        """Ferme la base du registre."""
+        with self._lock:
+            self._conn.close()
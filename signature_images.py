@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Images de la signature intégrées aux emails (parties inline référencées par CID),
+chargées et encodées une seule fois par exécution
+"""
+import hashlib
+import logging
+import mimetypes
+import re
+import threading
+import urllib.request
+from email.mime.base import MIMEBase
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from smtp_message import encode_base64_lines
+
+# Attribut src des balises <img> (valeur entre guillemets simples ou doubles)
+IMG_SRC_PATTERN = re.compile(r"""(<img\b[^>]*?\bsrc\s*=\s*)(["'])(.*?)\2""", re.IGNORECASE | re.DOTALL)
+# Taille maximale d'une image de signature téléchargée
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+
+class InlineImage(NamedTuple):
+    """Image prête à être jointe: contenu base64 partagé par tous les messages."""
+    cid: str
+    maintype: str
+    subtype: str
+    filename: str
+    encoded: bytes
+
+    def mime_part(self) -> MIMEBase:
+        """En-têtes de la partie inline (le contenu est ajouté à la sérialisation)."""
+        part = MIMEBase(self.maintype, self.subtype, name=self.filename)
+        part["Content-ID"] = f"<{self.cid}>"
+        part.add_header("Content-Disposition", "inline", filename=self.filename)
+        return part
+
+
+def download(url: str, timeout: float) -> bytes:
+    """Télécharge une image (refusée au-delà de ``MAX_IMAGE_BYTES``)."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = response.read(MAX_IMAGE_BYTES + 1)
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ValueError(f"image de plus de {MAX_IMAGE_BYTES} octets")
+    return data
+
+
+class SignatureImages:
+    """Remplace les images d'une signature HTML par des parties inline ``cid:``.
+
+    Chaque image est cherchée par son nom de fichier dans ``images_dir``, puis
+    relativement à ``base_dir`` (chemins locaux) ou téléchargée (URL http/https).
+    Elle n'est chargée et encodée qu'une fois; une image introuvable garde son
+    lien d'origine.
+    """
+
+    def __init__(self, images_dir: Optional[Path], base_dir: Optional[Path] = None,
+                 fetch: Callable[[str, float], bytes] = download, timeout: float = 10.0):
+        self.images_dir = images_dir
+        self.base_dir = base_dir
+        self.fetch = fetch
+        self.timeout = timeout
+        self._images: Dict[str, Optional[InlineImage]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, src: str) -> Tuple[str, bytes]:
+        parsed = urlparse(src)
+        name = Path(unquote(parsed.path)).name
+        candidates = []
+        if self.images_dir is not None and name:
+            candidates.append(self.images_dir / name)
+        if parsed.scheme in ("", "file"):
+            path = Path(unquote(parsed.path))
+            candidates.append(path if path.is_absolute() or self.base_dir is None else self.base_dir / path)
+        for path in candidates:
+            if path.is_file():
+                return name, path.read_bytes()
+        if parsed.scheme in ("http", "https"):
+            return name, self.fetch(src, self.timeout)
+        raise FileNotFoundError(f"image introuvable: {src}")
+
+    def _load(self, src: str) -> Optional[InlineImage]:
+        if src.lower().startswith(("cid:", "data:")):
+            return None
+        try:
+            name, data = self._read(src)
+        except (OSError, ValueError) as e:
+            logging.warning(f"[SMTP] Image de signature non intégrée ({src}): {e}")
+            return None
+        mime_type = mimetypes.guess_type(name)[0] or ""
+        maintype, _, subtype = mime_type.partition("/")
+        if maintype != "image":
+            logging.warning(f"[SMTP] Image de signature non intégrée ({src}): type inconnu")
+            return None
+        cid = f"{hashlib.sha1(data).hexdigest()[:16]}@signature"
+        logging.info(f"[SMTP] Image de signature intégrée: {name} ({len(data)} octets)")
+        return InlineImage(cid, maintype, subtype, name, encode_base64_lines(data))
+
+    def load(self, src: str) -> Optional[InlineImage]:
+        """Image correspondant à ``src`` (chargée au premier appel seulement)."""
+        with self._lock:
+            if src not in self._images:
+                self._images[src] = self._load(src)
+            return self._images[src]
+
+    def embed(self, html: str) -> Tuple[str, List[InlineImage]]:
+        """Signature dont les images sont référencées par ``cid:``, et les images à joindre."""
+        images: Dict[str, InlineImage] = {}
+
+        def replace(match: "re.Match") -> str:
+            image = self.load(match.group(3).strip())
+            if image is None:
+                return match.group(0)
+            images[image.cid] = image
+            return f"{match.group(1)}{match.group(2)}cid:{image.cid}{match.group(2)}"
+
+        return IMG_SRC_PATTERN.sub(replace, html), list(images.values())
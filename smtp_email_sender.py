@@ -3,29 +3,42 @@
 Gestionnaire d'envoi d'emails via SMTP (remplace Outlook)
 """
 import logging
-import smtplib
-import ssl
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from email.utils import make_msgid
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import traceback
 
 from config import (
     SEND_EMAIL, FROM_ACCOUNT, CC, BCC, SUBJECT_TEMPLATE, FALLBACK_BODY_HTML_TEMPLATE,
     USE_SYSTEM_SIGNATURE, USE_PROJECT_SIGNATURE, USE_EMAIL_TEMPLATE, SIGNATURE_NAME,
-    MAX_RETRIES, DELAY_SECONDS, SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, 
-    SMTP_PASSWORD, SMTP_USE_TLS, SMTP_USE_SSL
+    MAX_RETRIES, DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS, SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, 
+    SMTP_PASSWORD, SMTP_USE_TLS, SMTP_USE_SSL, CAMPAIGN, SEND_LEDGER_FILE,
+    SMTP_POOL_SIZE, SMTP_TIMEOUT, SMTP_MAX_MESSAGES_PER_CONNECTION,
+    SMTP_SEND_WORKERS, SMTP_RATE_PER_SECOND, SMTP_RATE_PER_MINUTE,
+    EMAIL_TEMPLATE_FILE, PROJECT_SIGNATURE_FILE,
+    STRICT_EMBED_SIGNATURE_IMAGES, SIGNATURE_IMAGES_DIR, SIGNATURE_IMAGE_TIMEOUT
 )
-from file_utils import read_text_smart
+from email_template import EmailBodyTemplate
+from outbox import Outbox, SpooledMessage
+from signature_images import InlineImage, SignatureImages
+from send_ledger import SendLedger, file_sha256
+from rate_limiter import RateLimiter
+from smtp_message import EncodedPartCache, StreamedMessage
+from smtp_pool import SMTPConnectionPool
+from smtp_retry import TRANSIENT, DeferralQueue, backoff_delay, classify_smtp_error
 
 
 class SMTPEmailSender:
     """Classe pour gérer l'envoi d'emails via SMTP."""
     
-    def __init__(self, enabled: bool = SEND_EMAIL):
+    def __init__(self, enabled: bool = SEND_EMAIL, ledger_path: Optional[Path] = SEND_LEDGER_FILE,
+                 campaign: str = CAMPAIGN, workers: int = SMTP_SEND_WORKERS):
         self.enabled = enabled
         self.from_account = FROM_ACCOUNT
         self.cc = CC
@@ -34,10 +47,12 @@ class SMTPEmailSender:
         self.body_template = FALLBACK_BODY_HTML_TEMPLATE
         self.use_signature = USE_SYSTEM_SIGNATURE
         self.use_project_signature = USE_PROJECT_SIGNATURE
+        self.embed_signature_images = STRICT_EMBED_SIGNATURE_IMAGES
         self.use_email_template = USE_EMAIL_TEMPLATE
         self.signature_name = SIGNATURE_NAME
         self.max_retries = MAX_RETRIES
         self.delay_seconds = DELAY_SECONDS
+        self.max_delay_seconds = RETRY_MAX_DELAY_SECONDS
         
         # Configuration SMTP
         self.smtp_server = SMTP_SERVER
@@ -46,183 +61,437 @@ class SMTPEmailSender:
         self.smtp_password = SMTP_PASSWORD
         self.smtp_use_tls = SMTP_USE_TLS
         self.smtp_use_ssl = SMTP_USE_SSL
+        self.smtp_pool_size = SMTP_POOL_SIZE
+        self._pool = None
+        # Pièces jointes envoyées à plusieurs destinataires: encodées une seule fois
+        self.encoded_parts = EncodedPartCache()
+        # Corps des emails: template et signature lus une fois, relus s'ils changent
+        self._body_template = None
+        
+        # Envois simultanés, limités globalement en débit
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(SMTP_RATE_PER_SECOND, SMTP_RATE_PER_MINUTE)
+        
+        # Registre des envois (emails déjà remis ignorés lors d'une relance)
+        self.campaign = campaign
+        self.ledger_path = ledger_path
+        self._ledger = None
+        self.skipped = 0
+        # Clé déterministe du document joint à une ligne (ex. DocumentGenerator.content_key);
+        # sans elle, la pièce jointe est identifiée par l'empreinte du fichier
+        self.document_key: Optional[Callable[[Dict[str, Any]], str]] = None
+        self._lock = threading.Lock()
+        # Verrous d'envoi en cours par (destinataire, pièce jointe), avec leur nombre d'utilisateurs
+        self._send_locks: Dict[Tuple[str, str], Tuple[threading.Lock, int]] = {}
+        
+        # Envois différés hors lot (voir send_email): renvoyés par un thread dédié
+        self._deferred = DeferralQueue()
+        self._deferred_wakeup = threading.Event()
+        self._retry_thread: Optional[threading.Thread] = None
     
-    def send_emails_batch(self, rows: List[Dict[str, Any]], pdf_files: List[Path]) -> int:
-        """Envoie les emails pour une liste de données."""
+    def is_ready(self) -> bool:
+        """Vérifie que l'envoi est activé et configuré."""
         if not self.enabled:
             logging.info("Envoi d'emails désactivé")
-            return 0
-        
+            return False
         
         if not self.smtp_password:
             logging.error("Mot de passe SMTP non configuré dans config.py")
-            return 0
+            return False
         
-        sent = 0
+        return True
+    
+    def _get_ledger(self) -> Optional[SendLedger]:
+        """Ouvre le registre des envois (None s'il est désactivé)."""
+        with self._lock:
+            if self._ledger is None and self.ledger_path is not None:
+                self._ledger = SendLedger(self.ledger_path)
+            return self._ledger
+    
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        """Pool de sessions SMTP (créé au premier accès, ex. pour en suivre les compteurs)."""
+        return self._get_pool()
+    
+    def _get_pool(self) -> SMTPConnectionPool:
+        """Crée le pool de sessions SMTP au premier envoi."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = SMTPConnectionPool(
+                    self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password,
+                    self.smtp_use_tls, self.smtp_use_ssl, self.smtp_pool_size,
+                    SMTP_TIMEOUT, SMTP_MAX_MESSAGES_PER_CONNECTION
+                )
+            return self._pool
+    
+    @contextmanager
+    def _send_lock(self, to_email: str, attachment_hash: str) -> Iterator[None]:
+        """Verrou d'un couple (destinataire, pièce jointe): deux lignes identiques
+        envoyées en parallèle consultent le registre l'une après l'autre.
+        
+        Le verrou est oublié dès qu'aucun envoi ne l'utilise plus.
+        """
+        key = (to_email.lower(), attachment_hash)
+        with self._lock:
+            lock, users = self._send_locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._send_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                users = self._send_locks[key][1] - 1
+                if users:
+                    self._send_locks[key] = (lock, users)
+                else:
+                    del self._send_locks[key]
+    
+    def close(self) -> None:
+        """Ferme les sessions SMTP et le registre des envois."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+            if self._ledger is not None:
+                self._ledger.close()
+                self._ledger = None
+    
+    def send_email(self, row: Dict[str, Any], pdf_path: Optional[Path], index: Optional[int] = None,
+                   on_retried: Optional[Callable[[bool], None]] = None) -> Optional[bool]:
+        """Envoie l'email d'une ligne; retourne False si la ligne est ignorée ou en échec.
+        
+        Un email déjà remis pour cette campagne, ce destinataire et cette pièce
+        jointe (voir ``SendLedger``) n'est pas renvoyé: la ligne compte comme
+        envoyée et ``skipped`` est incrémenté.
         
-        for idx, row in enumerate(rows):
+        Avec ``on_retried``, l'envoi est tenté une fois: un échec temporaire place
+        la ligne dans la file des différés, renvoyée par un thread dédié sans
+        bloquer l'appelant; None est retourné et ``on_retried(envoyé)`` est appelé
+        à l'issue (voir ``wait_deferred``). Sinon, les échecs temporaires sont
+        retentés sur place (voir ``_send_via_smtp``).
+        """
+        if on_retried is not None:
+            return self._try_deliver(row, pdf_path, index, 1,
+                                     lambda item, delay: self._defer(item + (on_retried,), delay))
+        try:
+            return self._deliver(row, pdf_path, index, self.max_retries)
+        except Exception as e:
+            logging.error(f"Échec envoi à {(row.get('email') or '').strip()}: {e}")
+            logging.debug(traceback.format_exc())
+            return False
+    
+    def _try_deliver(self, row: Dict[str, Any], pdf_path: Optional[Path], index: Optional[int], number: int,
+                     defer: Callable[[tuple, float], None]) -> Optional[bool]:
+        """Tentative n° ``number`` d'envoi d'une ligne.
+        
+        Un échec temporaire, tant qu'il reste des essais, est confié à
+        ``defer((row, pdf_path, index, number + 1), délai)`` et None est retourné.
+        """
+        try:
+            return self._deliver(row, pdf_path, index, 1)
+        except Exception as e:
             to_email = (row.get("email") or "").strip()
-            if not to_email:
-                logging.info(f"Pas d'email pour la ligne {idx+1}: {row.get('nom')}")
-                continue
+            if classify_smtp_error(e) == TRANSIENT and number < self.max_retries:
+                delay = backoff_delay(number, self.delay_seconds, self.max_delay_seconds)
+                logging.warning(f"[SMTP] Échec temporaire pour {to_email} (tentative {number}): {e}; "
+                                f"nouvel essai dans {delay:.1f} s")
+                defer((row, pdf_path, index, number + 1), delay)
+                return None
+            logging.error(f"Échec envoi à {to_email}: {e}")
+            logging.debug(traceback.format_exc())
+            return False
+    
+    def _defer(self, item: tuple, delay: float) -> None:
+        """Diffère un envoi de ``send_email`` et démarre le thread des nouveaux essais si besoin."""
+        self._deferred.push(item, delay)
+        with self._lock:
+            if self._retry_thread is None:
+                self._retry_thread = threading.Thread(target=self._retry_deferred, name="smtp-differes",
+                                                      daemon=True)
+                self._retry_thread.start()
+        self._deferred_wakeup.set()
+    
+    def _retry_deferred(self) -> None:
+        """Renvoie les emails différés à leur heure, jusqu'à ce que la file soit vide."""
+        while True:
+            self._deferred_wakeup.clear()
+            for row, pdf_path, index, number, on_retried in self._deferred.pop_due():
+                result = self._try_deliver(row, pdf_path, index, number,
+                                           lambda item, delay: self._deferred.push(item + (on_retried,), delay))
+                if result is not None:
+                    on_retried(result)
+            with self._lock:
+                if not self._deferred:
+                    self._retry_thread = None
+                    return
+            self._deferred_wakeup.wait(self._deferred.next_delay())
+    
+    def wait_deferred(self) -> None:
+        """Attend la fin des nouveaux essais des envois différés par ``send_email``."""
+        while True:
+            with self._lock:
+                thread = self._retry_thread
+            if thread is None:
+                return
+            thread.join()
+    
+    def _deliver(self, row: Dict[str, Any], pdf_path: Optional[Path], index: Optional[int],
+                 attempts: int) -> bool:
+        """Envoie l'email d'une ligne en ``attempts`` tentatives au plus; lève l'erreur finale."""
+        to_email = (row.get("email") or "").strip()
+        if not to_email:
+            line = f"la ligne {index+1}" if index is not None else "la ligne"
+            logging.info(f"Pas d'email pour {line}: {row.get('nom')}")
+            return False
+        
+        attachment_hash = self._attachment_key(row, pdf_path) if self.ledger_path is not None else None
+        return self._send_once(self.campaign, to_email, attachment_hash,
+                               lambda: self._send_single_email(row, pdf_path, attempts))
+    
+    def _attachment_key(self, row: Dict[str, Any], pdf_path: Optional[Path]) -> str:
+        """Identifiant de la pièce jointe d'une ligne dans le registre des envois.
+        
+        Un PDF reconverti (cache des sorties manqué) n'a pas les mêmes octets:
+        la clé du document, si elle est connue, évite de le renvoyer.
+        """
+        if self.document_key is not None and pdf_path is not None:
+            return self.document_key(row)
+        return file_sha256(pdf_path)
+    
+    def _send_once(self, campaign: str, to_email: str, attachment_hash: Optional[str],
+                   send: Callable[[], str]) -> bool:
+        """Appelle ``send`` (qui retourne le Message-ID) sauf si le registre indique
+        que cet email a déjà été remis."""
+        ledger = self._get_ledger()
+        if ledger is None or attachment_hash is None:
+            send()
+            return True
+        
+        with self._send_lock(to_email, attachment_hash):
+            message_id = ledger.sent_message_id(campaign, to_email, attachment_hash)
+            if message_id:
+                logging.info(f"[SMTP] Déjà envoyé à {to_email} ({message_id}), ignoré")
+                with self._lock:
+                    self.skipped += 1
+                return True
             
-            try:
-                self._send_single_email(row, pdf_files[idx] if idx < len(pdf_files) else None)
-                sent += 1
-            except Exception as e:
-                logging.error(f"Échec envoi à {to_email}: {e}")
-                logging.error(traceback.format_exc())
+            message_id = send()
+            ledger.record(campaign, to_email, attachment_hash, message_id)
+        return True
+    
+    def spool_email(self, row: Dict[str, Any], pdf_path: Optional[Path], outbox: Outbox,
+                    index: Optional[int] = None) -> Optional[Path]:
+        """Dépose l'email complet d'une ligne dans la boîte d'envoi, sans l'envoyer.
         
-        logging.info(f"Emails envoyés: {sent}/{len(rows)}")
+        Retourne le fichier .eml déposé (None si la ligne n'a pas d'email).
+        """
+        to_email = (row.get("email") or "").strip()
+        if not to_email:
+            line = f"la ligne {index+1}" if index is not None else "la ligne"
+            logging.info(f"Pas d'email pour {line}: {row.get('nom')}")
+            return None
+        
+        message = self._build_message(row, pdf_path)
+        envelope = {
+            "from": self.from_account,
+            "to": to_email,
+            "recipients": self._recipients(to_email),
+            "campaign": self.campaign,
+            "attachment": self._attachment_key(row, pdf_path),
+            "message_id": message['Message-ID'],
+        }
+        path = outbox.put(message, envelope)
+        logging.info(f"[SMTP] Email pour {to_email} déposé: {path.name}")
+        return path
+    
+    def deliver_spooled(self, spooled: SpooledMessage, attempts: Optional[int] = None) -> bool:
+        """Envoie un email de la boîte d'envoi (registre des envois compris); lève l'erreur finale."""
+        envelope = spooled.envelope
+        
+        def send() -> str:
+            self._send_via_smtp(spooled, spooled.to, attempts, spooled.recipients, spooled.from_addr)
+            return envelope["message_id"]
+        
+        return self._send_once(envelope["campaign"], spooled.to, envelope["attachment"], send)
+    
+    def send_all(self, rows: List[Dict[str, Any]], pdf_files: List[Path],
+                 on_result: Optional[Callable[[int, bool], None]] = None) -> List[bool]:
+        """Envoie les emails d'une liste de lignes, jusqu'à ``workers`` à la fois.
+        
+        Chaque ligne est tentée une fois. Un échec temporaire (4xx, coupure,
+        délai dépassé) place la ligne dans une file de différés, retentée après
+        un délai exponentiel avec gigue pendant que le reste du lot continue;
+        un échec définitif (5xx, authentification) est immédiat.
+        ``on_result(index, envoyé)`` est appelé dès qu'une ligne est terminée;
+        les résultats sont retournés dans l'ordre des lignes.
+        """
+        deferred = DeferralQueue()
+        
+        def attempt(idx: int, number: int) -> Optional[bool]:
+            return self._try_deliver(rows[idx], pdf_files[idx] if idx < len(pdf_files) else None, idx, number,
+                                     lambda item, delay: deferred.push((idx, item[3]), delay))
+        
+        results = [False] * len(rows)
+        workers = max(1, min(self.workers, len(rows)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp") as executor:
+            pending = {executor.submit(attempt, idx, 1): idx for idx in range(len(rows))}
+            while pending or deferred:
+                for idx, number in deferred.pop_due():
+                    pending[executor.submit(attempt, idx, number)] = idx
+                if not pending:
+                    time.sleep(deferred.next_delay() or 0)
+                    continue
+                done, _ = wait(pending, timeout=deferred.next_delay(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = pending.pop(future)
+                    result = future.result()
+                    if result is None:
+                        continue  # différé
+                    results[idx] = result
+                    if on_result is not None:
+                        on_result(idx, result)
+        return results
+    
+    def send_emails_batch(self, rows: List[Dict[str, Any]], pdf_files: List[Path],
+                          on_result: Optional[Callable[[int, bool], None]] = None) -> int:
+        """Envoie les emails pour une liste de données.
+        
+        ``on_result(index, envoyé)`` est appelé après chaque ligne.
+        """
+        if not self.is_ready():
+            return 0
+        
+        skipped_before = self.skipped
+        sent = sum(self.send_all(rows, pdf_files, on_result))
+        
+        skipped = self.skipped - skipped_before
+        sent -= skipped
+        logging.info(f"Emails envoyés: {sent}/{len(rows)}"
+                     + (f" ({skipped} déjà envoyé(s), ignoré(s))" if skipped else ""))
         return sent
     
-    def _send_single_email(self, row: Dict[str, Any], pdf_path: Optional[Path]) -> None:
-        """Envoie un email pour une ligne de données."""
+    def _send_single_email(self, row: Dict[str, Any], pdf_path: Optional[Path],
+                           attempts: Optional[int] = None) -> str:
+        """Envoie un email pour une ligne de données et retourne son Message-ID."""
+        message = self._build_message(row, pdf_path)
+        self._send_via_smtp(message, message['To'], attempts)
+        return message['Message-ID']
+    
+    def _build_message(self, row: Dict[str, Any], pdf_path: Optional[Path]) -> StreamedMessage:
+        """Construit l'email d'une ligne; la pièce jointe n'est lue qu'à l'envoi."""
         to_email = row.get("email", "").strip()
         name = row.get("nom", "")
         
         subject = self.subject_template.format(nom=name)
-        body_html = self._prepare_email_body(name)
+        body_html, images = self._prepare_email_body(name, row)
         
-        # Créer le message
-        msg = MIMEMultipart('alternative')
+        # Créer le message (les destinataires Bcc ne figurent pas dans les en-têtes)
+        msg = MIMEMultipart('mixed')
         msg['From'] = self.from_account
         msg['To'] = to_email
         msg['Subject'] = subject
+        domain = self.from_account.rpartition("@")[2] if self.from_account and "@" in self.from_account else None
+        msg['Message-ID'] = make_msgid(domain=domain)
         
         if self.cc:
             msg['Cc'] = self.cc
-        if self.bcc:
-            msg['Bcc'] = self.bcc
         
-        # Ajouter le contenu HTML
+        # Ajouter le contenu HTML, avec les images de la signature (déjà encodées)
+        message = StreamedMessage(msg, self.encoded_parts)
         html_part = MIMEText(body_html, 'html', 'utf-8')
-        msg.attach(html_part)
+        if images:
+            related = MIMEMultipart('related')
+            related.attach(html_part)
+            msg.attach(related)
+            for image in images:
+                message.attach_encoded(image.mime_part(), image.encoded, parent=related)
+        else:
+            msg.attach(html_part)
         
         # Ajouter les pièces jointes
         if pdf_path and pdf_path.exists():
-            self._attach_file(msg, pdf_path)
-        
-        # Envoyer l'email
-        self._send_via_smtp(msg, to_email)
+            self._attach_file(message, pdf_path)
+        return message
     
-    def _prepare_email_body(self, name: str) -> str:
-        """Prépare le corps de l'email avec template et signature."""
-        # Charger le template d'email si activé
-        if self.use_email_template:
-            try:
-                from config import EMAIL_TEMPLATE_FILE
-                if EMAIL_TEMPLATE_FILE.exists():
-                    with open(EMAIL_TEMPLATE_FILE, "r", encoding="utf-8") as f:
-                        template_html = f.read()
-                    # Remplacer les variables dans le template
-                    from datetime import datetime
-                    template_html = template_html.replace("{{DATE_SOUMISSION}}", datetime.now().strftime("%d/%m/%Y"))
-                    body_html = template_html
-                    logging.debug("[SMTP] Template d'email chargé")
-                else:
-                    body_html = self.body_template.format(nom=name)
-            except Exception as e:
-                logging.warning(f"[SMTP] Erreur chargement template: {e}")
-                body_html = self.body_template.format(nom=name)
-        else:
-            body_html = self.body_template.format(nom=name)
-        
-        # Ajouter la signature
-        signature_html = self._load_signature()
-        if signature_html:
-            body_html += signature_html
-            logging.debug("[SMTP] Signature ajoutée")
-        
-        return body_html
+    def _get_body_template(self) -> EmailBodyTemplate:
+        """Modèle du corps (template + signature), compilé au premier email."""
+        if self._body_template is None:
+            images = None
+            if self.embed_signature_images:
+                images = SignatureImages(SIGNATURE_IMAGES_DIR, PROJECT_SIGNATURE_FILE.parent,
+                                         timeout=SIGNATURE_IMAGE_TIMEOUT)
+            self._body_template = EmailBodyTemplate(
+                EMAIL_TEMPLATE_FILE if self.use_email_template else None,
+                PROJECT_SIGNATURE_FILE if self.use_project_signature else None,
+                self.body_template,
+                images=images,
+            )
+        return self._body_template
     
-    def _load_signature(self) -> str:
-        """Charge la signature appropriée."""
-        try:
-            # Priorité: signature du projet
-            if self.use_project_signature:
-                from config import PROJECT_SIGNATURE_FILE
-                if PROJECT_SIGNATURE_FILE.exists():
-                    with open(PROJECT_SIGNATURE_FILE, "r", encoding="utf-8") as f:
-                        return f.read()
-        except Exception as e:
-            logging.warning(f"[SMTP] Erreur chargement signature: {e}")
-        
-        return ""
+    def _prepare_email_body(self, name: str,
+                            row: Optional[Dict[str, Any]] = None) -> Tuple[str, List[InlineImage]]:
+        """Prépare le corps de l'email (template et signature, sans lecture de fichier)
+        et retourne les images inline qu'il référence."""
+        template = self._get_body_template()
+        compiled = template.compiled()
+        return compiled.render(template.values(name, row)), compiled.images
     
-    def _attach_file(self, msg: MIMEMultipart, file_path: Path) -> None:
-        """Attache un fichier au message."""
+    def _attach_file(self, message: StreamedMessage, file_path: Path) -> None:
+        """Attache un fichier au message (encodé par blocs au moment de l'envoi)."""
         try:
-            with open(file_path, "rb") as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-            
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename= {file_path.name}'
-            )
-            msg.attach(part)
+            if file_path.suffix.lower() == ".pdf":
+                message.attach_file(file_path)
+            else:
+                message.attach_file(file_path, "application", "octet-stream")
             logging.debug(f"[SMTP] Fichier attaché: {file_path}")
         except Exception as e:
             logging.warning(f"[SMTP] Impossible d'attacher {file_path}: {e}")
     
-    def _send_via_smtp(self, msg: MIMEMultipart, to_email: str) -> None:
-        """Envoie l'email via SMTP avec retry."""
-        for attempt in range(1, self.max_retries + 1):
+    def _recipients(self, to_email: str) -> List[str]:
+        """Destinataires de l'enveloppe SMTP: destinataire, copies et copies cachées."""
+        recipients = [to_email]
+        if self.cc:
+            recipients.extend([email.strip() for email in self.cc.split(',') if email.strip()])
+        if self.bcc:
+            recipients.extend([email.strip() for email in self.bcc.split(',') if email.strip()])
+        return recipients
+    
+    def _send_via_smtp(self, message: Iterable[bytes], to_email: str, attempts: Optional[int] = None,
+                       recipients: Optional[List[str]] = None, from_addr: Optional[str] = None) -> None:
+        """Envoie l'email via une session du pool SMTP avec retry.
+        
+        Seuls les échecs temporaires sont retentés, après un délai exponentiel
+        avec gigue; un échec définitif est levé immédiatement.
+        """
+        attempts = attempts or self.max_retries
+        recipients = recipients or self._recipients(to_email)
+        for attempt in range(1, attempts + 1):
             try:
-                # Créer la connexion SMTP
-                if self.smtp_use_ssl:
-                    context = ssl.create_default_context()
-                    server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
-                else:
-                    server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                    if self.smtp_use_tls:
-                        context = ssl.create_default_context()
-                        server.starttls(context=context)
-                
-                # Authentification
-                server.login(self.smtp_username, self.smtp_password)
-                
-                # Préparer les destinataires
-                recipients = [to_email]
-                if self.cc:
-                    recipients.extend([email.strip() for email in self.cc.split(',') if email.strip()])
-                if self.bcc:
-                    recipients.extend([email.strip() for email in self.bcc.split(',') if email.strip()])
-                
-                # Envoyer l'email
-                text = msg.as_string()
-                server.sendmail(self.from_account, recipients, text)
-                server.quit()
+                # Envoyer l'email sur une session déjà authentifiée, au débit permis par le relais
+                self.rate_limiter.acquire()
+                self._get_pool().send(from_addr or self.from_account, recipients, message)
                 
                 logging.info(f"[SMTP] Email envoyé avec succès à {to_email}")
                 return
                 
             except Exception as e:
+                if classify_smtp_error(e) != TRANSIENT:
+                    logging.warning(f"[SMTP] Refus définitif pour {to_email}: {e}")
+                    raise
                 logging.warning(f"[SMTP] Tentative {attempt} échouée: {e}")
-                if attempt < self.max_retries:
-                    import time
-                    time.sleep(self.delay_seconds)
+                if attempt < attempts:
+                    time.sleep(backoff_delay(attempt, self.delay_seconds, self.max_delay_seconds))
                 else:
                     raise
         
-        raise RuntimeError(f"[SMTP] Échec envoi à {to_email} après {self.max_retries} tentatives.")
+        raise RuntimeError(f"[SMTP] Échec envoi à {to_email} après {attempts} tentatives.")
     
     def test_connection(self) -> bool:
-        """Teste la connexion SMTP."""
+        """Teste la connexion SMTP (la session ouverte reste dans le pool pour les envois)."""
         try:
-            if self.smtp_use_ssl:
-                context = ssl.create_default_context()
-                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
-            else:
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                if self.smtp_use_tls:
-                    context = ssl.create_default_context()
-                    server.starttls(context=context)
-            
-            server.login(self.smtp_username, self.smtp_password)
-            server.quit()
+            self._get_pool().check()
             logging.info("[SMTP] Connexion testée avec succès")
             return True
         except Exception as e:
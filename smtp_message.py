@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Sérialisation des emails en flux d'octets: pièces jointes encodées en base64 par
+blocs depuis le fichier, parties encodées partagées entre messages
+"""
+import base64
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from email import policy
+from email.generator import BytesGenerator
+from email.message import Message
+from email.mime.base import MIMEBase
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+# Politique de sérialisation SMTP: fins de ligne CRLF, en-têtes au format classique
+SMTP_POLICY = policy.compat32.clone(linesep="\r\n")
+
+# Base64: 57 octets donnent une ligne de 76 caractères; les pièces jointes sont
+# lues et encodées par blocs de 1024 lignes (environ 57 Kio lus, 78 Kio produits)
+BASE64_LINE_BYTES = 57
+ATTACHMENT_CHUNK_SIZE = BASE64_LINE_BYTES * 1024
+# Taille maximale des parties encodées gardées en mémoire pour être réutilisées
+ENCODED_PART_CACHE_BYTES = 64 * 1024 * 1024
+# Nombre de fichiers envoyés une seule fois dont on se souvient (LRU)
+SEEN_FILES_MAX = 4096
+
+
+def file_key(path: Path) -> Tuple[int, int, int, int]:
+    """Identité d'un fichier (périphérique, inode, date de modification, taille).
+
+    Les liens physiques d'un même document partagé ont la même identité.
+    """
+    st = path.stat()
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def iter_base64_file(path: Path, chunk_size: int = ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode un fichier en base64 (lignes de 76 caractères, CRLF), bloc par bloc."""
+    chunk_size -= chunk_size % BASE64_LINE_BYTES
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            yield encode_base64_lines(block)
+
+
+def encode_base64_lines(data: bytes) -> bytes:
+    """Encode des octets en base64 découpé en lignes de 76 caractères terminées par CRLF."""
+    lines = [base64.b64encode(data[i:i + BASE64_LINE_BYTES])
+             for i in range(0, len(data), BASE64_LINE_BYTES)]
+    return b"\r\n".join(lines) + b"\r\n" if lines else b""
+
+
+class EncodedPartCache:
+    """Parties encodées en base64, partagées par tous les messages (LRU borné en octets).
+
+    Un fichier n'est gardé en mémoire qu'à partir de son deuxième envoi: une
+    pièce jointe propre à un destinataire reste encodée en flux. Seuls les
+    ``max_seen`` derniers fichiers envoyés une fois sont mémorisés.
+    """
+
+    def __init__(self, max_bytes: int = ENCODED_PART_CACHE_BYTES, max_seen: int = SEEN_FILES_MAX):
+        self.max_bytes = max_bytes
+        self.max_seen = max_seen
+        self.size = 0
+        self.hits = 0
+        self._parts: "OrderedDict[Tuple[int, int, int, int], bytes]" = OrderedDict()
+        self._seen: "OrderedDict[Tuple[int, int, int, int], None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int, int, int]) -> Optional[bytes]:
+        with self._lock:
+            encoded = self._parts.get(key)
+            if encoded is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+            return encoded
+
+    def put(self, key: Tuple[int, int, int, int], encoded: bytes) -> None:
+        if len(encoded) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._parts:
+                return
+            self._parts[key] = encoded
+            self.size += len(encoded)
+            while self.size > self.max_bytes:
+                _, removed = self._parts.popitem(last=False)
+                self.size -= len(removed)
+
+    def file_part(self, path: Path) -> Union[bytes, Iterator[bytes]]:
+        """Contenu encodé d'un fichier: octets partagés s'il a déjà été envoyé, sinon un flux."""
+        key = file_key(path)
+        encoded = self.get(key)
+        if encoded is not None:
+            return encoded
+        with self._lock:
+            # Deuxième envoi: le fichier passe dans les parties partagées
+            shared = self._seen.pop(key, False) is None
+            if not shared:
+                self._seen[key] = None
+                if len(self._seen) > self.max_seen:
+                    self._seen.popitem(last=False)
+        if shared and key[3] * 4 // 3 <= self.max_bytes:
+            encoded = encode_base64_lines(path.read_bytes())
+            self.put(key, encoded)
+            return encoded
+        return iter_base64_file(path)
+
+
+class StreamedMessage:
+    """Email dont les parties lourdes sont insérées au moment de la sérialisation.
+
+    Les en-têtes et les parties légères sont produits par ``BytesGenerator``;
+    chaque pièce jointe n'y figure que par un repère, remplacé lors de
+    l'itération par son contenu base64 lu par blocs (ou partagé via
+    ``EncodedPartCache``). Le message peut être itéré plusieurs fois (nouvel essai).
+    """
+
+    def __init__(self, message: Message, cache: Optional[EncodedPartCache] = None):
+        self.message = message
+        self.cache = cache
+        self._sources: Dict[bytes, Union[Path, bytes]] = {}
+
+    def __getitem__(self, name: str) -> Optional[str]:
+        return self.message[name]
+
+    def _placeholder(self, source: Union[Path, bytes]) -> str:
+        marker = f"@@PARTIE-{uuid.uuid4().hex}@@"
+        self._sources[marker.encode("ascii")] = source
+        return marker
+
+    def attach_file(self, path: Path, maintype: str = "application", subtype: str = "pdf",
+                    parent: Optional[Message] = None) -> MIMEBase:
+        """Joint un fichier, encodé en base64 depuis le disque à chaque envoi."""
+        part = MIMEBase(maintype, subtype, name=path.name)
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=path.name)
+        part.set_payload(self._placeholder(path))
+        (parent or self.message).attach(part)
+        return part
+
+    def attach_encoded(self, part: MIMEBase, encoded: bytes, parent: Optional[Message] = None) -> MIMEBase:
+        """Joint une partie dont le contenu base64 (``encoded``) est déjà prêt et partagé."""
+        part["Content-Transfer-Encoding"] = "base64"
+        part.set_payload(self._placeholder(encoded))
+        (parent or self.message).attach(part)
+        return part
+
+    def _skeleton(self) -> bytes:
+        output = BytesIO()
+        BytesGenerator(output, mangle_from_=False, policy=SMTP_POLICY).flatten(self.message)
+        return output.getvalue()
+
+    def __iter__(self) -> Iterator[bytes]:
+        skeleton = self._skeleton()
+        if not self._sources:
+            yield skeleton
+            return
+        pattern = re.compile(b"|".join(re.escape(marker) + b"(?:\r\n)?" for marker in self._sources))
+        position = 0
+        for match in pattern.finditer(skeleton):
+            yield skeleton[position:match.start()]
+            source = self._sources[match.group(0).rstrip(b"\r\n")]
+            if isinstance(source, bytes):
+                yield source
+            elif self.cache is not None:
+                part = self.cache.file_part(source)
+                yield from ([part] if isinstance(part, bytes) else part)
+            else:
+                yield from iter_base64_file(source)
+            position = match.end()
+        yield skeleton[position:]
+
+    def as_bytes(self) -> bytes:
+        """Message complet en mémoire (tests, spool)."""
+        return b"".join(self)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de sessions SMTP authentifiées, réutilisées d'un message à l'autre
+"""
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Union
+
+
+def _send_data_stream(smtp: smtplib.SMTP, from_addr: str, recipients: Sequence[str],
+                      chunks: Iterable[bytes]) -> None:
+    """Équivalent de ``SMTP.sendmail`` pour un message produit par blocs.
+
+    Le message n'est jamais assemblé en mémoire: chaque bloc (fins de ligne
+    CRLF) est envoyé après doublement des points en début de ligne.
+    """
+    smtp.ehlo_or_helo_if_needed()
+    code, response = smtp.mail(from_addr)
+    if code != 250:
+        if code == 421:
+            smtp.close()
+        else:
+            smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, response, from_addr)
+    refused = {}
+    for recipient in recipients:
+        code, response = smtp.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+        if code == 421:
+            smtp.close()
+            raise smtplib.SMTPRecipientsRefused(refused)
+    if len(refused) == len(recipients):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    smtp.putcmd("data")
+    code, response = smtp.getreply()
+    if code != 354:
+        raise smtplib.SMTPDataError(code, response)
+    line_start = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if line_start and chunk.startswith(b"."):
+            chunk = b"." + chunk
+        smtp.send(chunk.replace(b"\n.", b"\n.."))
+        line_start = chunk.endswith(b"\n")
+    smtp.send(b".\r\n" if line_start else b"\r\n.\r\n")
+    code, response = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, response)
+
+
+def _closing_reply(error: Exception) -> bool:
+    """La réponse du serveur annonce-t-elle la fermeture de la session (421)?"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code == 421 for code, _ in error.recipients.values())
+    return getattr(error, "smtp_code", None) == 421
+
+
+class PooledConnection:
+    """Session SMTP du pool et ses compteurs d'utilisation."""
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Garde jusqu'à ``size`` sessions SMTP ouvertes et authentifiées.
+
+    Une session est créée au premier besoin (connexion, STARTTLS, login) puis
+    réutilisée: un ``RSET`` la remet à zéro entre deux messages. Une session
+    inactive depuis ``idle_check`` secondes est testée (``NOOP``) avant usage;
+    une session fermée par le serveur est remplacée. Au-delà de
+    ``max_messages`` messages, la session est fermée et renouvelée.
+
+    ``on_timing(attente, utilisation)``, s'il est défini, reçoit pour chaque
+    usage d'une session le temps passé à l'obtenir (place libre, ouverture) et
+    celui de son utilisation, jusqu'à la fin de l'envoi (en secondes).
+    """
+
+    def __init__(self, server: str, port: int, username: str, password: str,
+                 use_tls: bool = True, use_ssl: bool = False, size: int = 4,
+                 timeout: float = 30.0, max_messages: int = 100, idle_check: float = 30.0):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_check = idle_check
+        self.connections_opened = 0
+        self.on_timing: Optional[Callable[[float, float], None]] = None
+        self._idle: List[PooledConnection] = []
+        self._in_use = 0
+        self._closed = False
+        self._available = threading.Condition()
+
+    def _connect(self) -> PooledConnection:
+        """Ouvre et authentifie une nouvelle session."""
+        if self.use_ssl:
+            context = ssl.create_default_context()
+            smtp = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout, context=context)
+        else:
+            smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls and not self.use_ssl:
+                context = ssl.create_default_context()
+                smtp.starttls(context=context)
+            smtp.login(self.username, self.password)
+        except Exception:
+            self._discard(smtp)
+            raise
+        with self._available:
+            self.connections_opened += 1
+        logging.debug(f"[SMTP] Nouvelle session ouverte vers {self.server}:{self.port}")
+        return PooledConnection(smtp)
+
+    @staticmethod
+    def _discard(smtp: smtplib.SMTP) -> None:
+        """Ferme une session sans propager d'erreur."""
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, connection: PooledConnection) -> bool:
+        """Vérifie une session restée inactive trop longtemps."""
+        if time.monotonic() - connection.last_used < self.idle_check:
+            return True
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _take(self) -> Optional[PooledConnection]:
+        """Prend une session libre, ou réserve une place pour en ouvrir une (retourne None)."""
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Pool SMTP fermé")
+                if self._idle:
+                    self._in_use += 1
+                    return self._idle.pop()
+                if self._in_use + len(self._idle) < self.size:
+                    self._in_use += 1
+                    return None
+                self._available.wait()
+
+    def _give_back(self, connection: Optional[PooledConnection]) -> None:
+        """Rend une place au pool (et la session si elle est réutilisable)."""
+        with self._available:
+            self._in_use -= 1
+            if connection is not None and not self._closed:
+                self._idle.append(connection)
+                connection = None
+            self._available.notify()
+        if connection is not None:
+            self._discard(connection.smtp)
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Fournit une session vivante; elle est rendue au pool après usage.
+
+        Si le bloc lève une exception, la session est fermée plutôt que réutilisée,
+        sauf si le serveur a répondu (refus d'un destinataire, erreur 4xx/5xx)
+        sans fermer la session (réponse 421 ou socket déjà fermé).
+        """
+        requested = time.perf_counter()
+        connection = self._take()
+        try:
+            if connection is not None and not self._is_alive(connection):
+                logging.info("[SMTP] Session expirée, reconnexion")
+                self._discard(connection.smtp)
+                connection = None
+            if connection is None:
+                connection = self._connect()
+        except Exception:
+            self._give_back(None)
+            raise
+        acquired = time.perf_counter()
+        try:
+            try:
+                yield connection
+            finally:
+                if self.on_timing is not None:
+                    self.on_timing(acquired - requested, time.perf_counter() - acquired)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            if _closing_reply(e) or connection.smtp.sock is None:
+                # 421: le serveur ferme la session, elle ne doit pas être prêtée à nouveau
+                self._discard(connection.smtp)
+                self._give_back(None)
+                raise
+            # Le serveur a répondu: la session reste utilisable pour le message suivant
+            connection.last_used = time.monotonic()
+            self._give_back(connection)
+            raise
+        except Exception:
+            self._discard(connection.smtp)
+            self._give_back(None)
+            raise
+        connection.last_used = time.monotonic()
+        if connection.messages >= self.max_messages:
+            self._discard(connection.smtp)
+            connection = None
+        self._give_back(connection)
+
+    def send(self, from_addr: str, recipients: Sequence[str],
+             message: Union[str, bytes, Iterable[bytes]]) -> None:
+        """Envoie un message sur une session du pool.
+
+        ``message`` est soit le message complet, soit un itérable de blocs
+        d'octets (ex. ``StreamedMessage``) parcouru à chaque tentative.
+        Une session déjà utilisée est remise à zéro (``RSET``) avant le message;
+        si elle s'avère fermée par le serveur, elle est remplacée et l'envoi
+        recommencé une fois sur une nouvelle session.
+        """
+        for attempt in (1, 2):
+            reused = False
+            try:
+                with self.connection() as connection:
+                    reused = connection.messages > 0
+                    if reused:
+                        connection.smtp.rset()
+                    connection.messages += 1
+                    if isinstance(message, (str, bytes)):
+                        connection.smtp.sendmail(from_addr, list(recipients), message)
+                    else:
+                        _send_data_stream(connection.smtp, from_addr, list(recipients), message)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                if not reused or attempt == 2:
+                    raise
+                logging.info(f"[SMTP] Session perdue ({e}), nouvel essai sur une nouvelle session")
+
+    def check(self) -> None:
+        """Vérifie qu'une session peut être ouverte (ou qu'une session du pool répond)."""
+        with self.connection() as connection:
+            code = connection.smtp.noop()[0]
+            if code != 250:
+                raise smtplib.SMTPResponseException(code, "NOOP refusé")
+
+    def close(self) -> None:
+        """Ferme toutes les sessions inactives; les sessions en cours sont fermées à leur retour."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for connection in idle:
+            self._discard(connection.smtp)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Classement des erreurs SMTP (temporaires / définitives), délais de nouvel essai
+et file des envois différés
+"""
+import heapq
+import itertools
+import random
+import smtplib
+import ssl
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+# Nature d'une erreur d'envoi
+TRANSIENT = "temporaire"
+PERMANENT = "definitive"
+
+
+# Erreurs système qu'un nouvel essai ne corrigerait pas (fichier local, certificat)
+_PERMANENT_OS_ERRORS = (FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError,
+                        ssl.SSLCertVerificationError)
+
+
+class TransientSendError(Exception):
+    """Envoi en échec temporaire: le message pourra être renvoyé plus tard."""
+
+
+def classify_smtp_error(error: BaseException) -> str:
+    """Classe une erreur d'envoi: ``TRANSIENT`` (4xx, erreur réseau) ou ``PERMANENT``.
+
+    Les erreurs réseau (``OSError``: coupure, réseau ou hôte injoignable, délai
+    dépassé, résolution DNS, TLS interrompu) sont temporaires, sauf celles qui
+    se reproduiraient à l'identique (``_PERMANENT_OS_ERRORS``: pièce jointe
+    introuvable ou illisible, certificat TLS refusé). Les refus 5xx, les erreurs
+    d'authentification et les autres erreurs (message invalide, etc.) sont
+    définitives: les renvoyer ne changerait rien.
+    """
+    if isinstance(error, TransientSendError):
+        return TRANSIENT
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return PERMANENT
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return TRANSIENT if any(400 <= code < 500 for code in codes) else PERMANENT
+    if isinstance(error, smtplib.SMTPResponseException):
+        return TRANSIENT if 400 <= error.smtp_code < 500 else PERMANENT
+    if isinstance(error, _PERMANENT_OS_ERRORS):
+        return PERMANENT
+    if isinstance(error, OSError):
+        # SMTPServerDisconnected, ConnectionError, TimeoutError, socket.gaierror,
+        # ENETUNREACH/EHOSTUNREACH, ssl.SSLError...
+        return TRANSIENT
+    return PERMANENT
+
+
+def backoff_delay(attempt: int, base: float, cap: float,
+                  rand: Callable[[], float] = random.random) -> float:
+    """Délai avant le nouvel essai n° ``attempt`` + 1: exponentiel, plafonné, avec gigue.
+
+    La moitié du délai est fixe, l'autre tirée au hasard: les envois refusés en
+    même temps ne reviennent pas tous au même instant.
+    """
+    delay = min(cap, base * (2 ** (attempt - 1)))
+    return delay / 2 + rand() * delay / 2
+
+
+class DeferralQueue:
+    """File des envois différés, triée par heure de nouvel essai."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, item: Any, delay: float) -> None:
+        """Diffère ``item`` de ``delay`` secondes."""
+        with self._lock:
+            heapq.heappush(self._heap, (self._clock() + delay, next(self._order), item))
+
+    def pop_due(self) -> List[Any]:
+        """Retire et retourne les éléments dont l'heure est venue."""
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def next_delay(self) -> Optional[float]:
+        """Temps avant le prochain élément (None si la file est vide)."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._clock())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
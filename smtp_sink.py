@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Serveur SMTP local de test: accepte les emails sans les remettre, avec injection
+de pannes (latence, refus temporaires 4xx, refus définitifs 5xx, coupures)
+
+Usage: python smtp_sink.py --port 2525 --latency 0.05 --defer-rate 0.1
+"""
+import argparse
+import logging
+import random
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class FaultProfile:
+    """Pannes simulées, tirées au hasard pour chaque message (fin du DATA).
+
+    ``latency``: délai avant la réponse à chaque message (secondes);
+    ``defer_rate``, ``reject_rate``, ``drop_rate``: part des messages refusés
+    temporairement (451), refusés définitivement (554) ou dont la connexion est
+    coupée sans réponse. ``seed`` rend le tirage reproductible.
+    """
+    latency: float = 0.0
+    defer_rate: float = 0.0
+    reject_rate: float = 0.0
+    drop_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+# Issue d'un message
+ACCEPTED = "accepte"
+DEFERRED = "differe"
+REJECTED = "refuse"
+DROPPED = "coupe"
+
+
+class SinkStats:
+    """Compteurs du serveur (partagés entre les connexions)."""
+
+    def __init__(self):
+        self.connections = 0
+        self.bytes_received = 0
+        self.outcomes = {ACCEPTED: 0, DEFERRED: 0, REJECTED: 0, DROPPED: 0}
+        self._lock = threading.Lock()
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def add_bytes(self, n: int) -> None:
+        with self._lock:
+            self.bytes_received += n
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"connexions": self.connections, "octets_recus": self.bytes_received, **self.outcomes}
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Une session SMTP (EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT)."""
+
+    server: "_SinkServer"
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def _readline(self) -> bytes:
+        line = self.rfile.readline(65536)
+        self.server.sink.stats.add_bytes(len(line))
+        return line
+
+    def handle(self) -> None:
+        sink = self.server.sink
+        sink.stats.connected()
+        self._reply("220 smtp-sink ESMTP")
+        sender, recipients = None, []
+        while True:
+            line = self._readline()
+            if not line:
+                return
+            command, _, argument = line.decode("ascii", "replace").strip().partition(" ")
+            command = command.upper()
+            if command in ("EHLO", "HELO"):
+                if command == "EHLO":
+                    for capability in ("smtp-sink", "8BITMIME", "SIZE 52428800"):
+                        self._reply(f"250-{capability}")
+                    self._reply("250 AUTH PLAIN LOGIN")
+                else:
+                    self._reply("250 smtp-sink")
+            elif command == "AUTH":
+                method, _, initial = argument.partition(" ")
+                if method.upper() == "LOGIN":
+                    # Identifiant et mot de passe acceptés sans vérification
+                    if not initial:
+                        self._reply("334 VXNlcm5hbWU6")
+                        self._readline()
+                    self._reply("334 UGFzc3dvcmQ6")
+                    self._readline()
+                elif not initial:
+                    self._reply("334 ")
+                    self._readline()
+                self._reply("235 2.7.0 Authentication successful")
+            elif command == "MAIL":
+                sender, recipients = argument, []
+                self._reply("250 2.1.0 OK")
+            elif command == "RCPT":
+                if sender is None:
+                    self._reply("503 5.5.1 MAIL first")
+                    continue
+                recipients.append(argument)
+                self._reply("250 2.1.5 OK")
+            elif command == "DATA":
+                if not recipients:
+                    self._reply("503 5.5.1 RCPT first")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data = self._readline()
+                    if not data:
+                        return
+                    if data == b".\r\n":
+                        break
+                    size += len(data)
+                outcome = sink.draw()
+                sink.stats.count(outcome)
+                if sink.faults.latency:
+                    time.sleep(sink.faults.latency)
+                sender, recipients = None, []
+                if outcome == DROPPED:
+                    return
+                if outcome == DEFERRED:
+                    self._reply("451 4.3.0 Try again later")
+                elif outcome == REJECTED:
+                    self._reply("554 5.7.1 Message rejected")
+                else:
+                    self._reply(f"250 2.0.0 OK {size} octets")
+            elif command == "RSET":
+                sender, recipients = None, []
+                self._reply("250 2.0.0 OK")
+            elif command == "NOOP":
+                self._reply("250 2.0.0 OK")
+            elif command == "QUIT":
+                self._reply("221 2.0.0 Bye")
+                return
+            else:
+                self._reply("502 5.5.2 Command not recognized")
+
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int], sink: "SMTPSink"):
+        self.sink = sink
+        super().__init__(address, _SMTPHandler)
+
+
+class SMTPSink:
+    """Serveur SMTP local (thread en arrière-plan) qui compte les emails sans les remettre.
+
+    ``port=0`` choisit un port libre (voir ``port`` après ``start``).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, faults: Optional[FaultProfile] = None):
+        self.faults = faults or FaultProfile()
+        self.stats = SinkStats()
+        self._random = random.Random(self.faults.seed)
+        self._random_lock = threading.Lock()
+        self._server = _SinkServer((host, port), self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def draw(self) -> str:
+        """Issue d'un message selon le profil de pannes."""
+        with self._random_lock:
+            value = self._random.random()
+        for outcome, rate in ((DROPPED, self.faults.drop_rate), (DEFERRED, self.faults.defer_rate),
+                              (REJECTED, self.faults.reject_rate)):
+            if value < rate:
+                return outcome
+            value -= rate
+        return ACCEPTED
+
+    def start(self) -> "SMTPSink":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        logging.info(f"[SINK] Serveur SMTP de test sur {self.host}:{self.port}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "SMTPSink":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Analyse les options de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Serveur SMTP local de test avec injection de pannes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0, help="Délai avant chaque réponse au DATA (s)")
+    parser.add_argument("--defer-rate", type=float, default=0.0, help="Part des messages refusés en 451")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Part des messages refusés en 554")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Part des connexions coupées")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    faults = FaultProfile(args.latency, args.defer_rate, args.reject_rate, args.drop_rate, args.seed)
+    sink = SMTPSink(args.host, args.port, faults).start()
+    try:
+        while True:
+            time.sleep(10)
+            logging.info(f"[SINK] {sink.stats.snapshot()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
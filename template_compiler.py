@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Compilation des modèles Word et index des emplacements de placeholders
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+from docx_writer import DocxZipWriter, COMPRESSION_DEFLATE
+
+INDEX_VERSION = 2
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_P = f"{{{W_NS}}}p"
+W_R = f"{{{W_NS}}}r"
+W_T = f"{{{W_NS}}}t"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Parties susceptibles de contenir des placeholders (corps, en-têtes, pieds de page)
+STORY_PART_PATTERN = re.compile(r"^word/(document|header\d*|footer\d*)\.xml$")
+
+# Marqueur d'emplacement inséré dans le XML compilé (zone à usage privé Unicode)
+_SLOT_OPEN = "\ue000"
+_SLOT_CLOSE = "\ue001"
+_SLOT_PATTERN = re.compile(f"{_SLOT_OPEN}(\\d+){_SLOT_CLOSE}".encode("utf-8"))
+
+
+def index_cache_path(template_path: Path) -> Path:
+    """Chemin du fichier d'index mis en cache à côté du modèle."""
+    return template_path.with_name(template_path.name + ".index.json")
+
+
+def row_values(row: Dict[str, Any], aliases: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Valeurs de substitution d'une ligne CSV, indexées par nom de colonne en majuscules.
+
+    ``aliases`` associe un nom de placeholder à une colonne (ex. VENDEUR -> nom).
+    """
+    values = {str(key).strip().upper(): "" if value is None else str(value)
+              for key, value in row.items() if key is not None}
+    for alias, column in (aliases or {}).items():
+        if column.upper() in values:
+            values.setdefault(alias.upper(), values[column.upper()])
+    return values
+
+
+def _own_nodes(paragraph, tag: str) -> list:
+    """Éléments ``tag`` appartenant au paragraphe (hors paragraphes imbriqués)."""
+    return [node for node in paragraph.iter(tag) if next(node.iterancestors(W_P)) is paragraph]
+
+
+class CompiledTemplate:
+    """Modèle compilé: index des placeholders et XML pré-découpé en segments.
+
+    ``pattern`` est une expression régulière dont le premier groupe capture le
+    nom du champ (ex. ``{{VENDEUR}}`` -> ``VENDEUR``). Le rendu d'une ligne se
+    limite à joindre les segments statiques avec les valeurs échappées, en une
+    seule passe quel que soit le nombre de champs; les parties sans placeholder
+    sont recopiées telles quelles.
+    """
+
+    def __init__(self, template_bytes: bytes, pattern: str,
+                 index: Optional[Dict[str, Any]] = None,
+                 compression: str = COMPRESSION_DEFLATE):
+        self.pattern = re.compile(pattern)
+        self.template_bytes = template_bytes
+        self.sha256 = hashlib.sha256(template_bytes).hexdigest()
+        self.writer = DocxZipWriter(template_bytes, compression)
+        self._trees: Dict[str, Any] = {}
+
+        if not self._index_matches(index):
+            index = self._scan()
+        self.index = index
+        try:
+            self._segments = self._build_segments(index)
+        except (IndexError, ValueError) as e:
+            logging.warning(f"Index de modèle incohérent, recompilation: {e}")
+            self._trees.clear()
+            self.index = self._scan()
+            self._segments = self._build_segments(self.index)
+        # Noms des champs (en majuscules) utilisés par le modèle
+        self.fields = sorted({loc["field"] for locs in self.index["parts"].values() for loc in locs})
+
+    @classmethod
+    def load(cls, template_path: Path, pattern: str,
+             compression: str = COMPRESSION_DEFLATE) -> "CompiledTemplate":
+        """Compile un modèle en réutilisant l'index disque s'il correspond au fichier."""
+        cache_path = index_cache_path(template_path)
+        cached = None
+        if cache_path.exists():
+            try:
+                cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Index de modèle illisible ({cache_path}): {e}")
+
+        compiled = cls(template_path.read_bytes(), pattern, cached, compression)
+        if compiled.index is not cached:
+            compiled.save_index(cache_path)
+        return compiled
+
+    def save_index(self, cache_path: Path) -> None:
+        """Écrit l'index de façon atomique; un échec n'empêche pas la génération."""
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(self.index, indent=1), encoding="utf-8")
+            os.replace(tmp_path, cache_path)
+            logging.debug(f"Index de modèle enregistré: {cache_path}")
+        except OSError as e:
+            logging.warning(f"Impossible d'enregistrer l'index du modèle: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def _index_matches(self, index: Optional[Dict[str, Any]]) -> bool:
+        """Vérifie que l'index correspond à ce modèle et à ce motif de placeholders."""
+        return bool(index) and index.get("version") == INDEX_VERSION \
+            and index.get("sha256") == self.sha256 \
+            and index.get("pattern") == self.pattern.pattern
+
+    def _tree(self, part: str):
+        """Analyse une partie XML du modèle (une seule fois)."""
+        if part not in self._trees:
+            self._trees[part] = etree.fromstring(self.writer.read_part(part))
+        return self._trees[part]
+
+    def _scan(self) -> Dict[str, Any]:
+        """Parcourt les parties du modèle pour localiser chaque placeholder."""
+        parts: Dict[str, List[Dict[str, Any]]] = {}
+        for part in self.writer.part_names:
+            if not STORY_PART_PATTERN.match(part):
+                continue
+            locations = []
+            for p_index, paragraph in enumerate(self._tree(part).iter(W_P)):
+                texts = _own_nodes(paragraph, W_T)
+                full = "".join(t.text or "" for t in texts)
+                if not full:
+                    continue
+                runs = _own_nodes(paragraph, W_R) if self.pattern.search(full) else []
+                for match in self.pattern.finditer(full):
+                    first, _ = self._locate(texts, match.start())
+                    last, _ = self._locate(texts, match.end() - 1)
+                    locations.append({
+                        "paragraph": p_index,
+                        "start": match.start(),
+                        "end": match.end(),
+                        "runs": [runs.index(texts[first].getparent()),
+                                 runs.index(texts[last].getparent())],
+                        "placeholder": match.group(0),
+                        "field": match.group(1).strip().upper(),
+                    })
+            if locations:
+                parts[part] = locations
+
+        count = sum(len(locs) for locs in parts.values())
+        logging.info(f"Modèle compilé: {count} placeholder(s) dans {len(parts)} partie(s)")
+        return {
+            "version": INDEX_VERSION,
+            "sha256": self.sha256,
+            "pattern": self.pattern.pattern,
+            "parts": parts,
+        }
+
+    @staticmethod
+    def _locate(texts: list, offset: int) -> tuple:
+        """Retourne (nœud texte, position) correspondant à un décalage du paragraphe."""
+        position = 0
+        for i, node in enumerate(texts):
+            length = len(node.text or "")
+            if offset < position + length:
+                return i, offset - position
+            position += length
+        raise IndexError(f"Décalage {offset} hors du paragraphe")
+
+    def _build_segments(self, index: Dict[str, Any]) -> Dict[str, list]:
+        """Insère un marqueur par emplacement puis découpe le XML sérialisé."""
+        segments = {}
+        slots: List[tuple] = []
+        for part, locations in index["parts"].items():
+            paragraphs = list(self._tree(part).iter(W_P))
+            # De droite à gauche pour conserver les décalages des emplacements restants
+            for loc in sorted(locations, key=lambda l: (l["paragraph"], l["start"]), reverse=True):
+                texts = _own_nodes(paragraphs[loc["paragraph"]], W_T)
+                full = "".join(t.text or "" for t in texts)
+                if full[loc["start"]:loc["end"]] != loc["placeholder"]:
+                    raise ValueError(f"placeholder absent à l'emplacement indiqué ({part})")
+                first, first_offset = self._locate(texts, loc["start"])
+                last, last_offset = self._locate(texts, loc["end"] - 1)
+                marker = f"{_SLOT_OPEN}{len(slots)}{_SLOT_CLOSE}"
+                slots.append((loc["field"], escape(loc["placeholder"]).encode("utf-8")))
+
+                head = texts[first].text or ""
+                tail = (texts[last].text or "")[last_offset + 1:]
+                if first == last:
+                    texts[first].text = head[:first_offset] + marker + tail
+                else:
+                    texts[first].text = head[:first_offset] + marker
+                    for node in texts[first + 1:last]:
+                        node.text = ""
+                    texts[last].text = tail
+                texts[first].set(XML_SPACE, "preserve")
+
+            xml = etree.tostring(self._tree(part), encoding="UTF-8",
+                                 xml_declaration=True, standalone=True)
+            pieces = _SLOT_PATTERN.split(xml)
+            # pieces = [statique, n° d'emplacement, statique, ...]
+            segments[part] = [piece if i % 2 == 0 else slots[int(piece)]
+                              for i, piece in enumerate(pieces)]
+        self._trees.clear()
+        return segments
+
+    def render_parts(self, values: Dict[str, str]) -> Dict[str, bytes]:
+        """Produit le XML des parties contenant des placeholders pour une ligne.
+
+        ``values`` est indexé par nom de champ en majuscules (voir ``row_values``);
+        un champ absent laisse le placeholder d'origine dans le document.
+        """
+        encoded = {field: escape(values[field]).encode("utf-8")
+                   for field in self.fields if field in values}
+        parts = {}
+        for part, pieces in self._segments.items():
+            parts[part] = b"".join(
+                piece if i % 2 == 0 else encoded.get(piece[0], piece[1])
+                for i, piece in enumerate(pieces)
+            )
+        return parts
+
+    def write(self, out_path: Path, values: Dict[str, str]) -> Path:
+        """Écrit le DOCX d'une ligne à partir du modèle compilé."""
+        return self.writer.write(out_path, self.render_parts(values))
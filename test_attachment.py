@@ -3,6 +3,7 @@
 Test pour vérifier l'attachement de fichiers PDF
 """
 import logging
+import os
 from pathlib import Path
 from smtp_email_sender import SMTPEmailSender
 
@@ -27,7 +28,8 @@ def test_attachment():
     # Données de test
     test_data = [{
         "nom": "Test Attachment",
-        "email": "gabrielnadoncanada@gmail.com"  # Votre email pour recevoir le test
+        # Votre email pour recevoir le test (TEST_EMAIL_TO); sans envoi réel: smtp_sink.py
+        "email": os.getenv("TEST_EMAIL_TO", "test@example.com")
     }]
     
     try:
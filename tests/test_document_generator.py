@@ -6,7 +6,26 @@ import unittest
 import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
-from document_generator import DocumentGenerator
+from docx import Document
+from document_generator import DocumentGenerator, DocumentPlanner
+from pdf_converter import NullConverter
+from template_compiler import CompiledTemplate
+
+
+class StubConverter(NullConverter):
+    """Convertisseur de test: échoue pour les documents 'Echec' et compte ses démarrages."""
+    
+    name = "stub"
+    starts = 0
+    
+    def start(self):
+        StubConverter.starts += 1
+        super().start()
+    
+    def convert(self, docx_path, pdf_path):
+        if docx_path.stem.startswith("Echec"):
+            raise RuntimeError("conversion impossible")
+        return super().convert(docx_path, pdf_path)
 
 
 class TestDocumentGenerator(unittest.TestCase):
@@ -19,12 +38,17 @@ class TestDocumentGenerator(unittest.TestCase):
         self.template_path = Path(self.temp_dir) / "test_template.docx"
         self.template_path.touch()  # Créer un fichier vide
         
-        self.generator = DocumentGenerator(self.template_path)
+        self.generator = DocumentGenerator(self.template_path, pdf_backend="stub", cache_path=None)
+        StubConverter.starts = 0
+        backends = patch.dict('pdf_converter.CONVERTER_BACKENDS', {"stub": StubConverter})
+        backends.start()
+        self.addCleanup(backends.stop)
     
     def tearDown(self):
         """Nettoyage après les tests."""
         # Nettoyer le répertoire temporaire
         import shutil
+        self.generator.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
     def test_init_with_nonexistent_template(self):
@@ -63,33 +87,159 @@ class TestDocumentGenerator(unittest.TestCase):
         paragraph.clear.assert_called_once()
         paragraph.add_run.assert_called_once_with("Hello John Doe world")
     
-    @patch('document_generator.Document')
-    def test_generate_document(self, mock_document_class):
+    def _write_template(self, *paragraphs):
+        """Crée un vrai modèle .docx dans le répertoire temporaire."""
+        doc = Document()
+        for text in paragraphs:
+            doc.add_paragraph(text)
+        doc.save(str(self.template_path))
+        return self.generator
+    
+    def test_generate_document(self):
         """Test de génération de document."""
-        # Mock du document
-        mock_doc = Mock()
-        mock_document_class.return_value = mock_doc
-        
-        # Mock des paragraphes
-        mock_paragraph = Mock()
-        mock_paragraph.text = "Hello {{VENDEUR}}"
-        mock_paragraph.runs = [Mock()]
-        mock_paragraph.runs[0].text = "Hello {{VENDEUR}}"
-        mock_doc.paragraphs = [mock_paragraph]
-        
-        # Mock des tableaux
-        mock_doc.tables = []
-        
-        # Mock de la sauvegarde
-        mock_doc.save = Mock()
+        generator = self._write_template("Hello {{VENDEUR}}")
         
         with patch('document_generator.OUT_DOCX_DIR', Path(self.temp_dir)):
-            result = self.generator.generate_document("John Doe", 1)
+            result = generator.generate_document("John Doe", 1)
         
         # Vérifications
         self.assertIsInstance(result, Path)
-        mock_doc.save.assert_called_once()
-        self.assertEqual(mock_paragraph.runs[0].text, "Hello John Doe")
+        self.assertTrue(result.exists())
+        self.assertEqual(Document(str(result)).paragraphs[0].text, "Hello John Doe")
+    
+    def test_template_compiled_once_per_batch(self):
+        """Le modèle est compilé une seule fois pour tout le lot."""
+        generator = self._write_template("Hello {{VENDEUR}}")
+        
+        with patch('document_generator.OUT_DOCX_DIR', Path(self.temp_dir)), \
+                patch('document_generator.CompiledTemplate.load',
+                      wraps=CompiledTemplate.load) as mock_load:
+            first = generator.generate_document("Alice", 1)
+            second = generator.generate_document("Bob", 2)
+        
+        mock_load.assert_called_once()
+        self.assertEqual(Document(str(first)).paragraphs[0].text, "Hello Alice")
+        self.assertEqual(Document(str(second)).paragraphs[0].text, "Hello Bob")
+    
+    def test_generate_documents_batch_parallel(self):
+        """Le rendu parallèle produit un DOCX par ligne, homonymes compris."""
+        generator = self._write_template("Hello {{VENDEUR}} {{ville}}")
+        rows = [
+            {"nom": "Alice", "email": "", "ville": "Laval"},
+            {"nom": "Bob", "email": "", "ville": "Québec"},
+            {"nom": "Alice", "email": "", "ville": "Montréal"},
+        ]
+        
+        with patch('document_generator.OUT_DOCX_DIR', Path(self.temp_dir)), \
+                patch('document_generator.OUT_PDF_DIR', Path(self.temp_dir)):
+            docx_files, _ = generator.generate_documents_batch(rows, workers=2)
+        
+        self.assertEqual([p.name for p in docx_files], ["Alice.docx", "Bob.docx", "Alice_2.docx"])
+        self.assertEqual(Document(str(docx_files[2])).paragraphs[0].text, "Hello Alice Montréal")
+    
+    def test_convert_to_pdf_batch(self):
+        """La conversion par lot réutilise le convertisseur et rapporte les erreurs par fichier."""
+        docx_dir = Path(self.temp_dir) / "docx"
+        docx_dir.mkdir()
+        for stem in ("Alice", "Echec", "Bob"):
+            (docx_dir / f"{stem}.docx").touch()
+        
+        with patch('document_generator.OUT_PDF_DIR', Path(self.temp_dir)):
+            results = self.generator.convert_to_pdf_batch(docx_dir)
+        
+        self.assertEqual(StubConverter.starts, 1)
+        self.assertEqual(results[docx_dir / "Alice.docx"]['pdf'], Path(self.temp_dir) / "Alice.pdf")
+        self.assertIsNone(results[docx_dir / "Bob.docx"]['erreur'])
+        self.assertIsNone(results[docx_dir / "Echec.docx"]['pdf'])
+        self.assertIn("conversion impossible", results[docx_dir / "Echec.docx"]['erreur'])
+    
+    def test_generate_documents_batch_retries_failed_conversions(self):
+        """Seules les conversions échouées sont reprises."""
+        generator = self._write_template("Hello {{VENDEUR}}")
+        rows = [{"nom": "Alice", "email": "a@x.ca"}, {"nom": "Echec", "email": ""}]
+        
+        with patch('document_generator.OUT_DOCX_DIR', Path(self.temp_dir)), \
+                patch('document_generator.OUT_PDF_DIR', Path(self.temp_dir)), \
+                self.assertLogs(level='WARNING') as logs:
+            docx_files, pdf_files = generator.generate_documents_batch(rows, retry_count=2)
+        
+        self.assertEqual(len(docx_files), 2)
+        self.assertEqual(pdf_files, [Path(self.temp_dir) / "Alice_a_at_x.ca.pdf"])
+        self.assertEqual(sum("Echec (tentative" in line for line in logs.output), 2)
+        self.assertEqual(StubConverter.starts, 1)
+
+    def test_identical_rows_rendered_once(self):
+        """Les contacts d'un même entrepreneur partagent un seul document converti."""
+        generator = self._write_template("Hello {{VENDEUR}}")
+        rows = [
+            {"nom": "Alice", "email": "a1@x.ca"},
+            {"nom": "Bob", "email": "b@x.ca"},
+            {"nom": "Alice", "email": "a2@x.ca"},
+            {"nom": "Alice", "email": "a3@x.ca"},
+        ]
+        
+        with patch('document_generator.OUT_DOCX_DIR', Path(self.temp_dir)), \
+                patch('document_generator.OUT_PDF_DIR', Path(self.temp_dir)), \
+                patch.object(StubConverter, 'convert', autospec=True,
+                             side_effect=NullConverter.convert) as convert:
+            docx_files, pdf_files = generator.generate_documents_batch(rows)
+        
+        self.assertEqual(convert.call_count, 2)
+        self.assertEqual([p.name for p in docx_files], ["Alice.docx", "Bob.docx"])
+        self.assertEqual([p.name for p in pdf_files], [
+            "Alice_a1_at_x.ca.pdf", "Bob_b_at_x.ca.pdf", "Alice_a2_at_x.ca.pdf", "Alice_a3_at_x.ca.pdf"
+        ])
+        self.assertTrue(pdf_files[0].samefile(pdf_files[3]))
+    
+    def test_planner_matches_batch_planning(self):
+        """Le planificateur ligne à ligne (pipeline) suit les règles du traitement par lot."""
+        generator = self._write_template("Hello {{VENDEUR}}")
+        rows = [
+            {"nom": "Alice", "email": "a1@x.ca"},
+            {"nom": "Bob", "email": "b@x.ca"},
+            {"nom": "Alice", "email": "a2@x.ca"},
+        ]
+        
+        planner = DocumentPlanner(generator)
+        out_paths = [planner.output_path(row) for row in rows]
+        firsts = [planner.first_identical(i, row) for i, row in enumerate(rows)]
+        
+        self.assertEqual(out_paths, generator.plan_output_paths(rows))
+        self.assertEqual(firsts, [None, None, 0])
+        self.assertEqual(generator.group_identical_rows(rows), {0: [2], 1: []})
+    
+    def test_content_key_depends_on_template_values(self):
+        """La clé du document ne dépend que du modèle et des valeurs de ses placeholders."""
+        generator = self._write_template("Hello {{VENDEUR}}")
+        
+        key = generator.content_key({"nom": "Alice", "email": "a1@x.ca"})
+        
+        self.assertEqual(key, generator.content_key({"nom": "Alice", "email": "a2@x.ca"}))
+        self.assertNotEqual(key, generator.content_key({"nom": "Bob", "email": "a1@x.ca"}))
+    
+    def test_unchanged_rows_reuse_cached_outputs(self):
+        """Au second lancement, seules les lignes modifiées sont rendues et converties."""
+        self._write_template("Hello {{VENDEUR}} {{ville}}")
+        rows = [{"nom": "Alice", "email": "", "ville": "Laval"},
+                {"nom": "Bob", "email": "", "ville": "Québec"}]
+        cache_path = Path(self.temp_dir) / "cache.sqlite"
+        
+        with patch('document_generator.OUT_DOCX_DIR', Path(self.temp_dir)), \
+                patch('document_generator.OUT_PDF_DIR', Path(self.temp_dir)):
+            generator = DocumentGenerator(self.template_path, pdf_backend="stub", cache_path=cache_path)
+            generator.generate_documents_batch(rows)
+            generator.close()
+            
+            rows[1]["ville"] = "Montréal"
+            generator = DocumentGenerator(self.template_path, pdf_backend="stub", cache_path=cache_path)
+            with patch.object(generator, 'generate_document', wraps=generator.generate_document) as render:
+                docx_files, pdf_files = generator.generate_documents_batch(rows)
+            generator.close()
+        
+        self.assertEqual([call.args[0] for call in render.call_args_list], ["Bob"])
+        self.assertEqual(generator.cache_hits, 1)
+        self.assertEqual([p.name for p in pdf_files], ["Alice.pdf", "Bob.pdf"])
+        self.assertEqual(Document(str(docx_files[1])).paragraphs[0].text, "Hello Bob Montréal")
 
 
 if __name__ == "__main__":
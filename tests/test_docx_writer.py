@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour l'écrivain DOCX au niveau zip
+"""
+import unittest
+import tempfile
+import shutil
+import zipfile
+from pathlib import Path
+
+from docx_writer import DocxZipWriter
+
+
+class TestDocxZipWriter(unittest.TestCase):
+    """Tests pour la classe DocxZipWriter."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.template_path = self.temp_dir / "modele.docx"
+        with zipfile.ZipFile(self.template_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("word/document.xml", "<w:document>{{VENDEUR}}</w:document>")
+            zf.writestr("word/styles.xml", "<w:styles>" + "x" * 5000 + "</w:styles>")
+            zf.writestr(zipfile.ZipInfo("word/media/image1.png"), b"\x89PNG" + bytes(range(256)))
+        self.template_bytes = self.template_path.read_bytes()
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _raw_entries(self, path: Path) -> dict:
+        """Retourne (méthode, taille compressée, CRC) pour chaque entrée."""
+        with zipfile.ZipFile(path) as zf:
+            return {i.filename: (i.compress_type, i.compress_size, i.CRC) for i in zf.infolist()}
+
+    def test_write_replaces_only_given_parts(self):
+        """Les parties non modifiées sont recopiées octet pour octet."""
+        writer = DocxZipWriter(self.template_bytes)
+        out_path = writer.write(self.temp_dir / "out.docx",
+                                {"word/document.xml": b"<w:document>Acme</w:document>"})
+
+        with zipfile.ZipFile(out_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.read("word/document.xml"), b"<w:document>Acme</w:document>")
+            self.assertEqual(zf.namelist(), writer.part_names)
+
+        original = self._raw_entries(self.template_path)
+        written = self._raw_entries(out_path)
+        self.assertEqual(written["word/styles.xml"], original["word/styles.xml"])
+        self.assertEqual(written["word/media/image1.png"], original["word/media/image1.png"])
+
+    def test_store_policy(self):
+        """La politique 'store' n'applique aucune compression aux parties réécrites."""
+        writer = DocxZipWriter(self.template_bytes, compression="store")
+        out_path = writer.write(self.temp_dir / "out.docx", {"word/document.xml": b"<w:document/>"})
+
+        self.assertEqual(self._raw_entries(out_path)["word/document.xml"][0], zipfile.ZIP_STORED)
+        self.assertEqual(writer.read_part("word/document.xml"),
+                         b"<w:document>{{VENDEUR}}</w:document>")
+
+    def test_invalid_policy_and_unknown_part(self):
+        """Une politique inconnue ou une partie absente du modèle sont refusées."""
+        with self.assertRaises(ValueError):
+            DocxZipWriter(self.template_bytes, compression="lzma")
+
+        writer = DocxZipWriter(self.template_bytes)
+        with self.assertRaises(KeyError):
+            writer.write(self.temp_dir / "out.docx", {"word/header1.xml": b""})
+        self.assertFalse((self.temp_dir / "out.docx").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le corps des emails compilé
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from email_template import CompiledBody, EmailBodyTemplate
+from file_utils import read_text_smart
+
+
+class TestCompiledBody(unittest.TestCase):
+    """Tests pour la classe CompiledBody."""
+
+    def test_render(self):
+        """Les champs connus sont remplis, les autres restent tels quels."""
+        compiled = CompiledBody("<p>Bonjour {{ nom }}, le {{DATE_SOUMISSION}} {{INCONNU}}</p>")
+
+        self.assertEqual(compiled.fields, ["DATE_SOUMISSION", "INCONNU", "NOM"])
+        self.assertEqual(compiled.render({"NOM": "Béton", "DATE_SOUMISSION": "01/02/2026"}),
+                         "<p>Bonjour Béton, le 01/02/2026 {{INCONNU}}</p>")
+
+    def test_render_escapes_values(self):
+        """Une valeur contenant du balisage est insérée comme du texte."""
+        compiled = CompiledBody("<p>{{NOM}}</p>")
+
+        self.assertEqual(compiled.render({"NOM": "<b>&"}), "<p>&lt;b&gt;&amp;</p>")
+
+
+class TestEmailBodyTemplate(unittest.TestCase):
+    """Tests pour la classe EmailBodyTemplate."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.template_file = self.temp_dir / "modele.html"
+        self.signature_file = self.temp_dir / "signature.html"
+        self.template_file.write_text("<p>{{VENDEUR}} - {{DATE_SOUMISSION}}</p>", encoding="utf-8")
+        self.signature_file.write_text("<p>Signature</p>", encoding="utf-8")
+        self.body = EmailBodyTemplate(self.template_file, self.signature_file, "Bonjour {nom}",
+                                      check_interval=0)
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_files_read_once(self):
+        """Les fichiers ne sont lus qu'une fois tant qu'ils ne changent pas."""
+        today = datetime.now().strftime("%d/%m/%Y")
+        with patch("email_template.read_text_smart", wraps=read_text_smart) as read:
+            bodies = [self.body.render("Client", {"nom": f"Client {i}"}) for i in range(5)]
+
+        self.assertEqual(read.call_count, 2)
+        self.assertEqual(self.body.compilations, 1)
+        self.assertEqual(bodies[3], f"<p>Client 3 - {today}</p><p>Signature</p>")
+
+    def test_recompiled_when_file_changes(self):
+        """Un fichier modifié est relu au message suivant."""
+        self.body.render("Client")
+        self.signature_file.write_text("<p>Nouvelle signature</p>", encoding="utf-8")
+        stat = self.signature_file.stat()
+        os.utime(self.signature_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertTrue(self.body.render("Client").endswith("<p>Nouvelle signature</p>"))
+        self.assertEqual(self.body.compilations, 2)
+
+    def test_no_check_within_interval(self):
+        """Entre deux vérifications, le corps compilé est réutilisé sans appel système."""
+        self.body.check_interval = 3600
+        self.body.render("Client")
+        with patch.object(EmailBodyTemplate, "_mtime") as mtime:
+            self.body.render("Client")
+
+        mtime.assert_not_called()
+
+    def test_fallback_without_template(self):
+        """Sans fichier de modèle, le corps de secours reçoit le nom du destinataire."""
+        self.template_file.unlink()
+
+        self.assertEqual(self.body.render("Béton"), "Bonjour Béton<p>Signature</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour la lecture des fichiers CSV
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from file_utils import detect_csv_format, iter_csv_rows, iter_csv_rows_parallel, read_csv_rows
+
+
+class TestCsvReading(unittest.TestCase):
+    """Tests pour la lecture en flux et en parallèle des CSV."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name: str, text: str, encoding: str) -> Path:
+        path = self.temp_dir / name
+        path.write_bytes(text.encode(encoding))
+        return path
+
+    def test_cp1252_semicolon_file(self):
+        """Un export Excel français (cp1252, point-virgule) est lu correctement."""
+        path = self._write("excel.csv", "nom;email;ville\r\nBéton Québec;b@x.ca;Lévis\r\n;sans@nom.ca;\r\n", "cp1252")
+
+        self.assertEqual(detect_csv_format(path)[0], "cp1252")
+        self.assertEqual(read_csv_rows(path), [{"nom": "Béton Québec", "email": "b@x.ca", "ville": "Lévis"}])
+
+    def test_utf8_bom_and_missing_email_column(self):
+        """Le BOM UTF-8 est retiré de l'en-tête et la colonne email est ajoutée si absente."""
+        path = self._write("bom.csv", "\ufeffnom\nAlice\nBob\n", "utf-8")
+        self.assertEqual(read_csv_rows(path), [{"nom": "Alice", "email": ""}, {"nom": "Bob", "email": ""}])
+
+    def test_rows_streamed_lazily(self):
+        """Les lignes sont produites sans lire tout le fichier d'avance."""
+        path = self._write("flux.csv", "nom,email\nAlice,a@x.ca\nBob,b@x.ca\n", "utf-8")
+        rows = iter_csv_rows(path)
+        self.assertEqual(next(rows)["nom"], "Alice")
+        self.assertEqual([row["nom"] for row in rows], ["Bob"])
+
+    def test_parallel_chunks_keep_file_order(self):
+        """La lecture par plages donne les mêmes lignes, dans le même ordre."""
+        lines = "".join(f"Vendeur {i},v{i}@x.ca,Montréal\n" for i in range(500))
+        path = self._write("gros.csv", "nom,email,ville\n" + lines, "utf-8")
+
+        parallel = list(iter_csv_rows_parallel(path, workers=2, chunk_size=1024))
+        self.assertEqual(parallel, list(iter_csv_rows(path)))
+        self.assertEqual(len(parallel), 500)
+
+    def test_accent_after_first_block(self):
+        """Un export cp1252 dont le premier accent suit le bloc analysé est lu en entier."""
+        lines = "".join(f"Vendeur {i},v{i}@x.ca,Laval\n" for i in range(5000))
+        path = self._write("tardif.csv", "nom,email,ville\n" + lines + "Béton Lévis,b@x.ca,Québec\n", "cp1252")
+        self.assertGreater(path.stat().st_size, 64 * 1024)
+
+        # Seul le premier bloc est analysé d'avance: l'accent est découvert à la lecture
+        self.assertEqual(detect_csv_format(path)[0], "utf-8")
+        for rows in (read_csv_rows(path), read_csv_rows(path, workers=2)):
+            self.assertEqual(len(rows), 5001)
+            self.assertEqual(rows[-1], {"nom": "Béton Lévis", "email": "b@x.ca", "ville": "Québec"})
+
+    def test_encoding_checked_while_streaming(self):
+        """La première ligne est produite sans décoder le reste du fichier."""
+        lines = "".join(f"Vendeur {i},v{i}@x.ca\n" for i in range(5000))
+        path = self._write("tardif.csv", "nom,email\n" + lines + "Béton,b@x.ca\n", "cp1252")
+
+        with patch("file_utils.codecs.getincrementaldecoder") as decoder:
+            self.assertEqual(next(iter_csv_rows(path))["nom"], "Vendeur 0")
+        decoder.assert_not_called()
+
+    def test_mixed_encodings_rejected(self):
+        """Un octet invalide après des lignes accentuées déjà produites fait échouer la lecture."""
+        lines = "".join(f"Vendeur {i},v{i}@x.ca\n" for i in range(5000))
+        path = self.temp_dir / "mixte.csv"
+        path.write_bytes(("nom,email\nCafé,c@x.ca\n" + lines).encode("utf-8") + b"Caf\xe9,c@x.ca\n")
+
+        with self.assertRaises(UnicodeDecodeError):
+            list(iter_csv_rows(path))
+
+    def test_parallel_falls_back_on_quoted_newlines(self):
+        """Une plage contenant un champ sur plusieurs lignes est relue séquentiellement."""
+        lines = "".join(f'Vendeur {i},v{i}@x.ca,"rue {i}\nMontréal"\n' if i % 50 == 49
+                        else f"Vendeur {i},v{i}@x.ca,Montréal\n" for i in range(500))
+        path = self._write("adresses.csv", "nom,email,adresse\n" + lines, "utf-8")
+
+        parallel = list(iter_csv_rows_parallel(path, workers=2, chunk_size=1024))
+        self.assertEqual(parallel, list(iter_csv_rows(path)))
+        self.assertEqual(parallel[49]["adresse"], "rue 49\nMontréal")
+
+    def test_unreadable_file_not_truncated(self):
+        """Une erreur de lecture en cours de fichier ne renvoie pas une liste partielle."""
+        lines = "".join(f"Vendeur {i},v{i}@x.ca\n" for i in range(5000))
+        path = self.temp_dir / "casse.csv"
+        path.write_bytes(("\ufeffnom,email\n" + lines).encode("utf-8") + b"Caf\xe9,c@x.ca\n")
+
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(read_csv_rows(path), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour la boîte d'envoi et son expéditeur
+"""
+import email
+import email.policy
+import shutil
+import smtplib
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from outbox import CUR_DIR, FAILED_DIR, NEW_DIR, SENT_DIR, TMP_DIR, Outbox, OutboxWorker, SpooledMessage
+from smtp_email_sender import SMTPEmailSender
+from smtp_pool import SMTPConnectionPool
+
+
+class TestOutbox(unittest.TestCase):
+    """Tests pour le dépôt des emails."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.outbox = Outbox(self.temp_dir / "outbox")
+        self.sender = SMTPEmailSender(enabled=True, ledger_path=self.temp_dir / "envois.sqlite")
+        self.sender.cc = ""
+        self.sender.bcc = "archive@test.com"
+        self.addCleanup(self.sender.close)
+        self.pdf = self.temp_dir / "Soumission.pdf"
+        self.pdf.write_bytes(b"%PDF soumission" * 1000)
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_spooled_message_complete(self):
+        """L'email déposé est complet dans new/; l'enveloppe garde la copie cachée hors des en-têtes."""
+        path = self.sender.spool_email({"nom": "Béton", "email": "b@test.com"}, self.pdf, self.outbox)
+
+        self.assertEqual(path.parent.name, NEW_DIR)
+        self.assertEqual(list((self.outbox.root / TMP_DIR).iterdir()), [])
+        spooled = SpooledMessage(path)
+        self.assertEqual(spooled.recipients, ["b@test.com", "archive@test.com"])
+        message = email.message_from_bytes(b"".join(spooled), policy=email.policy.SMTP)
+        self.assertNotIn("X-Outbox-Envelope", message)
+        self.assertNotIn("Bcc", message)
+        self.assertEqual(message["Message-ID"], spooled.envelope["message_id"])
+        self.assertEqual(next(message.iter_attachments()).get_content(), self.pdf.read_bytes())
+
+    def test_no_email_not_spooled(self):
+        """Une ligne sans email n'est pas déposée."""
+        self.assertIsNone(self.sender.spool_email({"nom": "Sans email", "email": ""}, self.pdf, self.outbox))
+        self.assertEqual(self.outbox.pending(), [])
+
+    def test_failed_write_leaves_nothing(self):
+        """Un dépôt interrompu ne laisse aucun fichier visible par l'expéditeur."""
+        def broken():
+            yield b"Subject: incomplet\r\n"
+            raise OSError("disque plein")
+
+        with self.assertRaises(OSError):
+            self.outbox.put(broken(), {})
+        self.assertEqual(self.outbox.pending(), [])
+        self.assertEqual(list((self.outbox.root / TMP_DIR).iterdir()), [])
+
+
+class TestOutboxWorker(unittest.TestCase):
+    """Tests pour la classe OutboxWorker."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.outbox = Outbox(self.temp_dir / "outbox")
+        self.sender = SMTPEmailSender(enabled=True, ledger_path=self.temp_dir / "envois.sqlite", workers=2)
+        self.sender.smtp_password = "secret"
+        self.sender.cc = self.sender.bcc = ""
+        self.sender.delay_seconds = 0.01
+        self.addCleanup(self.sender.close)
+        self.worker = OutboxWorker(self.outbox, self.sender, workers=2, poll_interval=0.05)
+        self.sent = []
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _spool(self, *emails):
+        return [self.sender.spool_email({"nom": e, "email": e}, None, self.outbox) for e in emails]
+
+    def _pool_send(self, failures):
+        """Simule le serveur: ``failures[email]`` liste les erreurs des premiers essais."""
+        def send(pool, from_addr, recipients, message):
+            errors = failures.get(recipients[0])
+            if errors:
+                raise errors.pop(0)
+            self.sent.append((recipients[0], b"".join(message)))
+        return send
+
+    def test_drain_moves_to_sent_and_failed(self):
+        """Les emails envoyés vont dans sent/, les refus définitifs dans failed/ avec leur cause."""
+        self._spool("a@test.com", "refus@test.com", "lent@test.com")
+        failures = {"refus@test.com": [smtplib.SMTPDataError(550, b"rejected")],
+                    "lent@test.com": [smtplib.SMTPDataError(421, b"try later")]}
+        with patch.object(SMTPConnectionPool, "send", self._pool_send(failures)):
+            self.assertEqual(self.worker.run(once=True), (2, 1))
+
+        counts = self.outbox.counts()
+        self.assertEqual((counts[NEW_DIR], counts[CUR_DIR], counts[SENT_DIR], counts[FAILED_DIR]), (0, 0, 2, 1))
+        error = next((self.outbox.root / FAILED_DIR).glob("*.err")).read_text(encoding="utf-8")
+        self.assertIn("550", error)
+        self.assertTrue(all(not raw.startswith(b"X-Outbox") for _, raw in self.sent))
+
+    def test_interrupted_send_recovered_without_duplicate(self):
+        """Un email resté dans cur/ après un arrêt est repris; un email déjà remis n'est pas renvoyé."""
+        first, second = self._spool("a@test.com", "b@test.com")
+        with patch.object(SMTPConnectionPool, "send", self._pool_send({})):
+            # Arrêt brutal après l'envoi de ``first``, avant son rangement
+            self.sender.deliver_spooled(SpooledMessage(self.outbox.claim(first)))
+            self.outbox.claim(second)
+
+            self.assertEqual(self.worker.run(once=True), (2, 0))
+
+        self.assertEqual([recipient for recipient, _ in self.sent], ["a@test.com", "b@test.com"])
+        self.assertEqual(self.sender.skipped, 1)
+        self.assertEqual(self.outbox.counts()[SENT_DIR], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le cache des sorties
+"""
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from output_cache import OutputCache, cache_key
+
+
+class TestOutputCache(unittest.TestCase):
+    """Tests pour la classe OutputCache."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache = OutputCache(self.temp_dir / "cache.sqlite", max_entries=2, max_age_days=1)
+        self.docx = self.temp_dir / "Alice.docx"
+        self.pdf = self.temp_dir / "Alice.pdf"
+        self.docx.write_bytes(b"docx")
+        self.pdf.write_bytes(b"pdf")
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        self.cache.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_key_depends_on_template_values_and_variant(self):
+        """La clé change avec le modèle, les valeurs ou la variante de rendu."""
+        key = cache_key("abc", {"NOM": "Alice"}, "docx")
+        self.assertEqual(key, cache_key("abc", {"NOM": "Alice"}, "docx"))
+        self.assertNotEqual(key, cache_key("abd", {"NOM": "Alice"}, "docx"))
+        self.assertNotEqual(key, cache_key("abc", {"NOM": "Alicia"}, "docx"))
+        self.assertNotEqual(key, cache_key("abc", {"NOM": "Alice"}, "stamp"))
+
+    def test_hit_copies_to_new_paths(self):
+        """Une entrée valide est réutilisée, y compris sous un autre nom de fichier."""
+        self.cache.store("k", self.docx, self.pdf)
+        other_docx, other_pdf = self.temp_dir / "Alice_2.docx", self.temp_dir / "Alice_2.pdf"
+
+        self.assertEqual(self.cache.fetch("k", other_docx, other_pdf), (other_docx, other_pdf))
+        self.assertEqual(other_pdf.read_bytes(), b"pdf")
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_modified_file_is_a_miss(self):
+        """Un fichier supprimé ou modifié depuis l'enregistrement invalide l'entrée."""
+        self.cache.store("k", self.docx, self.pdf)
+        self.pdf.write_bytes(b"pdf modifie")
+
+        self.assertIsNone(self.cache.fetch("k", self.docx, self.pdf))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction_by_count_and_age(self):
+        """Les entrées les plus anciennes sont évincées au-delà des limites."""
+        for key in ("a", "b", "c"):
+            self.cache.store(key, None, self.pdf)
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.fetch("a", None, self.pdf))
+
+        old = time.time() - 2 * 86400
+        with self.cache._conn:
+            self.cache._conn.execute("UPDATE outputs SET used = ? WHERE key = 'b'", (old,))
+        self.cache.evict()
+        self.assertIsNone(self.cache.fetch("b", None, self.pdf))
+        self.assertIsNotNone(self.cache.fetch("c", None, self.pdf))
+
+
+if __name__ == "__main__":
+    unittest.main()
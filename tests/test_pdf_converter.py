@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour les convertisseurs PDF
+"""
+import gc
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+import weakref
+from unittest.mock import Mock, patch
+
+from PyPDF2 import PdfReader
+from pdf_converter import (
+    ConverterPool, LibreOfficeConverter, PdfConverter, create_converter
+)
+
+
+class TestLibreOfficeConverter(unittest.TestCase):
+    """Tests pour la classe LibreOfficeConverter (sans LibreOffice réel)."""
+
+    def _converter(self):
+        """Crée un convertisseur dont le démarrage est simulé."""
+        converter = LibreOfficeConverter(0, Path("profil"))
+        process = Mock()
+        process.poll.return_value = None
+
+        def fake_start():
+            converter.process = process
+            converter.desktop = Mock()
+            converter.started = True
+
+        converter.start = Mock(side_effect=fake_start)
+        converter._export = Mock(side_effect=lambda docx, pdf: pdf)
+        return converter, process
+
+    def test_started_once_and_reused(self):
+        """L'instance est démarrée une seule fois pour plusieurs conversions."""
+        converter, _ = self._converter()
+        converter.convert(Path("a.docx"), Path("a.pdf"))
+        converter.convert(Path("b.docx"), Path("b.pdf"))
+
+        converter.start.assert_called_once()
+        self.assertEqual(converter._export.call_count, 2)
+
+    def test_dead_instance_is_restarted(self):
+        """Une instance arrêtée est relancée avant la conversion suivante."""
+        converter, process = self._converter()
+        converter.convert(Path("a.docx"), Path("a.pdf"))
+
+        with patch.object(converter, "close") as mock_close:
+            process.poll.side_effect = [1, None, None]
+            converter.convert(Path("b.docx"), Path("b.pdf"))
+
+        mock_close.assert_called_once()
+        self.assertEqual(converter.restarts, 1)
+        self.assertEqual(converter.start.call_count, 2)
+
+    def test_missing_uno_module(self):
+        """Sans le module uno, le démarrage échoue avec un message explicite."""
+        with patch("pdf_converter.uno", None):
+            with self.assertRaises(RuntimeError) as ctx:
+                LibreOfficeConverter(0, Path("profil")).start()
+        self.assertIn("uno", str(ctx.exception))
+
+    def test_unreachable_instance_killed(self):
+        """Une instance qui ne répond pas au démarrage est arrêtée avant de lever l'erreur."""
+        profile = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, profile, ignore_errors=True)
+        converter = LibreOfficeConverter(0, profile)
+        process = Mock()
+        converter._spawn = Mock(return_value=process)
+        converter._connect = Mock(side_effect=RuntimeError("soffice ne répond pas sur le port 2002"))
+
+        with patch("pdf_converter.uno", Mock()), self.assertRaises(RuntimeError):
+            converter.start()
+
+        process.kill.assert_called_once()
+        process.wait.assert_called_once()
+        self.assertIsNone(converter.process)
+        self.assertFalse(converter.started)
+
+    def test_slots_have_isolated_profiles_and_ports(self):
+        """Chaque convertisseur a son port et son profil."""
+        converters = [create_converter("libreoffice", slot, Path("profils")) for slot in range(3)]
+        self.assertEqual([c.port - converters[0].port for c in converters], [0, 1, 2])
+        self.assertEqual(len({c.profile_dir for c in converters}), 3)
+
+    def test_unknown_backend(self):
+        """Un backend inconnu est refusé."""
+        with self.assertRaises(ValueError):
+            create_converter("wordperfect")
+
+
+class SlowConverter(PdfConverter):
+    """Convertisseur de test qui mesure le nombre de conversions simultanées."""
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def convert(self, docx_path, pdf_path):
+        with SlowConverter.lock:
+            SlowConverter.active += 1
+            SlowConverter.peak = max(SlowConverter.peak, SlowConverter.active)
+        time.sleep(0.02)
+        with SlowConverter.lock:
+            SlowConverter.active -= 1
+        if docx_path.stem == "casse":
+            raise RuntimeError("document corrompu")
+        return pdf_path
+
+
+class TestConverterPool(unittest.TestCase):
+    """Tests pour la classe ConverterPool."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        SlowConverter.active = SlowConverter.peak = 0
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_work_dispatched_to_free_converters(self):
+        """Les conversions sont réparties sur les N convertisseurs en parallèle."""
+        created = []
+
+        def factory(slot):
+            created.append(slot)
+            return SlowConverter(slot)
+
+        jobs = [(Path(f"doc{i}.docx"), Path(f"doc{i}.pdf")) for i in range(8)]
+        jobs.append((Path("casse.docx"), Path("casse.pdf")))
+        with ConverterPool("test", size=3, factory=factory) as pool:
+            results = pool.convert_many(jobs)
+
+        self.assertEqual(sorted(created), [0, 1, 2])
+        self.assertEqual(SlowConverter.peak, 3)
+        self.assertEqual(results[Path("doc4.docx")], {'pdf': Path("doc4.pdf"), 'erreur': None})
+        self.assertIn("corrompu", results[Path("casse.docx")]['erreur'])
+
+    def test_null_backend_writes_pdf(self):
+        """Le backend 'null' produit un PDF valide sans suite bureautique."""
+        pdf_path = self.temp_dir / "out.pdf"
+        with ConverterPool("null", size=1) as pool:
+            pool.convert(self.temp_dir / "in.docx", pdf_path)
+
+        self.assertEqual(len(PdfReader(str(pdf_path)).pages), 1)
+        with self.assertRaises(RuntimeError):
+            pool.submit(self.temp_dir / "in.docx", pdf_path)
+
+    def test_closed_pool_released(self):
+        """Un pool fermé n'est plus référencé par le hook de fin de programme."""
+        pool = ConverterPool("test", size=2, factory=SlowConverter)
+        released = weakref.ref(pool)
+        pool.close()
+        del pool
+        gc.collect()
+
+        self.assertIsNone(released())
+
+
+if __name__ == "__main__":
+    unittest.main()
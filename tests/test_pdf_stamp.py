@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le mode "tampon" (PDF de base + texte apposé)
+"""
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, RectangleObject
+
+from config import PLACEHOLDER_PATTERN
+from pdf_stamp import StampTemplate
+
+
+def make_pdf(content: bytes, pages: int = 1, origin: tuple = (0, 0)) -> bytes:
+    """Construit un PDF dont la première page affiche ``content`` en Helvetica."""
+    writer = PdfWriter()
+    for number in range(pages):
+        page = PageObject.create_blank_page(width=612, height=792)
+        page.mediabox = RectangleObject([origin[0], origin[1], origin[0] + 612, origin[1] + 792])
+        if number == 0:
+            stream = DecodedStreamObject()
+            stream.set_data(content)
+            page[NameObject("/Contents")] = writer._add_object(stream)
+            font = DictionaryObject({
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            })
+            page[NameObject("/Resources")] = DictionaryObject({
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+            })
+        writer.add_page(page)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+BASE_PDF = make_pdf(
+    b"BT /F1 12 Tf 72 700 Td (Soumission pour ) Tj ({{VENDEUR}}) Tj ET\n"
+    b"BT /F1 10 Tf 1 0 0 1 100 600 Tm ({{ VILLE }}) Tj ET",
+    pages=2,
+)
+
+
+class TestStampTemplate(unittest.TestCase):
+    """Tests pour la classe StampTemplate."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_placeholders_located(self):
+        """Chaque placeholder est localisé avec sa page, sa position et sa taille."""
+        template = StampTemplate(BASE_PDF, PLACEHOLDER_PATTERN)
+
+        self.assertEqual(template.fields, ["VENDEUR", "VILLE"])
+        ville = next(slot for slot in template.slots if slot["field"] == "VILLE")
+        self.assertEqual((ville["page"], ville["x"], ville["y"], ville["size"]), (0, 100.0, 600.0, 10.0))
+
+    def test_position_measured_with_glyph_widths(self):
+        """Un placeholder en milieu de ligne est placé d'après la largeur réelle des glyphes."""
+        template = StampTemplate(BASE_PDF, PLACEHOLDER_PATTERN)
+        vendeur = next(slot for slot in template.slots if slot["field"] == "VENDEUR")
+
+        # "Soumission pour " et "{{VENDEUR}}" en Helvetica 12 pt: 7725 et 6225 millièmes d'em
+        self.assertAlmostEqual(vendeur["x"], 72 + 7.725 * 12)
+        self.assertAlmostEqual(vendeur["width"], 6.225 * 12)
+
+    def test_render_stamps_values(self):
+        """Le PDF d'une ligne contient les valeurs apposées et toutes les pages."""
+        template = StampTemplate(BASE_PDF, PLACEHOLDER_PATTERN)
+        out_path = template.write(self.temp_dir / "Béton.pdf", {"VENDEUR": "Béton (Laval)", "VILLE": "Laval"})
+
+        reader = PdfReader(str(out_path))
+        self.assertEqual(len(reader.pages), 2)
+        text = reader.pages[0].extract_text()
+        self.assertIn("Béton (Laval)", text)
+        self.assertNotIn("{{", text)
+        self.assertNotIn("VENDEUR", text)
+
+    def test_base_parsed_once(self):
+        """Les lignes clonent les pages du PDF de base déjà analysé, sans s'influencer."""
+        template = StampTemplate(BASE_PDF, PLACEHOLDER_PATTERN)
+        with patch("pdf_stamp.PdfReader") as reader:
+            first = template.render({"VENDEUR": "Alpha", "VILLE": "Laval"})
+            second = template.render({"VENDEUR": "Beta", "VILLE": "Lévis"})
+
+        reader.assert_not_called()
+        self.assertIn("Alpha", PdfReader(BytesIO(first)).pages[0].extract_text())
+        text = PdfReader(BytesIO(second)).pages[0].extract_text()
+        self.assertIn("Beta", text)
+        self.assertNotIn("Alpha", text)
+
+    def test_mediabox_with_origin(self):
+        """Sur une page dont l'origine n'est pas nulle, la surimpression couvre toute la page."""
+        base = make_pdf(b"BT /F1 10 Tf 1 0 0 1 650 850 Tm ({{VILLE}}) Tj ET", origin=(100, 100))
+        template = StampTemplate(base, PLACEHOLDER_PATTERN)
+        page = PdfReader(BytesIO(template.render({"VILLE": "Laval"}))).pages[0]
+
+        content = page.get_contents().get_data()
+        self.assertIn(b"100 100 612 792 re", content)
+        self.assertIn(b"650 850 Td", content)
+
+    def test_template_without_placeholder(self):
+        """Un PDF sans placeholder visible est refusé."""
+        with self.assertRaises(ValueError):
+            StampTemplate(make_pdf(b"BT /F1 12 Tf 72 700 Td (Bonjour) Tj ET"), PLACEHOLDER_PATTERN)
+
+    def test_base_pdf_converted_once(self):
+        """Le modèle n'est converti qu'une fois; le PDF de base est réutilisé ensuite."""
+        template_path = self.temp_dir / "modele.docx"
+        template_path.write_bytes(b"contenu du modele")
+
+        def convert(docx_path, pdf_path):
+            pdf_path.write_bytes(BASE_PDF)
+            return pdf_path
+
+        converter = Mock(side_effect=convert)
+        cache_dir = self.temp_dir / "stamp"
+        StampTemplate.load(template_path, PLACEHOLDER_PATTERN, converter, cache_dir)
+        StampTemplate.load(template_path, PLACEHOLDER_PATTERN, converter, cache_dir)
+
+        converter.assert_called_once()
+        self.assertEqual(len(list(cache_dir.glob("modele.*.pdf"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
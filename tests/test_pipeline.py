@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le pipeline à étapes
+"""
+import threading
+import time
+import unittest
+
+from pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    """Tests pour les classes Pipeline et Stage."""
+
+    def test_results_in_index_order(self):
+        """Toutes les tâches traversent les étapes et reviennent dans l'ordre."""
+        def double(job):
+            time.sleep(0.001 * (job['index'] % 3))
+            job['valeur'] = job['index'] * 2
+            return job
+
+        def add_one(job):
+            job['valeur'] += 1
+            return job
+
+        stages = [Stage("double", double, workers=3), Stage("plus_un", add_one, workers=2)]
+        results = Pipeline(stages, queue_size=2).run({'index': i} for i in range(20))
+
+        self.assertEqual([job['index'] for job in results], list(range(20)))
+        self.assertEqual([job['valeur'] for job in results], [i * 2 + 1 for i in range(20)])
+
+    def test_failed_job_skips_later_stages(self):
+        """Une tâche en échec n'est pas traitée par les étapes suivantes."""
+        def render(job):
+            if job['index'] == 1:
+                raise ValueError("modèle invalide")
+            return job
+
+        sent = []
+
+        def send(job):
+            sent.append(job['index'])
+            return job
+
+        stages = [Stage("rendu", render), Stage("envoi", send)]
+        results = Pipeline(stages).run({'index': i, 'nom': f"n{i}"} for i in range(3))
+
+        self.assertEqual(sorted(sent), [0, 2])
+        self.assertEqual(results[1]['etape_echec'], "rendu")
+        self.assertIn("modèle invalide", results[1]['erreur'])
+        self.assertEqual(stages[0].failed, 1)
+
+    def test_on_done_called_for_every_job(self):
+        """Le rappel de fin d'étape reçoit aussi les tâches en échec."""
+        def render(job):
+            if job['index'] == 1:
+                raise ValueError("modèle invalide")
+            return job
+
+        done = []
+        stages = [Stage("rendu", render), Stage("conversion", lambda job: job, on_done=done.append)]
+        Pipeline(stages).run({'index': i} for i in range(3))
+
+        self.assertEqual(sorted(job['index'] for job in done), [0, 1, 2])
+        self.assertEqual([job['index'] for job in done if job.get('erreur')], [1])
+
+    def test_stages_overlap(self):
+        """La dernière étape commence avant que la première ait tout traité."""
+        last_stage_started = threading.Event()
+        rendered_before_first_send = []
+
+        def render(job):
+            if not last_stage_started.is_set():
+                rendered_before_first_send.append(job['index'])
+            time.sleep(0.005)
+            return job
+
+        def send(job):
+            last_stage_started.set()
+            return job
+
+        stages = [Stage("rendu", render), Stage("envoi", send)]
+        Pipeline(stages, queue_size=1).run({'index': i} for i in range(10))
+
+        self.assertLess(len(rendered_before_first_send), 10)
+
+    def test_source_error_finishes_received_jobs(self):
+        """Une erreur de la source des tâches est levée après le traitement des tâches reçues."""
+        processed = []
+
+        def jobs():
+            yield {'index': 0}
+            yield {'index': 1}
+            raise UnicodeDecodeError("utf-8", b"\xe9", 0, 1, "octet invalide")
+
+        stages = [Stage("rendu", lambda job: processed.append(job['index']) or job)]
+        with self.assertRaises(UnicodeDecodeError):
+            Pipeline(stages).run(jobs())
+
+        self.assertEqual(sorted(processed), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
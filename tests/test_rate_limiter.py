@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le limiteur de débit des envois
+"""
+import unittest
+
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Horloge simulée: ``sleep`` avance le temps sans attendre."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests pour la classe RateLimiter."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.clock = FakeClock()
+
+    def _limiter(self, per_second=0, per_minute=0):
+        return RateLimiter(per_second, per_minute, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_unlimited(self):
+        """Sans limite, aucun envoi n'attend."""
+        limiter = self._limiter()
+        self.assertFalse(limiter.enabled)
+        self.assertEqual(sum(limiter.acquire() for _ in range(1000)), 0)
+
+    def test_per_second_limit(self):
+        """Au-delà de la rafale initiale, les envois sont espacés selon le débit."""
+        limiter = self._limiter(per_second=5)
+        for _ in range(15):
+            limiter.acquire()
+        self.assertAlmostEqual(self.clock.now, 2.0)
+
+    def test_per_minute_limit(self):
+        """La limite par minute s'applique en plus de la limite par seconde."""
+        limiter = self._limiter(per_second=10, per_minute=20)
+        for _ in range(21):
+            limiter.acquire()
+        self.assertAlmostEqual(self.clock.now, 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
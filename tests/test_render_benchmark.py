@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le banc d'essai de génération des documents
+"""
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from docx import Document
+
+from benchmarks.render_throughput import STAGES, Scenario, _measure, build_template, compare, run_scenario
+from config import PLACEHOLDER_PATTERN
+from template_compiler import CompiledTemplate
+
+
+class TestRenderBenchmark(unittest.TestCase):
+    """Tests pour les modèles synthétiques et la détection des régressions."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_fragmented_template(self):
+        """Les placeholders sont découpés sur plusieurs runs et restent reconnus."""
+        path = build_template(self.temp_dir / "modele.docx",
+                              Scenario(paragraphs=4, tables=1, table_rows=2, media_kb=8, fragments=4))
+
+        doc = Document(str(path))
+        self.assertGreaterEqual(len(doc.paragraphs[0].runs), 5)
+        self.assertEqual(len(doc.inline_shapes), 1)
+        compiled = CompiledTemplate(path.read_bytes(), PLACEHOLDER_PATTERN)
+        self.assertEqual(compiled.fields, ["EMAIL", "MONTANT", "PROJET", "VENDEUR"])
+
+    def test_run_scenario(self):
+        """Chaque étape donne un débit et un pic mémoire."""
+        result = run_scenario(Scenario(paragraphs=4, fragments=2), rows=3, repeat=1)
+
+        self.assertEqual(tuple(result["etapes"]), STAGES)
+        for measures in result["etapes"].values():
+            self.assertGreater(measures["lignes_par_s"], 0)
+            self.assertGreaterEqual(measures["pic_memoire_mo"], 0)
+
+    def test_timed_passes_not_traced(self):
+        """Les passes chronométrées tournent sans tracemalloc; la mémoire est mesurée à part."""
+        traced = []
+        measures = _measure(lambda: traced.append(tracemalloc.is_tracing()), rows=1, repeat=3)
+
+        self.assertEqual(traced, [False, False, False, True])
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(measures["lignes_par_s"], 0)
+
+    def test_compare_flags_regressions(self):
+        """Une baisse de débit au-delà du seuil est signalée, pas en deçà."""
+        def results(rendu, conversion):
+            return {"scenarios": {"petit": {"etapes": {"rendu": {"lignes_par_s": rendu},
+                                                       "conversion": {"lignes_par_s": conversion}}}}}
+
+        regressions = compare(results(70.0, 95.0), results(100.0, 100.0), threshold=0.2)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("petit/rendu"))
+        self.assertEqual(compare(results(100.0, 100.0), {"scenarios": {}}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
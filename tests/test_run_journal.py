@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le journal des lancements
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from run_journal import RunJournal, PENDING, RENDERED, CONVERTED, SENT, FAILED, SEND_STAGE, converted_pdf
+
+
+class TestRunJournal(unittest.TestCase):
+    """Tests pour la classe RunJournal."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.journal = RunJournal(self.temp_dir / "journal.sqlite")
+        self.csv = Path("data/entrepreneurs.csv")
+        self.rows = [{"nom": f"Vendeur {i}", "email": f"v{i}@x.ca"} for i in range(4)]
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        self.journal.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_stage_statuses_and_timestamps(self):
+        """Chaque étape met à jour l'état, le chemin produit et son horodatage."""
+        run_id = self.journal.start_run(self.csv, Path("modele.docx"), self.rows)
+        self.journal.mark(run_id, 0, RENDERED, Path("out/docx/Vendeur 0.docx"))
+        self.journal.mark(run_id, 0, CONVERTED, Path("out/pdf/Vendeur 0.pdf"))
+        self.journal.mark(run_id, 1, FAILED, error="conversion impossible", stage="generation")
+
+        record = self.journal.rows_with_status(run_id, CONVERTED)[0]
+        self.assertEqual(record["docx"], "out/docx/Vendeur 0.docx")
+        self.assertIsNotNone(record["rendered_at"])
+        self.assertIsNotNone(record["converted_at"])
+        self.assertEqual(self.journal.counts(run_id), {PENDING: 2, CONVERTED: 1, FAILED: 1})
+        self.assertEqual(self.journal.rows_with_status(run_id, FAILED)[0]["erreur"], "conversion impossible")
+
+    def test_resume_skips_completed_rows(self):
+        """La reprise retourne les lignes terminées; échecs et lignes modifiées sont à refaire.
+
+        Une ligne convertie puis en échec à l'envoi garde son PDF.
+        """
+        rows = self.rows + [{"nom": "Vendeur 4", "email": "v4@x.ca"}]
+        run_id = self.journal.start_run(self.csv, Path("modele.docx"), rows)
+        self.journal.mark(run_id, 0, SENT)
+        self.journal.mark(run_id, 1, CONVERTED, Path("b.pdf"))
+        self.journal.mark(run_id, 2, CONVERTED, Path("c.pdf"))
+        self.journal.mark(run_id, 3, CONVERTED, Path("d.pdf"))
+        self.journal.mark(run_id, 3, FAILED, error="refusé", stage=SEND_STAGE)
+        self.journal.mark(run_id, 4, FAILED, error="conversion impossible", stage="generation")
+        self.journal.close()
+
+        journal = RunJournal(self.temp_dir / "journal.sqlite")
+        self.addCleanup(journal.close)
+        self.assertEqual(journal.latest_run(self.csv), run_id)
+        rows[2]["email"] = "corrige@x.ca"
+        done = journal.resume_run(run_id, rows + [{"nom": "Nouveau", "email": ""}])
+
+        self.assertEqual(sorted(done), [0, 1, 3])
+        self.assertEqual(converted_pdf(done[1]), "b.pdf")
+        self.assertEqual(done[3]["status"], FAILED)
+        self.assertEqual(converted_pdf(done[3]), "d.pdf")
+        self.assertEqual(journal.counts(run_id)[PENDING], 2)
+
+    def test_rows_registered_while_streaming(self):
+        """Les lignes lues en flux sont inscrites une à une; la reprise garde les lignes inchangées."""
+        run_id = self.journal.start_run(self.csv, Path("modele.docx"), [])
+        for i, row in enumerate(self.rows):
+            self.assertIsNone(self.journal.register_row(run_id, i, row))
+        self.journal.mark(run_id, 0, SENT)
+        self.journal.mark(run_id, 1, SENT)
+        self.journal.finish_run(run_id)
+
+        known = self.journal.reopen_run(run_id)
+        self.rows[1]["email"] = "corrige@x.ca"
+        done = {i: self.journal.register_row(run_id, i, row, known) for i, row in enumerate(self.rows)}
+
+        self.assertEqual(done[0]["status"], SENT)
+        self.assertEqual([i for i, record in done.items() if record is None], [1, 2, 3])
+        self.assertEqual(self.journal.counts(run_id), {PENDING: 3, SENT: 1})
+
+    def test_latest_run_per_csv(self):
+        """Le lancement repris est le dernier du même fichier CSV."""
+        first = self.journal.start_run(self.csv, Path("modele.docx"), self.rows)
+        self.journal.start_run(Path("autre.csv"), Path("modele.docx"), self.rows)
+        self.assertEqual(self.journal.latest_run(self.csv), first)
+        self.assertIsNone(self.journal.latest_run(Path("inconnu.csv")))
+
+
+if __name__ == "__main__":
+    unittest.main()
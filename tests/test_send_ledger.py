@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le registre des envois
+"""
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from send_ledger import SendLedger, file_sha256
+from smtp_email_sender import SMTPEmailSender
+
+
+class TestSendLedger(unittest.TestCase):
+    """Tests pour la classe SendLedger et son utilisation par SMTPEmailSender."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.ledger_path = self.temp_dir / "envois.sqlite"
+        self.pdf = self.temp_dir / "Alice.pdf"
+        self.pdf.write_bytes(b"%PDF soumission")
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_record_and_lookup(self):
+        """Un envoi enregistré est retrouvé (adresse insensible à la casse)."""
+        ledger = SendLedger(self.ledger_path)
+        self.addCleanup(ledger.close)
+        digest = file_sha256(self.pdf)
+        ledger.record("campagne", "Alice@X.ca", digest, "<1@x.ca>")
+
+        self.assertEqual(ledger.sent_message_id("campagne", " alice@x.ca", digest), "<1@x.ca>")
+        self.assertIsNone(ledger.sent_message_id("autre", "alice@x.ca", digest))
+        self.assertIsNone(ledger.sent_message_id("campagne", "alice@x.ca", file_sha256(None)))
+
+    def _sender(self):
+        sender = SMTPEmailSender(enabled=True, ledger_path=self.ledger_path, campaign="campagne")
+        sender.smtp_password = "secret"
+        self.addCleanup(sender.close)
+        return sender
+
+    def test_rerun_skips_delivered_rows(self):
+        """Une relance ne renvoie pas un email déjà remis; un PDF modifié est renvoyé."""
+        rows = [{"nom": "Alice", "email": "alice@x.ca"}]
+        with patch.object(SMTPEmailSender, "_send_via_smtp") as first_send:
+            self.assertEqual(self._sender().send_emails_batch(rows, [self.pdf]), 1)
+        first_send.assert_called_once()
+
+        sender = self._sender()
+        with patch.object(SMTPEmailSender, "_send_via_smtp") as second_send:
+            self.assertEqual(sender.send_emails_batch(rows, [self.pdf]), 0)
+        second_send.assert_not_called()
+        self.assertEqual(sender.skipped, 1)
+
+        self.pdf.write_bytes(b"%PDF soumission corrigee")
+        with patch.object(SMTPEmailSender, "_send_via_smtp") as third_send:
+            self.assertEqual(sender.send_emails_batch(rows, [self.pdf]), 1)
+        third_send.assert_called_once()
+
+    def test_reconverted_pdf_skipped_with_document_key(self):
+        """Avec la clé du document, un PDF reconverti (autres octets) n'est pas renvoyé."""
+        rows = [{"nom": "Alice", "email": "alice@x.ca"}]
+        document_key = lambda row: "cle-" + row["nom"]
+        sender = self._sender()
+        sender.document_key = document_key
+        with patch.object(SMTPEmailSender, "_send_via_smtp"):
+            self.assertEqual(sender.send_emails_batch(rows, [self.pdf]), 1)
+
+        self.pdf.write_bytes(b"%PDF soumission /CreationDate (D:20261016)")
+        sender = self._sender()
+        sender.document_key = document_key
+        with patch.object(SMTPEmailSender, "_send_via_smtp") as second_send:
+            self.assertEqual(sender.send_emails_batch(rows, [self.pdf]), 0)
+        second_send.assert_not_called()
+        self.assertEqual(sender.skipped, 1)
+
+    def test_duplicate_rows_sent_once_concurrently(self):
+        """Deux lignes identiques envoyées en parallèle ne donnent qu'un email."""
+        sender = self._sender()
+        sender.workers = 4
+        rows = [{"nom": "Alice", "email": "alice@x.ca"}, {"nom": "Alice", "email": "Alice@x.ca"}]
+        with patch.object(SMTPEmailSender, "_send_via_smtp", side_effect=lambda *a: time.sleep(0.05)) as send:
+            self.assertEqual(sender.send_emails_batch(rows, [self.pdf, self.pdf]), 1)
+        send.assert_called_once()
+        self.assertEqual(sender.skipped, 1)
+        self.assertEqual(sender._send_locks, {})
+
+    def test_failed_send_not_recorded(self):
+        """Un envoi en échec n'est pas inscrit au registre."""
+        sender = self._sender()
+        with patch.object(SMTPEmailSender, "_send_via_smtp", side_effect=OSError("refusé")):
+            self.assertFalse(sender.send_email({"nom": "Alice", "email": "alice@x.ca"}, self.pdf))
+        self.assertEqual(sender._send_locks, {})
+        self.assertIsNone(sender._get_ledger().sent_message_id("campagne", "alice@x.ca", file_sha256(self.pdf)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour les images de signature intégrées
+"""
+import email
+import email.policy
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from email_template import EmailBodyTemplate
+from signature_images import SignatureImages
+from smtp_email_sender import SMTPEmailSender
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+SIGNATURE = '<p>Signature</p><img src="https://exemple.com/images/Logo.png" alt="Logo"><img src=\'absent.png\'>'
+
+
+class TestSignatureImages(unittest.TestCase):
+    """Tests pour la classe SignatureImages."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.fetch = Mock(return_value=PNG)
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_downloaded_once(self):
+        """Une image distante est téléchargée une fois et référencée par CID."""
+        images = SignatureImages(self.temp_dir / "images", self.temp_dir, fetch=self.fetch)
+
+        html, inline = images.embed(SIGNATURE)
+        html_again, inline_again = images.embed(SIGNATURE)
+
+        self.fetch.assert_called_once()
+        self.assertEqual(len(inline), 1)
+        self.assertIn(f'src="cid:{inline[0].cid}"', html)
+        self.assertEqual((inline[0].maintype, inline[0].subtype, inline[0].filename), ("image", "png", "Logo.png"))
+        self.assertIs(inline_again[0].encoded, inline[0].encoded)
+        self.assertEqual(html_again, html)
+
+    def test_missing_image_keeps_link(self):
+        """Une image introuvable garde son lien d'origine."""
+        images = SignatureImages(None, self.temp_dir, fetch=self.fetch)
+
+        html, inline = images.embed(SIGNATURE)
+
+        self.assertEqual(len(inline), 1)
+        self.assertIn("src='absent.png'", html)
+
+    def test_local_directory_preferred(self):
+        """Une image présente dans le dossier local n'est pas téléchargée."""
+        (self.temp_dir / "Logo.png").write_bytes(PNG)
+        images = SignatureImages(self.temp_dir, fetch=self.fetch)
+
+        _, inline = images.embed(SIGNATURE)
+
+        self.fetch.assert_not_called()
+        self.assertEqual(len(inline), 1)
+
+
+class TestInlineSignatureMessage(unittest.TestCase):
+    """Images de signature dans les emails construits par SMTPEmailSender."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        signature_file = self.temp_dir / "signature.html"
+        signature_file.write_text(SIGNATURE, encoding="utf-8")
+        (self.temp_dir / "Logo.png").write_bytes(PNG)
+        self.sender = SMTPEmailSender(enabled=True, ledger_path=None)
+        self.sender.cc = ""
+        self.sender._body_template = EmailBodyTemplate(
+            None, signature_file, "Bonjour {nom}", images=SignatureImages(self.temp_dir))
+        self.addCleanup(self.sender.close)
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_related_part(self):
+        """Le corps HTML et l'image sont regroupés dans une partie multipart/related."""
+        images = self.sender._body_template.images
+        with patch.object(images, "_read", wraps=images._read) as read:
+            raws = [self.sender._build_message({"nom": f"Client {i}", "email": f"c{i}@test.com"}, None).as_bytes()
+                    for i in range(3)]
+
+        # Une lecture par image de la signature (logo, image absente), pas par message
+        self.assertEqual(read.call_count, 2)
+        message = email.message_from_bytes(raws[2], policy=email.policy.SMTP)
+        related = message.get_payload()[0]
+        self.assertEqual(related.get_content_type(), "multipart/related")
+        html, image = related.get_payload()
+        self.assertIn(f"cid:{image['Content-ID'][1:-1]}", html.get_content())
+        self.assertEqual(image.get_content_disposition(), "inline")
+        self.assertEqual(image.get_content(), PNG)
+
+
+if __name__ == "__main__":
+    unittest.main()
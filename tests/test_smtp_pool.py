@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le pool de sessions SMTP
+"""
+import email
+import email.policy
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from smtp_email_sender import SMTPEmailSender
+from smtp_message import EncodedPartCache
+from smtp_pool import SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Serveur SMTP simulé: enregistre les commandes reçues."""
+
+    instances = []
+
+    def __init__(self, host, port, timeout=None, context=None):
+        self.commands = []
+        self.messages = []
+        self.closed = False
+        self.sock = object()
+        FakeSMTP.instances.append(self)
+
+    def starttls(self, context=None):
+        self.commands.append("STARTTLS")
+
+    def login(self, username, password):
+        self.commands.append("LOGIN")
+
+    def rset(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("Connexion fermée")
+        self.commands.append("RSET")
+
+    def noop(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("Connexion fermée")
+        self.commands.append("NOOP")
+        return 250, b"OK"
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("Connexion fermée")
+        self.commands.append(("MAIL", tuple(to_addrs)))
+        return {}
+
+    # Commandes bas niveau utilisées pour les messages envoyés en flux
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def mail(self, from_addr):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("Connexion fermée")
+        self._rcpts, self._data = [], None
+        return 250, b"OK"
+
+    def rcpt(self, to_addr):
+        self._rcpts.append(to_addr)
+        return 250, b"OK"
+
+    def putcmd(self, command):
+        self._data = []
+
+    def send(self, data):
+        self._data.append(data)
+
+    def getreply(self):
+        data = b"".join(self._data or [])
+        if data.endswith(b"\r\n.\r\n"):
+            self.commands.append(("MAIL", tuple(self._rcpts)))
+            self.messages.append(data[:-3])
+            self._data = None
+            return 250, b"OK"
+        return 354, b"Go ahead"
+
+    def quit(self):
+        self.commands.append("QUIT")
+        self.close()
+
+    def close(self):
+        self.closed = True
+        self.sock = None
+
+
+class TestSMTPConnectionPool(unittest.TestCase):
+    """Tests pour la classe SMTPConnectionPool."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        FakeSMTP.instances = []
+        patcher = patch("smtp_pool.smtplib.SMTP", FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = SMTPConnectionPool("smtp.test", 587, "user", "secret", size=2)
+
+    def test_session_reused_with_rset(self):
+        """Plusieurs messages partagent une seule session authentifiée, remise à zéro entre eux."""
+        for i in range(3):
+            self.pool.send("from@test.com", [f"dest{i}@test.com"], "message")
+
+        self.assertEqual(self.pool.connections_opened, 1)
+        commands = FakeSMTP.instances[0].commands
+        self.assertEqual(commands.count("LOGIN"), 1)
+        self.assertEqual(commands.count("RSET"), 2)
+        self.assertEqual(commands[-1], ("MAIL", ("dest2@test.com",)))
+
+    def test_dead_session_replaced(self):
+        """Une session fermée par le serveur est remplacée et le message renvoyé."""
+        self.pool.send("from@test.com", ["a@test.com"], "message")
+        FakeSMTP.instances[0].closed = True
+
+        self.pool.send("from@test.com", ["b@test.com"], "message")
+
+        self.assertEqual(self.pool.connections_opened, 2)
+        self.assertIn(("MAIL", ("b@test.com",)), FakeSMTP.instances[1].commands)
+
+    def test_session_closed_by_421_discarded(self):
+        """Une session fermée par une réponse 421 n'est pas rendue au pool."""
+        self.pool.send("from@test.com", ["a@test.com"], "message")
+        smtp = FakeSMTP.instances[0]
+
+        def shutting_down(from_addr, to_addrs, msg):
+            smtp.close()
+            raise smtplib.SMTPSenderRefused(421, b"shutting down", from_addr)
+
+        smtp.sendmail = shutting_down
+        with self.assertRaises(smtplib.SMTPSenderRefused):
+            self.pool.send("from@test.com", ["b@test.com"], "message")
+
+        with self.pool.connection() as connection:
+            self.assertIsNot(connection.smtp, smtp)
+        self.assertEqual(self.pool.connections_opened, 2)
+
+    def test_session_kept_after_refusal(self):
+        """Une session qui reste ouverte après un refus 5xx est réutilisée."""
+        self.pool.send("from@test.com", ["a@test.com"], "message")
+        smtp = FakeSMTP.instances[0]
+
+        def rejected(from_addr, to_addrs, msg):
+            raise smtplib.SMTPDataError(550, b"rejected")
+
+        smtp.sendmail = rejected
+        with self.assertRaises(smtplib.SMTPDataError):
+            self.pool.send("from@test.com", ["b@test.com"], "message")
+
+        with self.pool.connection() as connection:
+            self.assertIs(connection.smtp, smtp)
+
+    def test_timing_separates_pool_wait(self):
+        """L'attente d'une session libre est mesurée à part de son utilisation."""
+        pool = SMTPConnectionPool("smtp.test", 587, "user", "secret", size=1)
+        timings = []
+        pool.on_timing = lambda wait, used: timings.append((wait, used))
+        held = threading.Event()
+
+        def hold():
+            with pool.connection():
+                held.set()
+                time.sleep(0.05)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        pool.send("from@test.com", ["a@test.com"], "message")
+        thread.join()
+
+        self.assertEqual(len(timings), 2)
+        first, second = timings
+        self.assertGreaterEqual(first[1], 0.05)
+        self.assertGreaterEqual(second[0], 0.03)
+        self.assertLess(second[1], 0.03)
+
+    def test_failed_starttls_closes_socket(self):
+        """Une session dont le STARTTLS échoue est fermée avant de lever l'erreur."""
+        def refused(smtp, context=None):
+            raise smtplib.SMTPResponseException(454, b"TLS not available")
+
+        with patch.object(FakeSMTP, "starttls", refused):
+            with self.assertRaises(smtplib.SMTPResponseException):
+                self.pool.send("from@test.com", ["a@test.com"], "message")
+
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        self.assertEqual(self.pool.connections_opened, 0)
+
+    def test_session_renewed_after_max_messages(self):
+        """Une session est renouvelée après ``max_messages`` messages."""
+        self.pool.max_messages = 2
+        for i in range(3):
+            self.pool.send("from@test.com", [f"dest{i}@test.com"], "message")
+
+        self.assertEqual(self.pool.connections_opened, 2)
+        self.assertEqual(FakeSMTP.instances[0].commands[-1], "QUIT")
+
+    def test_check_session_kept_for_sending(self):
+        """La session ouverte par le test de connexion sert ensuite aux envois."""
+        self.pool.check()
+        self.pool.send("from@test.com", ["a@test.com"], "message")
+
+        self.assertEqual(self.pool.connections_opened, 1)
+
+    def test_close(self):
+        """La fermeture du pool termine les sessions inactives."""
+        self.pool.send("from@test.com", ["a@test.com"], "message")
+        self.pool.close()
+
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        with self.assertRaises(RuntimeError):
+            self.pool.send("from@test.com", ["b@test.com"], "message")
+
+
+class TestConcurrentSending(unittest.TestCase):
+    """Envois simultanés de SMTPEmailSender sur le pool."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        FakeSMTP.instances = []
+        patcher = patch("smtp_pool.smtplib.SMTP", FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_in_row_order(self):
+        """Les résultats sont rendus dans l'ordre des lignes, sur au plus ``SMTP_POOL_SIZE`` sessions."""
+        sender = SMTPEmailSender(enabled=True, ledger_path=None, workers=4)
+        sender.smtp_password = "secret"
+        sender.cc = sender.bcc = ""
+        self.addCleanup(sender.close)
+        rows = [{"nom": f"Client {i}", "email": f"client{i}@test.com" if i % 3 else ""} for i in range(12)]
+        reported = {}
+
+        results = sender.send_all(rows, [], on_result=reported.__setitem__)
+
+        self.assertEqual(results, [bool(i % 3) for i in range(12)])
+        self.assertEqual(reported, dict(enumerate(results)))
+        self.assertLessEqual(sender.pool.connections_opened, sender.smtp_pool_size)
+        sent = [cmd[1][0] for smtp in FakeSMTP.instances for cmd in smtp.commands if cmd[0] == "MAIL"]
+        self.assertEqual(sorted(sent), sorted(row["email"] for row in rows if row["email"]))
+
+    def test_attachment_streamed(self):
+        """La pièce jointe est encodée par blocs et le message reste un MIME valide."""
+        pdf = Path(tempfile.mkdtemp()) / "Béton.pdf"
+        self.addCleanup(shutil.rmtree, pdf.parent, ignore_errors=True)
+        content = bytes(range(256)) * 1000
+        pdf.write_bytes(content)
+        sender = SMTPEmailSender(enabled=True, ledger_path=None, workers=1)
+        sender.smtp_password = "secret"
+        sender.cc = ""
+        sender.bcc = "archive@test.com"
+        self.addCleanup(sender.close)
+
+        self.assertTrue(sender.send_email({"nom": "Béton", "email": "b@test.com"}, pdf))
+
+        smtp = FakeSMTP.instances[0]
+        self.assertEqual(smtp.commands[-1], ("MAIL", ("b@test.com", "archive@test.com")))
+        message = email.message_from_bytes(smtp.messages[0], policy=email.policy.SMTP)
+        self.assertNotIn("Bcc", message)
+        attachment = next(message.iter_attachments())
+        self.assertEqual(attachment.get_filename(), "Béton.pdf")
+        self.assertEqual(attachment.get_content(), content)
+
+    def test_shared_attachment_encoded_once(self):
+        """Une pièce jointe envoyée à plusieurs destinataires n'est encodée qu'une fois."""
+        pdf = Path(tempfile.mkdtemp()) / "Commun.pdf"
+        self.addCleanup(shutil.rmtree, pdf.parent, ignore_errors=True)
+        pdf.write_bytes(b"%PDF partage" * 100)
+        sender = SMTPEmailSender(enabled=True, ledger_path=None, workers=1)
+        sender.smtp_password = "secret"
+        sender.cc = sender.bcc = ""
+        self.addCleanup(sender.close)
+        rows = [{"nom": f"Client {i}", "email": f"client{i}@test.com"} for i in range(3)]
+
+        self.assertEqual(sender.send_all(rows, [pdf] * 3), [True] * 3)
+
+        self.assertEqual(sender.encoded_parts.hits, 1)
+        for raw in FakeSMTP.instances[0].messages:
+            message = email.message_from_bytes(raw, policy=email.policy.SMTP)
+            self.assertEqual(next(message.iter_attachments()).get_content(), pdf.read_bytes())
+
+    def test_files_sent_once_forgotten(self):
+        """Le suivi des fichiers envoyés une seule fois reste borné."""
+        temp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        cache = EncodedPartCache(max_seen=3)
+        pdfs = []
+        for i in range(5):
+            pdfs.append(temp_dir / f"Client{i}.pdf")
+            pdfs[-1].write_bytes(b"%PDF client " + bytes([65 + i]))
+            cache.file_part(pdfs[-1])
+
+        self.assertEqual(len(cache._seen), 3)
+        self.assertIsInstance(cache.file_part(pdfs[4]), bytes)
+        self.assertEqual(len(cache._seen), 2)
+        self.assertNotIsInstance(cache.file_part(pdfs[0]), bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le classement des erreurs SMTP et les envois différés
+"""
+import errno
+import smtplib
+import socket
+import ssl
+import threading
+import unittest
+from unittest.mock import patch
+
+from smtp_email_sender import SMTPEmailSender
+from smtp_pool import SMTPConnectionPool
+from smtp_retry import PERMANENT, TRANSIENT, DeferralQueue, backoff_delay, classify_smtp_error
+
+
+class TestClassification(unittest.TestCase):
+    """Tests pour classify_smtp_error et backoff_delay."""
+
+    def test_classification(self):
+        """4xx, coupures et délais dépassés sont temporaires; 5xx et authentification définitifs."""
+        self.assertEqual(classify_smtp_error(smtplib.SMTPDataError(451, b"greylisted")), TRANSIENT)
+        self.assertEqual(classify_smtp_error(smtplib.SMTPServerDisconnected("coupé")), TRANSIENT)
+        self.assertEqual(classify_smtp_error(TimeoutError()), TRANSIENT)
+        self.assertEqual(classify_smtp_error(ConnectionResetError()), TRANSIENT)
+        self.assertEqual(classify_smtp_error(smtplib.SMTPDataError(554, b"rejected")), PERMANENT)
+        self.assertEqual(classify_smtp_error(smtplib.SMTPAuthenticationError(535, b"bad")), PERMANENT)
+        self.assertEqual(classify_smtp_error(
+            smtplib.SMTPRecipientsRefused({"a@x.ca": (550, b"no such user")})), PERMANENT)
+        self.assertEqual(classify_smtp_error(
+            smtplib.SMTPRecipientsRefused({"a@x.ca": (452, b"mailbox full")})), TRANSIENT)
+        self.assertEqual(classify_smtp_error(ValueError("message invalide")), PERMANENT)
+        self.assertEqual(classify_smtp_error(socket.gaierror(-2, "Name or service not known")), TRANSIENT)
+        self.assertEqual(classify_smtp_error(OSError(errno.ENETUNREACH, "Network is unreachable")), TRANSIENT)
+        self.assertEqual(classify_smtp_error(OSError(errno.EHOSTUNREACH, "No route to host")), TRANSIENT)
+        self.assertEqual(classify_smtp_error(ssl.SSLError(1, "unexpected eof while reading")), TRANSIENT)
+
+    def test_local_errors_are_permanent(self):
+        """Une pièce jointe introuvable ou un certificat refusé ne sont pas retentés."""
+        self.assertEqual(classify_smtp_error(FileNotFoundError(2, "introuvable", "a.pdf")), PERMANENT)
+        self.assertEqual(classify_smtp_error(PermissionError(13, "accès refusé", "a.pdf")), PERMANENT)
+        self.assertEqual(classify_smtp_error(
+            ssl.SSLCertVerificationError(1, "certificate verify failed")), PERMANENT)
+
+    def test_backoff_grows_with_jitter_and_cap(self):
+        """Le délai double à chaque essai, reste plafonné, et la gigue en tire la moitié au hasard."""
+        self.assertEqual([backoff_delay(n, 2.0, 10.0, rand=lambda: 1.0) for n in (1, 2, 3, 4)],
+                         [2.0, 4.0, 8.0, 10.0])
+        self.assertEqual(backoff_delay(3, 2.0, 10.0, rand=lambda: 0.0), 4.0)
+
+    def test_deferral_queue_order(self):
+        """Les éléments différés sortent quand leur heure est venue, dans l'ordre."""
+        now = [0.0]
+        queue = DeferralQueue(clock=lambda: now[0])
+        queue.push("b", 2.0)
+        queue.push("a", 1.0)
+        self.assertEqual(queue.pop_due(), [])
+        self.assertEqual(queue.next_delay(), 1.0)
+        now[0] = 5.0
+        self.assertEqual(queue.pop_due(), ["a", "b"])
+        self.assertEqual(len(queue), 0)
+
+
+class TestSendRetries(unittest.TestCase):
+    """Tests des nouveaux essais de SMTPEmailSender."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.sender = SMTPEmailSender(enabled=True, ledger_path=None, workers=2)
+        self.sender.smtp_password = "secret"
+        self.sender.cc = self.sender.bcc = ""
+        self.sender.delay_seconds = 0.01
+        self.addCleanup(self.sender.close)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _pool_send(self, failures):
+        """Simule le serveur: ``failures[email]`` liste les erreurs des premiers essais."""
+        def send(pool, from_addr, recipients, message):
+            with self.lock:
+                self.calls.append(recipients[0])
+                errors = failures.get(recipients[0])
+                if errors:
+                    raise errors.pop(0)
+        return send
+
+    def test_permanent_failure_not_retried(self):
+        """Un refus 5xx échoue dès le premier essai."""
+        failures = {"refuse@x.ca": [smtplib.SMTPDataError(550, b"rejected")]}
+        with patch.object(SMTPConnectionPool, "send", self._pool_send(failures)):
+            self.assertFalse(self.sender.send_email({"nom": "A", "email": "refuse@x.ca"}, None))
+        self.assertEqual(self.calls, ["refuse@x.ca"])
+
+    def test_transient_failure_deferred_without_blocking_batch(self):
+        """Un échec temporaire est différé puis renvoyé; les autres lignes n'attendent pas."""
+        self.sender.delay_seconds = 0.2
+        failures = {"lent@x.ca": [smtplib.SMTPDataError(421, b"try later")] * 2}
+        rows = [{"nom": "Lent", "email": "lent@x.ca"}] + \
+               [{"nom": f"C{i}", "email": f"c{i}@x.ca"} for i in range(4)]
+        reported = []
+        with patch.object(SMTPConnectionPool, "send", self._pool_send(failures)):
+            results = self.sender.send_all(rows, [], on_result=lambda idx, ok: reported.append(idx))
+
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(self.calls.count("lent@x.ca"), 3)
+        self.assertEqual(reported[-1], 0)
+        self.assertEqual(sorted(reported), [0, 1, 2, 3, 4])
+
+    def test_transient_failure_gives_up_after_max_retries(self):
+        """Un échec temporaire persistant est abandonné après ``max_retries`` essais."""
+        self.sender.max_retries = 3
+        failures = {"panne@x.ca": [TimeoutError("délai dépassé")] * 5}
+        with patch.object(SMTPConnectionPool, "send", self._pool_send(failures)):
+            self.assertEqual(self.sender.send_all([{"nom": "P", "email": "panne@x.ca"}], []), [False])
+        self.assertEqual(self.calls.count("panne@x.ca"), 3)
+
+    def test_single_send_defers_transient_failure(self):
+        """Avec ``on_retried``, un échec temporaire est renvoyé en arrière-plan sans bloquer l'appelant."""
+        self.sender.delay_seconds = 0.2
+        failures = {"lent@x.ca": [smtplib.SMTPDataError(451, b"greylisted")]}
+        retried = []
+        with patch.object(SMTPConnectionPool, "send", self._pool_send(failures)):
+            self.assertIsNone(self.sender.send_email({"nom": "Lent", "email": "lent@x.ca"}, None, 0,
+                                                     on_retried=retried.append))
+            self.assertTrue(self.sender.send_email({"nom": "C", "email": "c@x.ca"}, None, 1,
+                                                   on_retried=retried.append))
+            self.assertEqual(retried, [])
+            self.sender.wait_deferred()
+
+        self.assertEqual(retried, [True])
+        self.assertEqual(self.calls, ["lent@x.ca", "c@x.ca", "lent@x.ca"])
+
+
+if __name__ == "__main__":
+    unittest.main()
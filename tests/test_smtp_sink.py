@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le serveur SMTP de test et le banc d'essai d'envoi
+"""
+import smtplib
+import unittest
+
+from benchmarks.email_throughput import percentile, run_benchmark
+from smtp_email_sender import SMTPEmailSender
+from smtp_sink import ACCEPTED, DEFERRED, DROPPED, REJECTED, FaultProfile, SMTPSink
+
+
+class TestSMTPSink(unittest.TestCase):
+    """Tests pour la classe SMTPSink."""
+
+    def _send(self, sink):
+        with smtplib.SMTP(sink.host, sink.port, timeout=5) as smtp:
+            smtp.login("user", "secret")
+            smtp.sendmail("from@test.com", ["to@test.com"], "Subject: test\r\n\r\nBonjour\r\n")
+
+    def test_accepts_and_counts_bytes(self):
+        """Les emails sont acceptés et les octets reçus comptés."""
+        with SMTPSink() as sink:
+            self._send(sink)
+            stats = sink.stats.snapshot()
+
+        self.assertEqual(stats[ACCEPTED], 1)
+        self.assertGreater(stats["octets_recus"], len("Subject: test\r\n\r\nBonjour\r\n"))
+
+    def test_fault_injection(self):
+        """Refus temporaire 451, refus définitif 554 et coupure de connexion."""
+        cases = [(FaultProfile(defer_rate=1.0), smtplib.SMTPDataError, DEFERRED),
+                 (FaultProfile(reject_rate=1.0), smtplib.SMTPDataError, REJECTED),
+                 (FaultProfile(drop_rate=1.0), smtplib.SMTPServerDisconnected, DROPPED)]
+        for faults, error, outcome in cases:
+            with self.subTest(outcome=outcome), SMTPSink(faults=faults) as sink:
+                with self.assertRaises(error) as raised:
+                    self._send(sink)
+                self.assertEqual(sink.stats.snapshot()[outcome], 1)
+                if outcome != DROPPED:
+                    self.assertEqual(raised.exception.smtp_code, 451 if outcome == DEFERRED else 554)
+
+    def test_sender_against_sink(self):
+        """SMTPEmailSender envoie au serveur de test; un refus temporaire est renvoyé."""
+        with SMTPSink(faults=FaultProfile(defer_rate=0.5, seed=3)) as sink:
+            sender = SMTPEmailSender(enabled=True, ledger_path=None, workers=2)
+            sender.smtp_server, sender.smtp_port = sink.host, sink.port
+            sender.smtp_password = "secret"
+            sender.smtp_use_tls = sender.smtp_use_ssl = False
+            sender.cc = sender.bcc = ""
+            sender.delay_seconds = sender.max_delay_seconds = 0.01
+            sender.max_retries = 10
+            self.addCleanup(sender.close)
+            rows = [{"nom": f"C{i}", "email": f"c{i}@test.com"} for i in range(6)]
+
+            self.assertEqual(sender.send_all(rows, []), [True] * 6)
+            stats = sink.stats.snapshot()
+
+        self.assertEqual(stats[ACCEPTED], 6)
+        self.assertGreater(stats[DEFERRED], 0)
+
+
+class TestEmailBenchmark(unittest.TestCase):
+    """Tests pour le banc d'essai du débit d'envoi."""
+
+    def test_percentile(self):
+        """Percentiles par interpolation linéaire."""
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50), 3.0)
+        self.assertAlmostEqual(percentile([1.0, 2.0], 95), 1.95)
+
+    def test_report(self):
+        """Le rapport donne le débit, les latences et les octets transmis."""
+        result = run_benchmark(messages=5, workers=2, attachment_kb=4, faults=FaultProfile(seed=1))
+
+        self.assertEqual(result["envoyes"], 5)
+        self.assertEqual(result["transactions"], 5)
+        self.assertGreater(result["messages_par_s"], 0)
+        self.assertLessEqual(result["latence_ms"]["p50"], result["latence_ms"]["p99"])
+        self.assertLessEqual(result["attente_pool_ms"]["p50"], result["attente_pool_ms"]["p99"])
+        self.assertGreater(result["octets_recus"], 5 * 4 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour la compilation des modèles
+"""
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+from docx import Document
+from config import PLACEHOLDER_PATTERN
+from template_compiler import CompiledTemplate, index_cache_path, row_values
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    """Tests pour la classe CompiledTemplate."""
+
+    def setUp(self):
+        """Configuration des tests."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.template_path = self.temp_dir / "modele.docx"
+        doc = Document()
+        split = doc.add_paragraph("Bonjour ")
+        split.add_run("{{VEN").bold = True
+        split.add_run("DEUR}}, merci")
+        doc.add_paragraph("Aucun placeholder")
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "Client: {{VENDEUR}}"
+        doc.sections[0].header.paragraphs[0].text = "En-tête {{VENDEUR}}"
+        doc.save(str(self.template_path))
+
+    def tearDown(self):
+        """Nettoyage après les tests."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_index_records_locations(self):
+        """L'index localise chaque occurrence, y compris sur plusieurs runs."""
+        compiled = CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN)
+
+        body = compiled.index["parts"]["word/document.xml"]
+        self.assertEqual(len(body), 2)
+        self.assertEqual(body[0]["runs"], [1, 2])
+        self.assertEqual(body[0]["start"], len("Bonjour "))
+        self.assertEqual(len(compiled.index["parts"]), 2)
+        self.assertTrue(index_cache_path(self.template_path).exists())
+
+    def test_render_touches_only_placeholders(self):
+        """Le rendu remplace les placeholders et conserve la mise en forme."""
+        compiled = CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN)
+        out_path = compiled.write(self.temp_dir / "out.docx", {"VENDEUR": "Acme & Fils"})
+
+        doc = Document(str(out_path))
+        self.assertEqual(doc.paragraphs[0].text, "Bonjour Acme & Fils, merci")
+        self.assertTrue(doc.paragraphs[0].runs[1].bold)
+        self.assertEqual(doc.paragraphs[1].text, "Aucun placeholder")
+        self.assertEqual(doc.tables[0].cell(0, 0).text, "Client: Acme & Fils")
+        self.assertEqual(doc.sections[0].header.paragraphs[0].text, "En-tête Acme & Fils")
+
+    def test_cached_index_reused_and_invalidated(self):
+        """L'index disque est réutilisé tant que le modèle ne change pas."""
+        CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN)
+
+        with patch.object(CompiledTemplate, "_scan") as mock_scan:
+            CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN)
+        mock_scan.assert_not_called()
+
+        doc = Document(str(self.template_path))
+        doc.add_paragraph("Nouveau {{VENDEUR}}")
+        doc.save(str(self.template_path))
+
+        compiled = CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN)
+        self.assertEqual(len(compiled.index["parts"]["word/document.xml"]), 3)
+
+    def test_multiple_fields_single_pass(self):
+        """Chaque {{COLONNE}} est rempli par la colonne du même nom."""
+        doc = Document()
+        doc.add_paragraph("{{VENDEUR}} ({{ville}}) - {{ Courriel }} - {{INCONNU}}")
+        doc.save(str(self.template_path))
+        compiled = CompiledTemplate.load(self.template_path, PLACEHOLDER_PATTERN)
+        self.assertEqual(compiled.fields, ["COURRIEL", "INCONNU", "VENDEUR", "VILLE"])
+
+        row = {"nom": "Acme", "Ville": "Laval", "courriel": "a@b.ca"}
+        values = row_values(row, {"VENDEUR": "nom"})
+        out_path = compiled.write(self.temp_dir / "out.docx", values)
+
+        self.assertEqual(Document(str(out_path)).paragraphs[0].text,
+                         "Acme (Laval) - a@b.ca - {{INCONNU}}")
+
+
+if __name__ == "__main__":
+    unittest.main()
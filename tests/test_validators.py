@@ -4,6 +4,9 @@ Tests unitaires pour les validateurs
 """
 import unittest
 from pathlib import Path
+from unittest.mock import patch
+
+import validators
 from validators import DataValidator
 
 
@@ -71,6 +74,42 @@ class TestDataValidator(unittest.TestCase):
         self.assertFalse(is_valid)
         self.assertIn("Aucune donnée trouvée", errors[0])
 
+    def test_bulk_report_groups_repeated_errors(self):
+        """Les adresses répétées sont vérifiées une fois et les erreurs identiques regroupées."""
+        rows = [{"nom": f"Vendeur {i}", "email": "bad@@example.com" if i % 2 else "ok@example.com"}
+                for i in range(30)]
+        rows.append({"nom": "", "email": "x@example.com"})
+        
+        report = DataValidator.validate_rows(rows)
+        self.assertEqual(len(report), 16)
+        self.assertIn("nom manquant", report[31][0])
+        
+        is_valid, errors = DataValidator.validate_csv_data(rows, max_lines=3)
+        self.assertFalse(is_valid)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith("Lignes 2, 4, 6 (+12): email invalide 'bad@@example.com'"))
+    
+    def test_email_errors_per_unique_address(self):
+        """Le rapport par adresse ne contient que les adresses invalides distinctes."""
+        errors = DataValidator.email_errors(["a@b.ca", "a@b.ca", "sans-arobase", "", "x@.ca"])
+        self.assertEqual(sorted(errors), ["sans-arobase", "x@.ca"])
+        self.assertTrue(DataValidator.validate_email("Jean@Béton.ca"))
+    
+    def test_test_domains_accepted(self):
+        """Les adresses de test (.test) sont valides; les autres domaines réservés non."""
+        self.assertTrue(DataValidator.validate_email("vendeur@preprod.test"))
+        self.assertTrue(DataValidator.validate_email("Jean@Béton.test"))
+        self.assertFalse(DataValidator.validate_email("vendeur@exemple.invalid"))
+    
+    def test_domain_validated_once(self):
+        """Un domaine (sans égard à la casse) n'est validé qu'une fois pour toutes ses adresses."""
+        emails = [f"client{i}@Domaine-Unique.ca" for i in range(50)] + ["autre@domaine-unique.CA"]
+        with patch("validators._validate_email", wraps=validators._validate_email) as validate:
+            self.assertEqual(DataValidator.email_errors(emails), {})
+        
+        validate.assert_called_once()
+        self.assertEqual(validate.call_args.kwargs, {"check_deliverability": False, "test_environment": True})
+
 
 if __name__ == "__main__":
     unittest.main()
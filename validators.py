@@ -3,20 +3,88 @@
 Validateurs pour les données d'entrée
 """
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 
+try:
+    from email_validator import EmailNotValidError, validate_email as _validate_email
+except ImportError:  # Repli sur l'expression régulière si email-validator est absent
+    _validate_email = None
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Longueur maximale d'une adresse (RFC 3696, errata 1690) et de sa partie locale
+EMAIL_MAX_LENGTH = 254
+LOCAL_PART_MAX_LENGTH = 64
+# Partie locale ASCII "dot-atom" (RFC 5322): valide dès que sa longueur l'est
+LOCAL_PART_PATTERN = re.compile(r"^[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*$")
+# Nombre d'adresses distinctes à partir duquel la validation est répartie sur des processus
+PARALLEL_VALIDATION_THRESHOLD = 20000
+
+
+def _full_email_error(email: str) -> Optional[str]:
+    """Validation complète (hors ligne) par email-validator.
+    
+    Les domaines en ``.test`` (adresses de test et de préproduction) sont acceptés;
+    les autres noms réservés (``.invalid``, ``.local``, ``localhost``...) sont refusés.
+    """
+    try:
+        _validate_email(email, check_deliverability=False, test_environment=True)
+        return None
+    except EmailNotValidError as e:
+        return str(e)
+
+
+@lru_cache(maxsize=65536)
+def _domain_error(domain: str) -> Optional[str]:
+    """Erreur de syntaxe d'un domaine en minuscules (mémorisée: un domaine est vérifié une fois).
+    
+    Le domaine est vérifié par la validation publique d'email-validator, avec
+    une partie locale toujours valide.
+    """
+    return _full_email_error(f"postmaster@{domain}")
+
+
+@lru_cache(maxsize=262144)
+def email_error(email: str) -> Optional[str]:
+    """Retourne l'erreur de syntaxe d'une adresse email, ou None si elle est valide.
+    
+    Une partie locale ASCII simple (voir ``LOCAL_PART_PATTERN``) ne demande que
+    la vérification du domaine, mémorisée par domaine; les autres cas (partie
+    locale internationale ou entre guillemets, adresse trop longue) passent par
+    la validation complète d'email-validator.
+    """
+    if not email:
+        return "adresse vide"
+    if _validate_email is None:
+        return None if EMAIL_PATTERN.match(email) else "format invalide"
+    local, at, domain = email.rpartition("@")
+    if (not at or not domain or len(email) > EMAIL_MAX_LENGTH or len(local) > LOCAL_PART_MAX_LENGTH
+            or not LOCAL_PART_PATTERN.match(local)):
+        return _full_email_error(email)
+    return _domain_error(domain.lower())
+
+
+def _email_errors_chunk(emails: List[str]) -> Dict[str, str]:
+    """Valide un lot d'adresses distinctes (dans un processus de validation)."""
+    errors = {}
+    for email in emails:
+        error = email_error(email)
+        if error is not None:
+            errors[email] = error
+    return errors
+
 
 class DataValidator:
     """Classe pour valider les données d'entrée."""
     
     @staticmethod
     def validate_email(email: str) -> bool:
-        """Valide le format d'un email."""
+        """Valide le format d'un email (syntaxe, sans vérification DNS)."""
         if not email:
             return False
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return email_error(email) is None
     
     @staticmethod
     def validate_name(name: str) -> bool:
@@ -29,23 +97,64 @@ class DataValidator:
         return file_path.exists()
     
     @staticmethod
-    def validate_csv_data(rows: List[Dict[str, Any]]) -> Tuple[bool, List[str]]:
-        """Valide les données CSV et retourne les erreurs."""
+    def email_errors(emails: List[str], workers: int = 1) -> Dict[str, str]:
+        """Valide des adresses en lot: {adresse invalide: erreur}.
+        
+        Chaque adresse distincte n'est vérifiée qu'une fois; au-delà de
+        ``PARALLEL_VALIDATION_THRESHOLD`` adresses distinctes, la vérification est
+        répartie par lots sur ``workers`` processus.
+        """
+        unique = list(dict.fromkeys(email for email in emails if email))
+        if workers <= 1 or len(unique) < PARALLEL_VALIDATION_THRESHOLD:
+            return _email_errors_chunk(unique)
+        chunk_size = -(-len(unique) // (workers * 4))
+        chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+        errors: Dict[str, str] = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_errors in executor.map(_email_errors_chunk, chunks):
+                errors.update(chunk_errors)
+        return errors
+    
+    @staticmethod
+    def validate_rows(rows: List[Dict[str, Any]], workers: int = 1) -> Dict[int, List[str]]:
+        """Rapport d'erreurs par ligne: {numéro de ligne (à partir de 1): erreurs}.
+        
+        Seules les lignes en erreur figurent dans le rapport.
+        """
+        report: Dict[int, List[str]] = {}
+        emails = [(row.get('email') or '').strip() for row in rows]
+        invalid = DataValidator.email_errors(emails, workers)
+        for i, (row, email) in enumerate(zip(rows, emails), 1):
+            if not DataValidator.validate_name(row.get('nom', '')):
+                report.setdefault(i, []).append("nom manquant ou invalide")
+            if email in invalid:
+                report.setdefault(i, []).append(f"email invalide '{email}' ({invalid[email]})")
+        return report
+    
+    @staticmethod
+    def validate_csv_data(rows: List[Dict[str, Any]], workers: int = 1,
+                          max_lines: int = 10) -> Tuple[bool, List[str]]:
+        """Valide les données CSV et retourne les erreurs.
+        
+        Les lignes ayant la même erreur sont regroupées en un seul message
+        (les ``max_lines`` premiers numéros de ligne sont cités).
+        """
         errors = []
         
         if not rows:
             errors.append("Aucune donnée trouvée dans le CSV")
             return False, errors
         
-        for i, row in enumerate(rows, 1):
-            name = row.get('nom', '').strip()
-            email = row.get('email', '').strip()
-            
-            if not DataValidator.validate_name(name):
-                errors.append(f"Ligne {i}: nom manquant ou invalide")
-            
-            if email and not DataValidator.validate_email(email):
-                errors.append(f"Ligne {i}: email invalide '{email}'")
+        lines_by_error: Dict[str, List[int]] = {}
+        for line, messages in DataValidator.validate_rows(rows, workers).items():
+            for message in messages:
+                lines_by_error.setdefault(message, []).append(line)
+        
+        for message, lines in lines_by_error.items():
+            cited = ", ".join(str(line) for line in lines[:max_lines])
+            more = f" (+{len(lines) - max_lines})" if len(lines) > max_lines else ""
+            label = "Ligne" if len(lines) == 1 else "Lignes"
+            errors.append(f"{label} {cited}{more}: {message}")
         
         return len(errors) == 0, errors
     